@@ -1,8 +1,19 @@
+import heapq
 import json
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 import requests
+from loguru import logger
+
+from catalog import CATALOG_DB, CatalogStore
+from columnar import ColumnarCatalog, category_of
+from facets import FacetCatalog
+from filter_index import FilterIndex
+from freshness import ProductCache
+from hedging import Hedger, make_sessions
+from recommender import preference_words, refresh_recommendations, rerank
 
 load_dotenv()
 # Path to the products data file
@@ -10,6 +21,120 @@ DATA_DIR = Path(os.path.dirname(os.path.abspath(__file__))) / "data"
 PRODUCTS_FILE = DATA_DIR / "products.json"
 SHOPIFY_ACCESS_KEY = os.environ.get("SHOPIFY_ACCESS_KEY")
 SHOPIFY_STORE_NAME = os.environ.get("SHOPIFY_STORE_NAME")
+# Admin API root; override to point at a local stand-in
+SHOPIFY_API_URL = os.environ.get("SHOPIFY_API_URL", f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01")
+# (connect, read) timeout in seconds for every Shopify request
+SHOPIFY_TIMEOUT = (float(os.environ.get("SHOPIFY_CONNECT_TIMEOUT", 2)), float(os.environ.get("SHOPIFY_READ_TIMEOUT", 5)))
+# Without a local catalog, filter_products reads up to this many products.json pages of this size
+FILTER_PAGE_SIZE = 250
+FILTER_MAX_PAGES = int(os.environ.get("FILTER_MAX_PAGES", 4))
+
+# Race a duplicate request against slow idempotent reads (see hedging.py)
+SHOPIFY_HEDGING = os.environ.get("SHOPIFY_HEDGING", "false").lower() == "true"
+# Variant fields a price/stock refresh may overwrite in cached metadata
+PRICE_STOCK_FIELDS = ("id", "price", "compare_at_price", "inventory_quantity")
+
+# Product metadata and price/stock cached with separate TTLs (see freshness.py)
+product_cache = ProductCache()
+
+_catalog_store = None
+_hedger = None
+# One pooled session, so Shopify calls reuse warm keep-alive connections
+_shopify_session = make_sessions(1, pool_size=16)[0]
+
+def _hedged_get(url, **kwargs):
+    """GET on the pooled session, hedged when SHOPIFY_HEDGING is on; only for idempotent reads"""
+    global _hedger
+    if not SHOPIFY_HEDGING:
+        return _shopify_session.get(url, **kwargs)
+    if _hedger is None:
+        _hedger = Hedger()
+    return _hedger.get(url, **kwargs)
+
+def warm_shopify_connection():
+    """Open, or keep alive, a pooled connection to Shopify; returns the round trip in ms"""
+    headers = {
+        "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY
+    }
+    started = time.perf_counter()
+    response = _shopify_session.get(f"{SHOPIFY_API_URL}/products/count.json", headers=headers, timeout=SHOPIFY_TIMEOUT)
+    response.close()
+    return (time.perf_counter() - started) * 1000
+
+def hedging_report():
+    return _hedger.report() if _hedger else None
+
+def local_catalog():
+    """Local catalog store, if one has been indexed (see bulk_export.py)"""
+    global _catalog_store
+    if _catalog_store is None and CATALOG_DB.exists():
+        _catalog_store = CatalogStore()
+        _catalog_store.add_listener(_refresh_changed_recommendations)
+    return _catalog_store
+
+def _refresh_changed_recommendations(old_products, new_products, version):
+    """Keeps the neighbor table current after incremental upserts through this process"""
+    store = local_catalog()
+    if store is not None and store.has_recommendations():
+        refresh_recommendations(store, changed_ids=[product["id"] for product in new_products])
+
+_columns = None
+
+def local_columns():
+    """Columnar snapshot of the local catalog, rebuilt when the catalog version changes"""
+    global _columns
+    store = local_catalog()
+    if store is None or store.version is None:
+        return None
+    key = (id(store), store.version)
+    if _columns is None or _columns[0] != key:
+        _columns = (key, ColumnarCatalog.from_products(store.iter_products()), None)
+    return _columns[1]
+
+def local_filter_index():
+    """Facet bitmaps over the columnar snapshot, built on first use"""
+    global _columns
+    columns = local_columns()
+    if columns is None:
+        return None
+    if _columns[2] is None:
+        _columns = (_columns[0], columns, FilterIndex(columns))
+    return _columns[2]
+
+_facets = None
+
+def local_facets():
+    """Category, subcategory and vendor counts of the local catalog
+    
+    Rebuilt from the columnar snapshot when another process changes the
+    catalog; upserts made through this process's store are applied in place.
+    """
+    global _facets
+    store = local_catalog()
+    if store is None or store.version is None:
+        return None
+    key = (id(store), store.version)
+    if _facets is None or _facets[0] != key:
+        if _facets is None or _facets[2] is not store:
+            store.add_listener(lambda old, new, version: _apply_facet_changes(store, old, new, version))
+        _facets = (key, FacetCatalog.from_columns(local_columns()), store)
+    return _facets[1]
+
+def _apply_facet_changes(store, old_products, new_products, version):
+    global _facets
+    if _facets is not None and _facets[2] is store:
+        _facets[1].apply(old_products, new_products)
+        _facets = ((id(store), version), _facets[1], store)
+
+def _first_variant_price(product, field):
+    value = (product.get("variants") or [{}])[0].get(field)
+    return float(value) if value not in (None, "") else None
+
+def _discount(product):
+    """Compare-at price minus price; 0 when the product is not on sale"""
+    price = _first_variant_price(product, "price")
+    compare_at = _first_variant_price(product, "compare_at_price")
+    return compare_at - price if price is not None and compare_at is not None else 0
 
 def transform_product_response(product):
     
@@ -70,28 +195,66 @@ def load_products_data():
         with open(PRODUCTS_FILE, 'r') as file:
             return json.load(file)
     except Exception as e:
-        print(f"Error loading products data: {e}")
+        logger.error(f"Error loading products data: {e}")
         return {"products": [], "categories": [], "brands": []}
 
+def _fetch_price_stock(product_ids):
+    """Current variant prices and stock of up to 250 products in one request"""
+    url = f"{SHOPIFY_API_URL}/products.json"
+    params = {"ids": ",".join(str(product_id) for product_id in product_ids), "fields": "id,variants", "limit": 250}
+    headers = {
+        "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY
+    }
+    response = _shopify_session.get(url, params=params, headers=headers, timeout=SHOPIFY_TIMEOUT)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Shopify API request failed: {response.status_code} - {response.text}")
+    return {
+        product["id"]: [{field: variant[field] for field in PRICE_STOCK_FIELDS if field in variant} for variant in product.get("variants") or []]
+        for product in response.json().get("products", [])
+    }
+
 def get_product_by_id(product_id):
-    """Fetch a specific product by ID from Shopify API"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/products/{product_id}.json"
+    """Fetch a specific product by ID from Shopify API
+    
+    Cached metadata is reused for hours; only its prices and stock are
+    refetched once they are older than PRICE_STOCK_TTL_SECS.
+    """
+    product = product_cache.metadata(product_id)
+    if product is not None:
+        product_cache.refresh([product_id], _fetch_price_stock)
+        return transform_product_response(product_cache.merge(product))
+    
+    url = f"{SHOPIFY_API_URL}/products/{product_id}.json"
     
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
     }
     
-    response = requests.get(url, headers=headers)
+    response = _hedged_get(url, headers=headers, timeout=SHOPIFY_TIMEOUT)
     
     if response.status_code != 200:
         return {"error": f"Shopify API request failed: {response.status_code} - {response.text}", "product_id": product_id}
     
     data = response.json()
-    return transform_product_response(data.get("product", {}))
+    product = data.get("product", {})
+    product_cache.remember(product)
+    return transform_product_response(product)
+
+def _parse_link_header(link_header):
+    """(next, previous) page_info cursors of a Shopify Link header"""
+    next_page_info = None
+    prev_page_info = None
+    if link_header:
+        for link in link_header.split(", "):
+            if 'rel="next"' in link and "page_info=" in link:
+                next_page_info = link.split("page_info=")[1].split(">")[0]
+            elif 'rel="previous"' in link and "page_info=" in link:
+                prev_page_info = link.split("page_info=")[1].split(">")[0]
+    return next_page_info, prev_page_info
 
 def get_all_products(limit=20, page_info=None):
     """Fetch all product IDs with pagination from Shopify API"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/products.json"
+    url = f"{SHOPIFY_API_URL}/products.json"
     
     params = {"limit": limit}
     if page_info:
@@ -101,7 +264,7 @@ def get_all_products(limit=20, page_info=None):
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
     }
 
-    response = requests.get(url, params=params, headers=headers)
+    response = _shopify_session.get(url, params=params, headers=headers, timeout=SHOPIFY_TIMEOUT)
 
     if response.status_code != 200:
         raise Exception(f"Shopify API request failed: {response.status_code} - {response.text}")
@@ -113,15 +276,7 @@ def get_all_products(limit=20, page_info=None):
     product_ids = [product["id"] for product in products]
 
     # Get pagination cursors
-    next_page_info = None
-    prev_page_info = None
-    if "Link" in response.headers:
-        links = response.headers["Link"].split(", ")
-        for link in links:
-            if 'rel="next"' in link and "page_info=" in link:
-                next_page_info = link.split("page_info=")[1].split(">")[0]
-            elif 'rel="previous"' in link and "page_info=" in link:
-                prev_page_info = link.split("page_info=")[1].split(">")[0]
+    next_page_info, prev_page_info = _parse_link_header(response.headers.get("Link"))
     
     return {
         "product_ids": product_ids,
@@ -131,18 +286,20 @@ def get_all_products(limit=20, page_info=None):
 
 def search_products(query, limit=10):
     """Search products by title using Shopify API and return product IDs"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/products.json"
+    url = f"{SHOPIFY_API_URL}/products.json"
     
+    # Only the ids are used; the products are hydrated later from the cache or by id
     params = {
         "title": query,
-        "limit": limit
+        "limit": limit,
+        "fields": "id"
     }
     
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
     }
     
-    response = requests.get(url, params=params, headers=headers)
+    response = _hedged_get(url, params=params, headers=headers, timeout=SHOPIFY_TIMEOUT)
     
     if response.status_code != 200:
         return {"error": f"Shopify API request failed: {response.status_code} - {response.text}", "query": query}
@@ -153,69 +310,162 @@ def search_products(query, limit=10):
     
     return {"product_ids": product_ids}
 
+def _product_colors(product):
+    colors = [color.lower() for color in product.get("colors") or []]
+    for option in product.get("options") or []:
+        if str(option.get("name", "")).lower() in ("color", "colour"):
+            colors.extend(str(value).lower() for value in option.get("values", []))
+    return colors
+
+def _matches(product, filters):
+    """Whether a REST product passes the filter_products criteria"""
+    vendor = filters.get("vendor") or filters.get("brand")
+    return all([
+        filters.get("category") is None or (category_of(product.get("product_type")) or "").lower() == filters["category"].lower(),
+        filters.get("subcategory") is None or str(product.get("subcategory") or product.get("product_type", "")).lower().endswith(filters["subcategory"].lower()),
+        vendor is None or product.get("vendor", "").lower() == vendor.lower(),
+        filters.get("min_price") is None or float(product.get("variants", [{}])[0].get("price", 0)) >= filters["min_price"],
+        filters.get("max_price") is None or float(product.get("variants", [{}])[0].get("price", 0)) <= filters["max_price"],
+        filters.get("min_rating") is None or (product.get("rating") or 0) >= filters["min_rating"],
+        filters.get("tags") is None or any(tag.lower() in map(str.lower, product.get("tags", "").split(", ")) for tag in filters["tags"]),
+        not filters.get("colors") or any(color.lower() in _product_colors(product) for color in filters["colors"]),
+        filters.get("in_stock") is None or any(int(variant.get("inventory_quantity", 0)) > 0 for variant in product.get("variants", []))
+    ])
+
+def _passes_price_stock(product_id, filters):
+    current = product_cache.price_stock(product_id)
+    if current is None:
+        return True
+    price, stock = current
+    if filters.get("in_stock") is not None and (stock > 0) != bool(filters["in_stock"]):
+        return False
+    if price is not None and filters.get("min_price") is not None and price < filters["min_price"]:
+        return False
+    if price is not None and filters.get("max_price") is not None and price > filters["max_price"]:
+        return False
+    return True
+
+def _recheck_price_stock(product_ids, filters, limit):
+    """Up to `limit` ids whose current price and stock still pass the filters, and how many ids were consumed
+
+    Only the ids that may end up on the page are refreshed: the first `limit`,
+    then as many more as were dropped, until the page is full.
+    """
+    kept, consumed = [], 0
+    while len(kept) < limit and consumed < len(product_ids):
+        chunk = product_ids[consumed:consumed + limit - len(kept)]
+        # Local-only setups have no Shopify to ask; the snapshot's values stand
+        if SHOPIFY_ACCESS_KEY:
+            product_cache.refresh(chunk, _fetch_price_stock, with_recent=False)
+        kept.extend(product_id for product_id in chunk if _passes_price_stock(product_id, filters))
+        consumed += len(chunk)
+    return kept, consumed
+
 def filter_products(**filters):
-    """Filter products from Shopify API by various criteria and return product IDs"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/products.json"
+    """Filter products by various criteria and return product IDs
+    
+    `brand` is accepted as an alias of `vendor`. With a local catalog the
+    total match count and facet counts of the matches are returned too,
+    and `next_offset`, the offset the following page starts at.
+    """
+    vendor = filters.get("vendor") or filters.get("brand")
+    limit = filters.get("limit") or 20
+    offset = filters.get("offset") or 0
+    
+    index = local_filter_index()
+    if index is not None:
+        # The snapshot's prices and stock may be hours old; when they decide the
+        # match, the page is rechecked against current values (with headroom for drops)
+        recheck = any(filters.get(key) is not None for key in ("in_stock", "min_price", "max_price"))
+        result = index.query(
+            category=filters.get("category"),
+            subcategory=filters.get("subcategory"),
+            vendor=vendor,
+            tags=filters.get("tags"),
+            colors=filters.get("colors"),
+            in_stock=filters.get("in_stock"),
+            min_price=filters.get("min_price"),
+            max_price=filters.get("max_price"),
+            min_rating=filters.get("min_rating"),
+            limit=limit * 2 if recheck else limit,
+            offset=offset,
+        )
+        product_ids = index.catalog.ids[result.rows].tolist()
+        total = result.total
+        consumed = len(product_ids)
+        if recheck:
+            # Rows dropped by the recheck are skipped, so the next page starts after the last row read
+            product_ids, consumed = _recheck_price_stock(product_ids, filters, limit)
+            total -= consumed - len(product_ids)
+        return {
+            "product_ids": product_ids,
+            "total": total,
+            "facets": result.facets,
+            "next_offset": offset + consumed,
+        }
     
-    params = {
-        "limit": filters.get("limit", 20),
-    }
+    url = f"{SHOPIFY_API_URL}/products.json"
     
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
     }
     
-    response = requests.get(url, params=params, headers=headers)
-    
-    if response.status_code != 200:
-        return {"error": f"Shopify API request failed: {response.status_code} - {response.text}"}
-    
-    data = response.json()
-    products = data.get("products", [])
-    
-    def matches(product):
-        return all([
-            filters.get("category") is None or product.get("product_type", "").lower() == filters["category"].lower(),
-            filters.get("vendor") is None or product.get("vendor", "").lower() == filters["vendor"].lower(),
-            filters.get("min_price") is None or float(product.get("variants", [{}])[0].get("price", 0)) >= filters["min_price"],
-            filters.get("max_price") is None or float(product.get("variants", [{}])[0].get("price", 0)) <= filters["max_price"],
-            filters.get("tags") is None or any(tag.lower() in map(str.lower, product.get("tags", "").split(", ")) for tag in filters["tags"]),
-            filters.get("in_stock") is None or any(int(variant.get("inventory_quantity", 0)) > 0 for variant in product.get("variants", []))
-        ])
-    
-    filtered_products = [product["id"] for product in products if matches(product)]
-    
-    return {"product_ids": filtered_products}
+    # Filters apply after fetching, so pages are read until offset + limit products matched
+    wanted = offset + limit
+    params = {"limit": FILTER_PAGE_SIZE}
+    filtered_products = []
+    for _ in range(FILTER_MAX_PAGES):
+        response = _shopify_session.get(url, params=params, headers=headers, timeout=SHOPIFY_TIMEOUT)
+        
+        if response.status_code != 200:
+            return {"error": f"Shopify API request failed: {response.status_code} - {response.text}"}
+        
+        data = response.json()
+        products = data.get("products", [])
+        
+        for product in products:
+            product_cache.remember(product)
+        filtered_products.extend(product["id"] for product in products if _matches(product, filters))
+        
+        next_page_info, _ = _parse_link_header(response.headers.get("Link"))
+        if len(filtered_products) >= wanted or not next_page_info or not products:
+            break
+        params = {"limit": FILTER_PAGE_SIZE, "page_info": next_page_info}
+    
+    return {"product_ids": filtered_products[offset:offset + limit]}
 
 def get_product_recommendations(product_id=None, user_preferences=None, limit=5):
-    """Fetch recommended product IDs from Shopify's recommendations API"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/products/{product_id}/recommendations.json"
-    
-    headers = {
-        "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
-    }
-    
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code != 200:
-        return {"error": f"Shopify API request failed: {response.status_code} - {response.text}", "product_id": product_id}
-    
-    data = response.json()
-    recommended_products = data.get("products", [])[:limit]
-    recommended_product_ids = [p["id"] for p in recommended_products]
-    
-    return {"product_ids": recommended_product_ids}
+    """Recommend similar product IDs from the precomputed neighbor table of the local catalog"""
+    store = local_catalog()
+    if store is None or not store.has_recommendations():
+        return {"error": "Recommendations are unavailable until the catalog has been indexed", "product_id": product_id}
+    
+    if product_id is None:
+        # Preferences alone: the products whose content words match them best
+        wanted = preference_words(user_preferences)
+        if not wanted:
+            return {"error": "Provide a product_id or user_preferences to recommend from"}
+        return {"product_ids": store.match_recommendation_words(wanted, limit)}
+    
+    neighbors = store.get_recommendations(product_id)
+    if neighbors is None:
+        return {"error": f"Product {product_id} not found in the local catalog", "product_id": product_id}
+    
+    # Preferences only reorder the precomputed neighbors, so this stays a single lookup
+    words = store.get_recommendation_words([pair[0] for pair in neighbors]) if user_preferences and neighbors else {}
+    
+    return {"product_ids": rerank(neighbors, words, user_preferences, limit)}
 
 def get_trending_products(limit=5):
     """Fetch trending products from Shopify API based on sales data"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/products.json"
+    url = f"{SHOPIFY_API_URL}/products.json"
     
     params = {"limit": 50}  # Fetch a larger set of products to determine trending ones
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
     }
     
-    response = requests.get(url, params=params, headers=headers)
+    response = _shopify_session.get(url, params=params, headers=headers, timeout=SHOPIFY_TIMEOUT)
     
     if response.status_code != 200:
         return {"error": f"Shopify API request failed: {response.status_code} - {response.text}"}
@@ -230,38 +480,72 @@ def get_trending_products(limit=5):
     return {"product_ids": trending_ids}
 
 def get_deals_of_the_day(limit=5):
-    """Fetch products with the highest discounts from Shopify API"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/products.json"
+    """Fetch products with the highest discounts"""
+    columns = local_columns()
+    if columns is not None:
+        return {"product_ids": columns.ids[columns.discount_order(limit)].tolist()}
+    
+    url = f"{SHOPIFY_API_URL}/products.json"
     
-    params = {"limit": 250}  # Fetch max products per request
+    params = {"limit": 250, "fields": "id,variants"}  # Fetch max products per request
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
     }
     
-    response = requests.get(url, params=params, headers=headers)
+    response = _shopify_session.get(url, params=params, headers=headers, timeout=SHOPIFY_TIMEOUT)
     
     if response.status_code != 200:
         return {"error": f"Shopify API request failed: {response.status_code} - {response.text}"}
     
-    data = response.json()
-    products = data.get("products", [])
-    
-    # Sort by discount (assuming discount info is in product variants or metafields)
-    deals = sorted(products, key=lambda p: float(p.get("variants", [{}])[0].get("compare_at_price", 0)) - float(p.get("variants", [{}])[0].get("price", 0)), reverse=True)
+    # fields= keeps the page small (ids and variants only), so a plain json parse is cheapest
+    deals = heapq.nlargest(limit, response.json().get("products", []), key=_discount)
     
-    deals_ids = [p["id"] for p in deals[:limit]]
+    deals_ids = [p["id"] for p in deals]
     
     return {"product_ids": deals_ids}
 
+def get_catalog_version():
+    """Cheap fingerprint of the Shopify catalog: product count plus latest update time"""
+    headers = {
+        "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
+    }
+    
+    try:
+        return _fetch_catalog_version(headers)
+    except requests.RequestException:
+        return None
+
+def _fetch_catalog_version(headers):
+    count_response = _shopify_session.get(f"{SHOPIFY_API_URL}/products/count.json", headers=headers, timeout=SHOPIFY_TIMEOUT)
+    latest_response = _shopify_session.get(
+        f"{SHOPIFY_API_URL}/products.json",
+        params={"limit": 1, "order": "updated_at desc", "fields": "id,updated_at"},
+        headers=headers,
+        timeout=SHOPIFY_TIMEOUT,
+    )
+    
+    if count_response.status_code != 200 or latest_response.status_code != 200:
+        return None
+    
+    count = count_response.json().get("count", 0)
+    latest = latest_response.json().get("products", [])
+    updated_at = latest[0].get("updated_at") if latest else None
+    
+    return f"{count}:{updated_at}"
+
 def get_categories():
-    """Fetch all product categories from Shopify API"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/smart_collections.json"
+    """Product categories with subcategories and product counts, from the local catalog when indexed"""
+    facets = local_facets()
+    if facets is not None:
+        return {"categories": facets.categories()}
+    
+    url = f"{SHOPIFY_API_URL}/smart_collections.json"
     
     headers = {
         "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
     }
     
-    response = requests.get(url, headers=headers)
+    response = _hedged_get(url, headers=headers, timeout=SHOPIFY_TIMEOUT)
     
     if response.status_code != 200:
         return {"error": f"Shopify API request failed: {response.status_code} - {response.text}"}
@@ -272,27 +556,59 @@ def get_categories():
     return {"categories": categories}
 
 def get_brands(category=None):
-
-    """Fetch all brands from Shopify, optionally filtered by category"""
-    url = f"https://{SHOPIFY_STORE_NAME}.myshopify.com/admin/api/2025-01/smart_collections.json"
-    
-    headers = {
-        "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
-    }
-    
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code != 200:
-        return {"error": f"Shopify API request failed: {response.status_code} - {response.text}"}
+    """Brands (product vendors) with product counts, optionally within a category or subcategory"""
+    facets = local_facets()
+    if facets is None:
+        url = f"{SHOPIFY_API_URL}/products.json"
+        
+        params = {"limit": 250, "fields": "id,vendor,product_type"}
+        headers = {
+            "X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY    
+        }
+        
+        response = _hedged_get(url, params=params, headers=headers, timeout=SHOPIFY_TIMEOUT)
+        
+        if response.status_code != 200:
+            return {"error": f"Shopify API request failed: {response.status_code} - {response.text}"}
+        
+        # Without a local catalog, brands are counted over the first page of products only
+        facets = FacetCatalog.from_products(response.json().get("products", []))
     
-    data = response.json()
-    brands = data.get("smart_collections", [])
+    brands = facets.brands(category)
     
     if category:
-        filtered_brands = [brand for brand in brands if brand.get("handle") == category]
-        return {"brands": filtered_brands, "category": category}
+        return {"brands": brands, "category": category}
     
     return {"brands": brands}
 
-print(get_all_products(20))
-print(get_product_by_id(7336674557995))
\ No newline at end of file
+# Local catalog equivalents of the Shopify reads, used when Shopify is failing or slow.
+# Each returns None when there is no local catalog to answer from.
+def _local_product_by_id(product_id):
+    store = local_catalog()
+    product = store.get(product_id) if store else None
+    return transform_product_response(product_cache.merge(product)) if product else None
+
+def _local_search_products(query, limit=10):
+    store = local_catalog()
+    if store is None:
+        return None
+    return {"product_ids": store.search_titles(query, limit)}
+
+def _local_all_products(limit=20, page_info=None):
+    columns = local_columns()
+    if columns is None:
+        return None
+    # page_info from the local fallback is a plain offset
+    offset = int(page_info) if page_info and str(page_info).isdigit() else 0
+    ids = columns.ids[offset:offset + limit].tolist()
+    return {
+        "product_ids": ids,
+        "next_page_info": str(offset + limit) if offset + limit < len(columns) else None,
+        "prev_page_info": str(max(offset - limit, 0)) if offset else None,
+    }
+
+LOCAL_FALLBACKS = {
+    "get_product_by_id": _local_product_by_id,
+    "search_products": _local_search_products,
+    "get_all_products": _local_all_products,
+}
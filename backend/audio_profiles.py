@@ -0,0 +1,125 @@
+import os
+from dataclasses import dataclass, fields, replace
+
+# Environment variable used to select a preset, e.g. AUDIO_PROFILE=low-latency
+AUDIO_PROFILE_ENV = "AUDIO_PROFILE"
+DEFAULT_PROFILE = "balanced"
+
+
+@dataclass(frozen=True)
+class AudioProfile:
+    """Audio settings for the STT -> LLM -> TTS pipeline.
+
+    The input frame size is fixed by the Daily transport (20 ms), so the
+    tunable frame duration is the output side: `out_chunk_ms` is rounded to
+    the 10 ms chunks the transport writes.
+    """
+
+    name: str
+    sample_rate: int = 16000
+    out_chunk_ms: int = 40
+    stt_model: str = "nova-2-general"
+    endpointing_ms: int = 300
+    interim_results: bool = False
+    # Start the LLM on a stable interim transcript (needs interim_results)
+    early_llm: bool = False
+    vad_enabled: bool = False
+    vad_confidence: float = 0.7
+    vad_start_secs: float = 0.2
+    vad_stop_secs: float = 0.8
+
+    @property
+    def out_10ms_chunks(self) -> int:
+        return max(1, round(self.out_chunk_ms / 10))
+
+    def transport_params(self) -> dict:
+        """Keyword arguments for DailyParams."""
+        params = {
+            "audio_in_enabled": True,
+            "audio_out_enabled": True,
+            "audio_in_sample_rate": self.sample_rate,
+            "audio_out_sample_rate": self.sample_rate,
+            "audio_out_10ms_chunks": self.out_10ms_chunks,
+        }
+        if self.vad_enabled:
+            # Imported lazily so the presets can be inspected without onnxruntime
+            from pipecat.audio.vad.silero import SileroVADAnalyzer
+            from pipecat.audio.vad.vad_analyzer import VADParams
+
+            params.update(
+                vad_enabled=True,
+                vad_audio_passthrough=True,
+                vad_analyzer=SileroVADAnalyzer(
+                    sample_rate=self.sample_rate,
+                    params=VADParams(
+                        confidence=self.vad_confidence,
+                        start_secs=self.vad_start_secs,
+                        stop_secs=self.vad_stop_secs,
+                    ),
+                ),
+            )
+        return params
+
+    def live_options(self) -> dict:
+        """Keyword arguments for Deepgram LiveOptions."""
+        return {
+            "model": self.stt_model,
+            "language": "en-US",
+            "punctuate": True,
+            "interim_results": self.interim_results,
+            "endpointing": self.endpointing_ms,
+            # Deepgram VAD events are only needed when Silero isn't running locally
+            "vad_events": not self.vad_enabled,
+        }
+
+
+PRESETS = {
+    # Matches the settings the bot shipped with
+    "balanced": AudioProfile(name="balanced"),
+    # Local VAD with a short stop window, interim results and early LLM start.
+    # Smaller output chunks get the first audio out sooner at the cost of more
+    # frames per second through the pipeline.
+    "low-latency": AudioProfile(
+        name="low-latency",
+        out_chunk_ms=20,
+        endpointing_ms=150,
+        interim_results=True,
+        early_llm=True,
+        vad_enabled=True,
+        vad_stop_secs=0.35,
+    ),
+    # Fewer, larger frames and no local VAD model
+    "low-cpu": AudioProfile(
+        name="low-cpu",
+        out_chunk_ms=100,
+        endpointing_ms=500,
+    ),
+}
+
+
+def _parse_env_value(raw: str, current):
+    if isinstance(current, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    return type(current)(raw)
+
+
+def load_audio_profile(name=None, environ=None) -> AudioProfile:
+    """Resolve the audio profile from a preset name plus env overrides.
+
+    Any field can be overridden with AUDIO_<FIELD>, for example
+    AUDIO_VAD_STOP_SECS=0.5 or AUDIO_SAMPLE_RATE=24000.
+    """
+    environ = os.environ if environ is None else environ
+    name = name or environ.get(AUDIO_PROFILE_ENV, DEFAULT_PROFILE)
+    if name not in PRESETS:
+        raise ValueError(f"Unknown audio profile '{name}'. Available: {', '.join(PRESETS)}")
+
+    profile = PRESETS[name]
+    overrides = {}
+    for field in fields(AudioProfile):
+        if field.name == "name":
+            continue
+        raw = environ.get(f"AUDIO_{field.name.upper()}")
+        if raw is not None:
+            overrides[field.name] = _parse_env_value(raw, getattr(profile, field.name))
+    return replace(profile, **overrides) if overrides else profile
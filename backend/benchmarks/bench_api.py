@@ -0,0 +1,215 @@
+"""Microbenchmarks for the CPU-bound paths of api.py, checked against stored baselines.
+
+    python3 -m benchmarks.bench_api                       # compare with baselines_api.json
+    python3 -m benchmarks.bench_api --sizes 1000,10000    # quicker subset
+    python3 -m benchmarks.bench_api --update-baselines    # record new baselines
+
+Cases:
+- transform: transform_product_response on products with 100 and 500 variants
+- link_header: the Link header cursor parsing of get_all_products
+- matches: the filter_products predicate with a typical multi-criteria filter
+- deals: the get_deals_of_the_day discount top-k over the catalog
+- deals_page: parsing one 250-product products.json page and taking its top
+  discounts, for the full page and for the fields=id,variants projection
+  get_deals_of_the_day requests
+
+Catalogs come from benchmarks.catalog_gen, so everything runs offline.
+Above POOL_SIZE products, the generated pool is repeated instead of
+holding a million product dicts in memory. Timings are divided by the time of a
+fixed pure-Python calibration loop, so baselines roughly carry across machines.
+Each case reports the median of several samples of at least MIN_SAMPLE_SECS.
+The run exits with status 1 when a case is more than --threshold slower than
+its baseline, and stays that slow when it is measured again CONFIRM_RUNS times.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from api import _discount, _matches, _parse_link_header, transform_product_response
+from benchmarks.catalog_gen import generate_product, generate_products
+
+BASELINES_FILE = Path(__file__).with_name("baselines_api.json")
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+POOL_SIZE = 20_000
+# Products per Shopify REST page
+PAGE_SIZE = 250
+# Separate runs of an unchanged tree differ by up to ~20% on shared machines
+DEFAULT_THRESHOLD = 0.35
+# A flagged case is measured again this many times and only reported if it stays slow
+CONFIRM_RUNS = 2
+# Shortest timed sample; fast cases are repeated within a sample to reach it
+MIN_SAMPLE_SECS = 0.05
+FILTERS = {"category": "Shoes", "min_price": 20, "max_price": 300, "tags": ["sale", "new"], "colors": ["Black", "Red"], "in_stock": True}
+
+
+def _calibration_loop():
+    total = 0
+    for i in range(200_000):
+        total += i % 7
+    return total
+
+
+def timed(fn, loops):
+    """Seconds per call of fn(), over `loops` back-to-back calls."""
+    started = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return (time.perf_counter() - started) / loops
+
+
+def autorange(fn, min_secs=MIN_SAMPLE_SECS):
+    """Calls per sample so one sample takes at least `min_secs` (timer and scheduler noise stay small)."""
+    loops = 1
+    while timed(fn, loops) * loops < min_secs and loops < 1 << 16:
+        loops *= 2
+    return loops
+
+
+def catalog(size, pool):
+    return itertools.islice(itertools.cycle(pool), size)
+
+
+def wide_product(variant_count, seed=0):
+    """A product with `variant_count` variants (e.g. size x color x material)."""
+    rng = random.Random(seed)
+    product = generate_product(1, rng)
+    template = product["variants"][0]
+    product["variants"] = [
+        {**template, "id": 10_000 + i, "title": f"Variant {i}", "option1": f"Option {i}", "position": i + 1,
+         "sku": f"SKU-{i}", "grams": rng.randint(50, 2000), "weight": 1.0, "weight_unit": "kg"}
+        for i in range(variant_count)
+    ]
+    return product
+
+
+def link_headers(count, seed=0):
+    rng = random.Random(seed)
+    base = "https://shop.myshopify.com/admin/api/2025-01/products.json?limit=250&page_info="
+    token = lambda: "".join(rng.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=64))
+    return [f'<{base}{token()}>; rel="previous", <{base}{token()}>; rel="next"' for _ in range(count)]
+
+
+def products_page(pool, fields=None):
+    """Serialized products.json page, optionally projected like Shopify's fields= parameter."""
+    products = pool[:PAGE_SIZE]
+    if fields:
+        products = [{field: product[field] for field in fields if field in product} for product in products]
+    return json.dumps({"products": products}).encode()
+
+
+def deals_from_page(page):
+    return [p["id"] for p in heapq.nlargest(5, json.loads(page).get("products", []), key=_discount)]
+
+
+def cases(sizes):
+    """(name, items processed, function) for every benchmark case."""
+    pool = list(generate_products(min(max(sizes), POOL_SIZE)))
+    headers = link_headers(1_000)
+    for variant_count in (100, 500):
+        product = wide_product(variant_count)
+        yield f"transform[{variant_count} variants]", 100, lambda product=product: [transform_product_response(product) for _ in range(100)]
+    yield "link_header", 10_000, lambda: [_parse_link_header(header) for header in headers for _ in range(10)]
+    for label, fields in (("full", None), ("projected", ("id", "variants"))):
+        page = products_page(pool, fields)
+        yield f"deals_page[{label}]", PAGE_SIZE, lambda page=page: deals_from_page(page)
+    for size in sizes:
+        yield f"matches[{size}]", size, lambda size=size: [p["id"] for p in catalog(size, pool) if _matches(p, FILTERS)]
+        yield f"deals[{size}]", size, lambda size=size: heapq.nlargest(20, catalog(size, pool), key=_discount)
+
+
+def run(sizes, repeat=7, names=None):
+    """Per-item time of every case, in microseconds and relative to the calibration loop.
+
+    Each sample times the calibration loop right before the case, so a
+    machine that slows down mid-run (CPU throttling, noisy neighbours) moves
+    both. The reported values are medians over `repeat` samples. Every sample
+    lasts at least MIN_SAMPLE_SECS, so fast cases run many times per sample.
+    """
+    calibration_loops = autorange(_calibration_loop)
+    results = {}
+    for name, items, fn in cases(sizes):
+        if names is not None and name not in names:
+            continue
+        # Large catalogs take seconds per call; a few samples are enough there
+        large = items >= 1_000_000
+        loops = 1 if large else autorange(fn)
+        seconds, ratios = [], []
+        for _ in range(min(repeat, 3) if large else repeat):
+            reference = timed(_calibration_loop, calibration_loops)
+            elapsed = timed(fn, loops)
+            seconds.append(elapsed)
+            ratios.append(elapsed / reference)
+        results[name] = {
+            "per_item_us": round(statistics.median(seconds) / items * 1e6, 3),
+            "relative": float(f"{statistics.median(ratios) / items:.4g}"),
+        }
+    return results
+
+
+def compare(results, baselines, threshold=DEFAULT_THRESHOLD):
+    """Names of the cases whose relative time exceeds the baseline by more than `threshold`."""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline and result["relative"] > baseline["relative"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def confirmed_regressions(results, baselines, sizes, repeat=7, threshold=DEFAULT_THRESHOLD, runs=CONFIRM_RUNS):
+    """Cases still slower than the threshold after `runs` fresh measurements; `results` keeps the last one."""
+    regressions = compare(results, baselines, threshold)
+    for _ in range(runs):
+        if not regressions:
+            break
+        rerun = run(sizes, repeat, names=set(regressions))
+        results.update(rerun)
+        regressions = compare(rerun, baselines, threshold)
+    return regressions
+
+
+def load_baselines(path=BASELINES_FILE):
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def format_table(results, baselines):
+    lines = [f"{'case':<28}{'us/item':>12}{'baseline':>12}{'change':>10}"]
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        change = f"{result['relative'] / baseline['relative'] - 1:+.0%}" if baseline else "new"
+        baseline_us = f"{baseline['per_item_us']:.3f}" if baseline else "-"
+        lines.append(f"{name:<28}{result['per_item_us']:>12.3f}{baseline_us:>12}{change:>10}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU microbenchmarks for api.py hot paths")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Comma-separated catalog sizes")
+    parser.add_argument("--repeat", type=int, default=7, help="Samples per case (the median is reported)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown, e.g. 0.35 for 35%%")
+    parser.add_argument("--baselines", default=str(BASELINES_FILE))
+    parser.add_argument("--update-baselines", action="store_true", help="Store this run as the new baselines")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes, args.repeat)
+    baselines = load_baselines(args.baselines)
+    print(format_table(results, baselines))
+
+    if args.update_baselines:
+        Path(args.baselines).write_text(json.dumps({**baselines, **results}, indent=2, sort_keys=True) + "\n")
+        print(f"Baselines written to {args.baselines}")
+        sys.exit(0)
+
+    regressions = confirmed_regressions(results, baselines, sizes, args.repeat, args.threshold)
+    if regressions:
+        print(format_table({name: results[name] for name in regressions}, baselines))
+        print(f"Regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
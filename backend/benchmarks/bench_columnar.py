@@ -0,0 +1,74 @@
+"""Memory per product and scan throughput: list of product dicts vs the columnar catalog.
+
+    python3 -m benchmarks.bench_columnar --products 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.catalog_gen import generate_products
+from columnar import ColumnarCatalog
+
+
+def _price(product):
+    return float(product["variants"][0]["price"])
+
+
+def _discount(product):
+    variant = product["variants"][0]
+    compare_at = variant.get("compare_at_price")
+    return float(compare_at) - float(variant["price"]) if compare_at else 0
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    try:
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(count, repeat=5, seed=0):
+    products, dict_bytes = measure_memory(lambda: list(generate_products(count, seed)))
+    catalog, columnar_bytes = measure_memory(lambda: ColumnarCatalog.from_products(products))
+
+    scans = {
+        "price_range": (
+            lambda: [p["id"] for p in products if 50 <= _price(p) <= 150],
+            lambda: catalog.ids[catalog.price_range_mask(50, 150)],
+        ),
+        "top_20_discounts": (
+            lambda: sorted(products, key=_discount, reverse=True)[:20],
+            lambda: catalog.discount_order(limit=20),
+        ),
+    }
+    results = {
+        "products": count,
+        "dict_bytes_per_product": dict_bytes / count,
+        "columnar_bytes_per_product": columnar_bytes / count,
+    }
+    for name, (baseline, columnar) in scans.items():
+        results[f"{name}_dict_products_per_s"] = count / best_of(baseline, repeat)
+        results[f"{name}_columnar_products_per_s"] = count / best_of(columnar, repeat)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for key, value in run(args.products, args.repeat).items():
+        print(f"{key:40} {value:>16,.1f}")
@@ -0,0 +1,82 @@
+"""Event-loop time spent logging per audio frame: synchronous vs enqueued vs enqueued and sampled.
+
+An asyncio loop ticks every --tick-ms (one audio chunk) and logs --records
+pipecat-style DEBUG records per tick into a sink that blocks for --write-us
+per write, as stderr does when its pipe is backed up. The time each tick's
+logging holds the loop is time the audio pipeline can't run.
+
+    python3 -m benchmarks.bench_logging --ticks 200 --write-us 200
+"""
+import argparse
+import asyncio
+import time
+
+from loguru import logger
+
+from latency import summarize
+from logging_setup import configure_logging
+
+MODES = {
+    "sync": {"enqueue": False, "sampling": "", "rate_limit": 0},
+    "enqueue": {"enqueue": True, "sampling": "", "rate_limit": 0},
+    "enqueue+sampled": {"enqueue": True, "sampling": "pipecat=0.1", "rate_limit": 50},
+}
+
+
+class SlowSink:
+    def __init__(self, write_us):
+        self.write_s = write_us / 1e6
+        self.writes = 0
+
+    def write(self, message):
+        # Sleeping releases the GIL, like a write() blocked on a full pipe
+        time.sleep(self.write_s)
+        self.writes += 1
+
+
+async def tick_loop(ticks, tick_ms, records):
+    frame_logger = logger.patch(lambda record: record.update(name="pipecat.transports.base_output"))
+    blocked = []
+    loop = asyncio.get_running_loop()
+    scheduled = loop.time()
+    for tick in range(ticks):
+        scheduled += tick_ms / 1000
+        started = time.perf_counter()
+        for index in range(records):
+            frame_logger.debug(f"Pushing OutputAudioRawFrame #{tick}.{index}")
+        blocked.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(max(0.0, scheduled - loop.time()))
+    return blocked
+
+
+def run_mode(mode, ticks, tick_ms, records, write_us):
+    sink = SlowSink(write_us)
+    configure_logging("bench", level="DEBUG", sink=sink.write, **MODES[mode])
+    started = time.perf_counter()
+    blocked = asyncio.run(tick_loop(ticks, tick_ms, records))
+    elapsed = time.perf_counter() - started
+    # Waits for an enqueued sink to drain
+    logger.remove()
+    stats = summarize(blocked)
+    return {"mode": mode, "p50_ms": stats["p50_ms"], "p90_ms": stats["p90_ms"], "max_ms": stats["max_ms"],
+            "elapsed_s": round(elapsed, 2), "writes": sink.writes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--tick-ms", type=float, default=20)
+    parser.add_argument("--records", type=int, default=10, help="DEBUG records logged per tick")
+    parser.add_argument("--write-us", type=float, default=200, help="Time the sink takes per write")
+    args = parser.parse_args()
+
+    print(f"Loop time blocked per tick by logging ({args.records} records, {args.write_us:.0f} us/write)")
+    print(f"{'mode':<18}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}{'elapsed s':>11}{'writes':>9}")
+    for mode in MODES:
+        result = run_mode(mode, args.ticks, args.tick_ms, args.records, args.write_us)
+        print(f"{mode:<18}{result['p50_ms']:>10.3f}{result['p90_ms']:>10.3f}{result['max_ms']:>10.3f}"
+              f"{result['elapsed_s']:>11}{result['writes']:>9}")
+
+
+if __name__ == "__main__":
+    main()
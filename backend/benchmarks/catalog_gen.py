@@ -0,0 +1,46 @@
+"""Deterministic synthetic catalogs in the Shopify REST products.json shape."""
+import random
+
+VENDORS = [f"Vendor {i}" for i in range(200)]
+PRODUCT_TYPES = ["Shoes", "Shirts", "Pants", "Hats", "Bags", "Electronics", "Audio", "Kitchen", "Toys", "Beauty"]
+TAGS = ["sale", "new", "bestseller", "eco", "limited", "gift", "clearance", "premium", "summer", "winter",
+        "wireless", "leather", "cotton", "waterproof", "vegan"]
+COLORS = ["Black", "White", "Red", "Blue", "Green", "Grey", "Brown", "Pink"]
+
+
+def generate_product(product_id, rng):
+    price = round(rng.uniform(5, 500), 2)
+    on_sale = rng.random() < 0.3
+    colors = rng.sample(COLORS, rng.randint(1, 3))
+    return {
+        "id": product_id,
+        "title": f"Product {product_id}",
+        "vendor": rng.choice(VENDORS),
+        "product_type": rng.choice(PRODUCT_TYPES),
+        "tags": ", ".join(rng.sample(TAGS, rng.randint(0, 4))),
+        "status": "active",
+        "updated_at": "2025-01-01T00:00:00Z",
+        "rating": round(rng.uniform(1, 5), 1) if rng.random() < 0.7 else None,
+        "options": [{"name": "Color", "position": 1, "values": colors}],
+        "variants": [
+            {
+                "id": product_id * 10 + position,
+                "product_id": product_id,
+                "title": color,
+                "price": f"{price:.2f}",
+                "compare_at_price": f"{price * rng.uniform(1.05, 1.8):.2f}" if on_sale else None,
+                "position": position + 1,
+                "inventory_quantity": rng.choice([0, 0, 1, 5, 20, 100]),
+                "option1": color,
+            }
+            for position, color in enumerate(colors)
+        ],
+        "image": {"id": product_id, "product_id": product_id, "src": f"https://cdn.example.com/{product_id}.jpg"},
+    }
+
+
+def generate_products(count, seed=0):
+    """Yield `count` products; the same seed always yields the same catalog."""
+    rng = random.Random(seed)
+    for product_id in range(1, count + 1):
+        yield generate_product(product_id, rng)
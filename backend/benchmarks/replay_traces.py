@@ -0,0 +1,282 @@
+"""Replay captured tool traces and report latency per tool.
+
+Record traces in production with TOOL_TRACE_PATH set (see tracing.py), then
+replay them from the backend directory against the local catalog:
+
+    python3 -m benchmarks.replay_traces traces.jsonl --target local
+
+or against an in-process mock Shopify with a fixed response delay, at 10x
+the recorded pace:
+
+    python3 -m benchmarks.replay_traces traces.jsonl --target mock --mock-latency-ms 150 --speed 10
+
+Sessions replay concurrently, each in recorded order. With --speed 0, calls
+run back to back. Use --json to save the results of a run to compare
+before/after a cache, index or pool change.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import api
+from benchmarks.catalog_gen import generate_product, generate_products
+from catalog import CATALOG_DB, CatalogStore
+from cursors import CURSOR_FETCH_LIMIT
+from latency import summarize
+from tracing import load_traces
+
+TOOL_FUNCTIONS = [
+    "get_all_products", "search_products", "filter_products", "get_product_recommendations",
+    "get_trending_products", "get_deals_of_the_day", "get_categories", "get_brands", "get_product_by_id",
+]
+# Upper bounds (ms) of the histogram buckets
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+
+
+def api_calls(tool, args):
+    """The API calls the bot.py handler for `tool` makes, as (function name, args, kwargs).
+
+    next_page is answered from memory and makes none.
+    """
+    if tool == "get_all_products":
+        return [("get_all_products", (), {"limit": args.get("limit", 20), "page_info": args.get("page_info")})]
+    if tool == "search_products":
+        return [("search_products", (args.get("query", ""), CURSOR_FETCH_LIMIT), {})]
+    if tool == "filter_products":
+        filters = {key: args.get(key) for key in
+                   ("category", "subcategory", "min_price", "max_price", "min_rating", "colors", "tags", "in_stock")}
+        filters["brand"] = args.get("brand") or args.get("vendor")
+        return [("filter_products", (), {**filters, "limit": CURSOR_FETCH_LIMIT, "offset": args.get("offset", 0)})]
+    if tool == "get_product_recommendations":
+        return [("get_product_recommendations", (args.get("product_id"), args.get("user_preferences"), args.get("limit", 5)), {})]
+    if tool in ("get_trending_products", "get_deals_of_the_day"):
+        return [(tool, (args.get("limit", 5),), {})]
+    if tool == "get_categories":
+        return [("get_categories", (), {})]
+    if tool == "get_brands":
+        return [("get_brands", (args.get("category"),), {})]
+    if tool == "display_products_to_user":
+        return [("get_product_by_id", (product_id,), {}) for product_id in args.get("product_ids", [])]
+    return []
+
+
+class MockShopify:
+    """Minimal Shopify Admin REST stand-in over a generated catalog.
+
+    Serves products.json (title search, fields, page_info paging),
+    products/<id>.json, products/count.json and smart_collections.json,
+    each after `latency_ms` (+/- `jitter_ms`). Unknown product ids get a
+    generated product, so ids from real traces resolve.
+    """
+
+    def __init__(self, products, latency_ms=0, jitter_ms=0):
+        self.products = list(products)
+        self.by_id = {product["id"]: product for product in self.products}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def product(self, product_id):
+        return self.by_id.get(product_id) or generate_product(product_id, random.Random(product_id))
+
+    def respond(self, path, query):
+        """(status, body, headers) for a GET."""
+        if path == "/products/count.json":
+            return 200, {"count": len(self.products)}, {}
+        match = re.fullmatch(r"/products/(\d+)\.json", path)
+        if match:
+            return 200, {"product": self.product(int(match.group(1)))}, {}
+        if path == "/smart_collections.json":
+            types = sorted({product["product_type"] for product in self.products})
+            return 200, {"smart_collections": [{"title": title} for title in types]}, {}
+        if path != "/products.json":
+            return 404, {"errors": "Not Found"}, {}
+
+        products = self.products
+        title = query.get("title")
+        if title:
+            products = [product for product in products if title.lower() in product["title"].lower()]
+        limit = min(int(query.get("limit", 50)), 250)
+        offset = int(query.get("page_info", 0))
+        page = products[offset:offset + limit]
+        fields = query.get("fields")
+        if fields:
+            keep = fields.split(",")
+            page = [{key: product[key] for key in keep if key in product} for product in page]
+        headers = {}
+        if offset + limit < len(products):
+            headers["Link"] = f'<{self.url}/products.json?limit={limit}&page_info={offset + limit}>; rel="next"'
+        return 200, {"products": page}, headers
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                mock.requests += 1
+                delay_ms = mock.latency_ms + random.uniform(-mock.jitter_ms, mock.jitter_ms)
+                if delay_ms > 0:
+                    time.sleep(delay_ms / 1000)
+                parsed = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                status, body, headers = mock.respond(parsed.path, query)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@contextmanager
+def target_functions(target, catalog_db=CATALOG_DB, mock=None):
+    """API functions by name, answering from the local catalog or the mock Shopify."""
+    saved = (api.local_catalog, api.SHOPIFY_API_URL)
+    try:
+        if target == "local":
+            store = CatalogStore(catalog_db)
+            api.local_catalog = lambda: store
+            functions = {name: api.LOCAL_FALLBACKS.get(name, getattr(api, name)) for name in TOOL_FUNCTIONS}
+        else:
+            # Without a local catalog every call takes the REST path
+            api.local_catalog = lambda: None
+            api.SHOPIFY_API_URL = mock.url
+            functions = {name: getattr(api, name) for name in TOOL_FUNCTIONS}
+        yield functions
+    finally:
+        api.local_catalog, api.SHOPIFY_API_URL = saved
+
+
+def _replay_session(records, functions, speed, started):
+    timings = []
+    first_ts = records[0].get("ts", 0)
+    for record in records:
+        if speed:
+            wait = (record.get("ts", first_ts) - first_ts) / speed - (time.perf_counter() - started)
+            if wait > 0:
+                time.sleep(wait)
+        calls = api_calls(record["tool"], record.get("args") or {})
+        call_started = time.perf_counter()
+        errors = 0
+        for name, args, kwargs in calls:
+            try:
+                result = functions[name](*args, **kwargs)
+                errors += isinstance(result, dict) and "error" in result
+            except Exception:
+                errors += 1
+        timings.append({
+            "tool": record["tool"],
+            "ms": (time.perf_counter() - call_started) * 1000,
+            "recorded_ms": record.get("ms"),
+            "calls": len(calls),
+            "errors": errors,
+        })
+    return timings
+
+
+def replay(records, functions, speed=1.0, max_sessions=32):
+    """Replay trace records; returns one timing dict per record."""
+    sessions = defaultdict(list)
+    for record in records:
+        sessions[record.get("session")].append(record)
+    if not sessions:
+        return []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(len(sessions), max_sessions)) as executor:
+        results = executor.map(lambda session: _replay_session(session, functions, speed, started), sessions.values())
+        return [timing for timings in results for timing in timings]
+
+
+def histogram(values_ms, buckets=HISTOGRAM_BUCKETS_MS):
+    counts = [0] * len(buckets)
+    for value in values_ms:
+        counts[next(i for i, bound in enumerate(buckets) if value <= bound)] += 1
+    return counts
+
+
+def summarize_timings(timings):
+    by_tool = defaultdict(list)
+    for timing in timings:
+        by_tool[timing["tool"]].append(timing)
+    summary = {}
+    for tool, entries in sorted(by_tool.items()):
+        replayed = [entry["ms"] for entry in entries]
+        recorded = [entry["recorded_ms"] for entry in entries if entry["recorded_ms"] is not None]
+        summary[tool] = {
+            **summarize(replayed),
+            "recorded_p50_ms": summarize(recorded)["p50_ms"],
+            "errors": sum(entry["errors"] for entry in entries),
+            "histogram": histogram(replayed),
+        }
+    return summary
+
+
+def format_report(summary):
+    lines = [f"{'tool':<30}{'calls':>7}{'p50 ms':>9}{'p90 ms':>9}{'max ms':>9}{'rec p50':>9}{'errors':>8}"]
+    for tool, stats in summary.items():
+        cells = [f"{stats[key]:.1f}" if stats[key] is not None else "-" for key in ("p50_ms", "p90_ms", "max_ms", "recorded_p50_ms")]
+        lines.append(f"{tool:<30}{stats['turns']:>7}" + "".join(f"{cell:>9}" for cell in cells) + f"{stats['errors']:>8}")
+    lines.append("")
+    labels = [f"<={bound:g}" if bound != float("inf") else ">" + f"{HISTOGRAM_BUCKETS_MS[-2]:g}" for bound in HISTOGRAM_BUCKETS_MS]
+    for tool, stats in summary.items():
+        lines.append(tool)
+        most = max(stats["histogram"]) or 1
+        for label, count in zip(labels, stats["histogram"]):
+            if count:
+                lines.append(f"  {label:>8} ms {'#' * max(1, round(count / most * 40))} {count}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay tool traces and report latency per tool")
+    parser.add_argument("traces", nargs="+", help="JSONL files written via TOOL_TRACE_PATH")
+    parser.add_argument("--target", choices=["local", "mock"], default="local")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pace multiplier; 0 replays back to back")
+    parser.add_argument("--catalog-db", default=str(CATALOG_DB), help="Catalog for --target local")
+    parser.add_argument("--mock-products", type=int, default=5000, help="Generated catalog size for --target mock")
+    parser.add_argument("--mock-latency-ms", type=float, default=150)
+    parser.add_argument("--mock-jitter-ms", type=float, default=50)
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    records = load_traces(args.traces)
+    mock = MockShopify(generate_products(args.mock_products), args.mock_latency_ms, args.mock_jitter_ms) if args.target == "mock" else None
+    with mock or nullcontext():
+        with target_functions(args.target, args.catalog_db, mock) as functions:
+            summary = summarize_timings(replay(records, functions, args.speed))
+
+    print(format_report(summary))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"target": args.target, "speed": args.speed, "tools": summary}, file, indent=2)
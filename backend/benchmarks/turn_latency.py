@@ -0,0 +1,51 @@
+"""Compare end-of-speech to first-audio latency across audio profiles.
+
+Run a few sessions per profile with TURN_LATENCY_LOG set, e.g.
+
+    AUDIO_PROFILE=low-latency TURN_LATENCY_LOG=turns.jsonl python3 -m bot ...
+
+then summarize them from the backend directory:
+
+    python3 -m benchmarks.turn_latency turns.jsonl
+
+Other report fields work as groups too, e.g. sessions run with and without
+LOG_ENQUEUE/LOG_SAMPLING compared with --group-by log_mode.
+"""
+import argparse
+import json
+from collections import defaultdict
+
+from latency import summarize
+
+
+def load_reports(paths):
+    reports = []
+    for path in paths:
+        with open(path) as file:
+            reports.extend(json.loads(line) for line in file if line.strip())
+    return reports
+
+
+def compare(reports, group_by="profile"):
+    """Pool turn latencies per group and summarize each group."""
+    grouped = defaultdict(list)
+    for report in reports:
+        grouped[report.get(group_by, "unknown")].extend(report.get("latencies_ms", []))
+    return {group: summarize(latencies) for group, latencies in sorted(grouped.items())}
+
+
+def format_table(results, group_by="profile"):
+    lines = [f"{group_by:<16}{'turns':>8}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}"]
+    for group, stats in results.items():
+        cells = [f"{stats[key]:.0f}" if stats[key] is not None else "-" for key in ("p50_ms", "p90_ms", "max_ms")]
+        lines.append(f"{str(group):<16}{stats['turns']:>8}" + "".join(f"{cell:>10}" for cell in cells))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Turn latency comparison across audio profiles")
+    parser.add_argument("reports", nargs="+", help="JSONL files written via TURN_LATENCY_LOG")
+    parser.add_argument("--group-by", default="profile", help="Report field to group sessions by")
+    args = parser.parse_args()
+
+    print(format_table(compare(load_reports(args.reports), args.group_by), args.group_by))
@@ -1,12 +1,13 @@
 import asyncio
 import os
-import sys
+import secrets
 from typing import Literal
 
 import aiohttp
 import httpx
 from dotenv import load_dotenv
 from loguru import logger
+from pipecat.frames.frames import TTSSpeakFrame
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
@@ -18,6 +19,7 @@ from pipecat.transports.services.daily import DailyParams, DailyTransport, Daily
 from pydantic import BaseModel
 
 from api import (
+    LOCAL_FALLBACKS,
     search_products,
     filter_products,
     get_product_recommendations,
@@ -26,17 +28,38 @@ from api import (
     get_trending_products,
     get_deals_of_the_day,
     get_product_by_id,
-    get_all_products
+    get_all_products,
+    get_catalog_version,
+    hedging_report,
+    product_cache,
+    warm_shopify_connection,
 )
+from audio_profiles import load_audio_profile
+from cursors import CURSOR_FETCH_LIMIT, PAGE_SIZE, ProductPrefetcher, ResultCursors
+from latency import write_report
+from logging_setup import configure_logging, watch_level_file
+from loop_watchdog import LOOP_WATCHDOG_ENABLED, LoopWatchdog
+from memory import SessionMemory, start_tracing
+from plan_cache import ToolPlanCache
+from processors import CachingTTSMixin, SpeculativeTranscriptGate, ToolPlanCacheProcessor, TurnLatencyTracker
+from resilience import CircuitBreaker, ResilientCaller
+from thumbnails import card_thumbnail
 from tools import tools
+from tracing import ToolTraceRecorder
+from tts_cache import TTSCache
+from warmup import WARMUP_GREETING, SessionWarmup
 
 load_dotenv(override=True)
-logger.remove(0)
-logger.add(sys.stderr, level="DEBUG")
+PLAN_CACHE_ENABLED = os.environ.get("PLAN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Pushed to the client or advancing the result cursor, so never run for an unconfirmed speculative turn
+SPECULATION_HELD_TOOLS = ("display_products_to_user", "next_page")
 
 DAILY_API_KEY = os.environ.get("DAILY_API_KEY")
 daily_client = httpx.AsyncClient(base_url="https://api.daily.co/v1", headers={"Authorization": f"Bearer {DAILY_API_KEY}"})
 
+class CachedDeepgramTTSService(CachingTTSMixin, DeepgramTTSService):
+    pass
+
 class ProductMessage(BaseModel):
     label: str = "rtvi-ai"
     type: Literal["rtvi-product-message"] = "rtvi-product-message"
@@ -98,6 +121,7 @@ Key Responsibilities:
      * get_all_products(): Retrieves all available products.
      * search_products(keyword): Finds products based on a keyword search.
      * filter_products(category, brand, price, etc.): Applies filters to refine product searches.
+     * next_page(cursor): Returns the next products of the last search or filter. Use it when the user says "next" or "more" instead of searching again.
      * get_product_recommendations(product_id or preferences): Suggests products based on a specific item or user preferences.
      * get_trending_products(): Retrieves currently trending products.
      * get_deals_of_the_day(): Shows products with the best discounts today.
@@ -108,7 +132,7 @@ Key Responsibilities:
 4. Provide Concise Product Information:
    - If necessary, verbally describe product features or specifications in short phrases only.
    - Avoid long descriptions or detailed product information.
-   - You should prefer to show maximum 3 products at a time. If more products are available, ask user to say "next" or "more" or similar phrase to see next 3 products. 
+   - You should prefer to show maximum 3 products at a time. If more products are available (has_more is true), ask user to say "next" or "more" or similar phrase to see next 3 products, then call next_page and display them. 
 
 5. Handle Queries Efficiently:
    - Use filters and searches to refine results effectively.
@@ -133,41 +157,53 @@ async def main():
     - Language model integration
     - RTVI event handling
     """
+    # Enqueued, sampled logging tagged with the session id; the level follows the server's
+    session_id = secrets.token_hex(3)
+    log_filter = configure_logging(session_id)
+    stop_level_watch = watch_level_file()
+
+    # RSS (and with MEMORY_TRACE_FRAMES, allocation growth) over the session goes into the report
+    start_tracing()
+    session_memory = SessionMemory().start()
+    # Loop lag histogram, plus the stack and tool of any callback blocking the loop past LOOP_STALL_MS
+    loop_watchdog = LoopWatchdog().start() if LOOP_WATCHDOG_ENABLED else None
+
     async with aiohttp.ClientSession() as session:
         room_url, token = await create_room_and_token()
 
+        # Sample rates, VAD and chunk sizes come from the AUDIO_PROFILE preset
+        audio_profile = load_audio_profile()
+        logger.info(f"Using audio profile: {audio_profile}")
+
         # Set up Daily transport with video/audio parameters
         daily_transport = DailyTransport(
             room_url=room_url,
             token=token,
             bot_name="AI Assistant",
-            params=DailyParams(
-                audio_in_enabled=True,
-                audio_out_enabled=True,
-            )
+            params=DailyParams(**audio_profile.transport_params())
         )
 
         # Speech-to-Text: Deepgram streaming STT
         stt_service = DeepgramSTTService(
             api_key=os.getenv("DEEPGRAM_API_KEY"),
-            sample_rate=16000,  # 16 kHz audio input
-            # Use Deepgram's Nova real-time model and enable VAD events to detect end of speech
-            live_options=LiveOptions(
-                model="nova-2-general",
-                language="en-US",
-                punctuate=True,
-                interim_results=False,
-                vad_events=True
-            )
+            sample_rate=audio_profile.sample_rate,
+            # Use Deepgram's Nova real-time model; end of speech comes from Deepgram VAD events
+            # unless the profile runs Silero locally
+            live_options=LiveOptions(**audio_profile.live_options())
         )
 
-        # Initialize text-to-speech service
-        tts_service = DeepgramTTSService(
+        # Initialize text-to-speech service; recurring sentences are replayed from the TTS cache
+        # (Sizing the disk tier scans its directory, so that runs in a thread too)
+        tts_cache = await asyncio.to_thread(TTSCache)
+        tts_voice = "aura-helios-en"
+        tts_service = CachedDeepgramTTSService(
             api_key=os.getenv("DEEPGRAM_API_KEY"),
-            voice="aura-helios-en",
-            # voice identifier for English male voice&#8203;:contentReference[oaicite:18]{index=18}&#8203;:contentReference[oaicite:19]{index=19}
-            sample_rate=16000  # 16 kHz audio output
+            voice=tts_voice,
+            sample_rate=audio_profile.sample_rate,
+            tts_cache=tts_cache,
+            replay_chunk_ms=audio_profile.out_chunk_ms,
         )
+        turn_latency = TurnLatencyTracker(audio_profile.name)
 
         # Initialize LLM service
         llm_service = OpenAILLMService(api_key=os.getenv("OPENAI_API_KEY"), model="gpt-4o")
@@ -179,38 +215,72 @@ async def main():
             tool_choice="auto"
         )
         context_aggregator = llm_service.create_context_aggregator(context)
+
+        # Opt-in: start inference on stable interim transcripts (needs interim results)
+        speculation_gate = None
+        if audio_profile.early_llm and audio_profile.interim_results:
+            speculation_gate = SpeculativeTranscriptGate(context)
         rtvi = RTVIProcessor(config=RTVIConfig(config=[]))
 
+        # Shopify calls run off the event loop with per-tool deadlines; when Shopify
+        # is failing or slow, known results and the local catalog answer instead
+        shopify_breaker = CircuitBreaker("shopify")
+        shopify = ResilientCaller(shopify_breaker)
+
+        # Connections, common lists and the greeting are warmed up while the user settles in
+        warmup = SessionWarmup()
+
+        async def call_api(name, fn, *args, **kwargs):
+            warmup.note_tool_call(name, shopify.has(name, *args, **kwargs))
+            return await shopify.call(name, fn, *args, fallback=LOCAL_FALLBACKS.get(name), **kwargs)
+
+        # Search and filter results are paged from memory ("next", "more") and the
+        # next page is hydrated while the current one is on screen
+        cursors = ResultCursors()
+        prefetcher = ProductPrefetcher(
+            lambda product_id: shopify.call("get_product_by_id", get_product_by_id, product_id,
+                                            fallback=LOCAL_FALLBACKS["get_product_by_id"])
+        )
+
+        def open_cursor(results, source, page_size, extra=None):
+            if "error" in results:
+                return results
+            page = cursors.open(results["product_ids"], source=source, page_size=page_size, extra=extra)
+            prefetcher.prefetch(page["product_ids"])
+            return page
+
         # E-commerce function handlers
         # Get all products function handler
         async def get_all_products_handler(function_name, tool_call_id, args, llm, context, result_callback):
             limit = args.get("limit", 20)
             page_info = args.get("page_info", None)
-            results = get_all_products(limit=limit, page_info=page_info)
+            results = await call_api("get_all_products", get_all_products, limit=limit, page_info=page_info)
             await result_callback(results)
 
         # Search products function handler
         async def search_products_handler(function_name, tool_call_id, args, llm, context, result_callback):
             query = args.get("query", "")
-            limit = args.get("limit", 10)
-            results = search_products(query, limit)
-            await result_callback(results)
+            limit = args.get("limit", PAGE_SIZE)
+            results = await call_api("search_products", search_products, query, CURSOR_FETCH_LIMIT)
+            await result_callback(open_cursor(results, "search_products", limit))
             
         # Filter products function handler
         async def filter_products_handler(function_name, tool_call_id, args, llm, context, result_callback):
             category = args.get("category", None)
             subcategory = args.get("subcategory", None)
-            brand = args.get("brand", None)
+            brand = args.get("brand", None) or args.get("vendor", None)
             min_price = args.get("min_price", None)
             max_price = args.get("max_price", None)
             min_rating = args.get("min_rating", None)
             colors = args.get("colors", None)
             tags = args.get("tags", None)
             in_stock = args.get("in_stock", None)
-            limit = args.get("limit", 20)
+            limit = args.get("limit", PAGE_SIZE)
             offset = args.get("offset", 0)
             
-            results = filter_products(
+            results = await call_api(
+                "filter_products",
+                filter_products,
                 category=category,
                 subcategory=subcategory,
                 brand=brand,
@@ -220,9 +290,18 @@ async def main():
                 colors=colors,
                 tags=tags,
                 in_stock=in_stock,
-                limit=limit,
+                limit=CURSOR_FETCH_LIMIT,
                 offset=offset
             )
+            extra = {"total_matches": results.get("total"), "facets": results.get("facets"), "next_offset": results.get("next_offset")} if "total" in results else None
+            await result_callback(open_cursor(results, "filter_products", limit, extra))
+
+        # Next page of the last (or a given) search or filter, served from memory
+        async def next_page_handler(function_name, tool_call_id, args, llm, context, result_callback):
+            cursor = args.get("cursor") or cursors.latest()
+            results = cursors.next_page(cursor, args.get("limit")) if cursor else {"error": "There is no earlier result list to page through"}
+            if "error" not in results:
+                prefetcher.prefetch(results["product_ids"])
             await result_callback(results)
         
         # Get product recommendations function handler
@@ -230,66 +309,124 @@ async def main():
             product_id = args.get("product_id", None)
             user_preferences = args.get("user_preferences", None)
             limit = args.get("limit", 5)
-            results = get_product_recommendations(product_id, user_preferences, limit)
+            results = await call_api("get_product_recommendations", get_product_recommendations, product_id, user_preferences, limit)
             await result_callback(results)
 
         # Get trending products function handler
         async def get_trending_products_handler(function_name, tool_call_id, args, llm, context, result_callback):
             limit = args.get("limit", 5)
-            results = get_trending_products(limit)
+            results = await call_api("get_trending_products", get_trending_products, limit)
             await result_callback(results)
 
         # Get deals of the day function handler
         async def get_deals_of_the_day_handler(function_name, tool_call_id, args, llm, context, result_callback):
             limit = args.get("limit", 5)
-            results = get_deals_of_the_day(limit)
+            results = await call_api("get_deals_of_the_day", get_deals_of_the_day, limit)
             await result_callback(results)
 
         # Get categories function handler
         async def get_categories_handler(function_name, tool_call_id, args, llm, context, result_callback):
-            results = get_categories()
+            results = await call_api("get_categories", get_categories)
             await result_callback(results)
         
         # Get brands function handler
         async def get_brands_handler(function_name, tool_call_id, args, llm, context, result_callback):
             category = args.get("category", None)
-            results = get_brands(category)
+            results = await call_api("get_brands", get_brands, category)
             await result_callback(results)
 
         # Display products to user function handler
         async def display_products_to_user(function_name, tool_call_id, args, llm, context, result_callback):
             product_ids = args.get("product_ids", [])
             #TODO: Handle the error if product id is not found
-            products = [get_product_by_id(id) for id in product_ids]
+            products = await prefetcher.get(product_ids)
+            # Copies: the prefetched results are shared with later calls
+            products = [
+                {**item, "product": {**item["product"], "thumbnail": card_thumbnail(item["product"].get("image"))}}
+                if isinstance(item.get("product"), dict) else item
+                for item in products
+            ]
             message = ProductMessage(data={"products": products})
             frame = DailyTransportMessageFrame(message=message.model_dump())
             await rtvi.push_frame(frame)
+            cursor = cursors.latest()
+            if cursor:
+                prefetcher.prefetch(cursors.upcoming(cursor))
             await result_callback("Here are some products you might like!")
 
         # Register all e-commerce functions
-        llm_service.register_function("get_all_products", get_all_products_handler)
-        llm_service.register_function("search_products", search_products_handler)
-        llm_service.register_function("filter_products", filter_products_handler)
-        llm_service.register_function("get_product_recommendations", get_product_recommendations_handler)
-        llm_service.register_function("get_trending_products", get_trending_products_handler)
-        llm_service.register_function("get_deals_of_the_day", get_deals_of_the_day_handler)
-        llm_service.register_function("get_categories", get_categories_handler)
-        llm_service.register_function("get_brands", get_brands_handler)
-
-        llm_service.register_function("display_products_to_user", display_products_to_user)
-
-        pipeline = Pipeline(
-            [
-                daily_transport.input(),
-                stt_service,
-                rtvi,
-                context_aggregator.user(),
-                llm_service,
-                tts_service,
-                daily_transport.output(),
-                context_aggregator.assistant(),
-            ]
-        )
+        tool_handlers = {
+            "get_all_products": get_all_products_handler,
+            "search_products": search_products_handler,
+            "filter_products": filter_products_handler,
+            "next_page": next_page_handler,
+            "get_product_recommendations": get_product_recommendations_handler,
+            "get_trending_products": get_trending_products_handler,
+            "get_deals_of_the_day": get_deals_of_the_day_handler,
+            "get_categories": get_categories_handler,
+            "get_brands": get_brands_handler,
+            "display_products_to_user": display_products_to_user,
+        }
+
+        # While a speculative turn is unconfirmed, tools the user would notice wait for it;
+        # if it missed they do nothing (the corrected turn calls them again)
+        def held_until_confirmed(handler):
+            async def wrapper(function_name, tool_call_id, args, llm, context, result_callback):
+                if not await speculation_gate.confirmed():
+                    await result_callback({"error": "Superseded by the user's corrected request"})
+                    return
+                await handler(function_name, tool_call_id, args, llm, context, result_callback)
+            return wrapper
+
+        if speculation_gate:
+            for name in SPECULATION_HELD_TOOLS:
+                tool_handlers[name] = held_until_confirmed(tool_handlers[name])
+
+        # Opt-in JSONL trace of every tool call (TOOL_TRACE_PATH), for offline replay
+        tool_tracer = ToolTraceRecorder.from_env(session_id)
+        if tool_tracer:
+            tool_handlers = {name: tool_tracer.wrap(name, handler) for name, handler in tool_handlers.items()}
+        if loop_watchdog:
+            tool_handlers = {name: loop_watchdog.wrap(name, handler) for name, handler in tool_handlers.items()}
+
+        # Replays the tool calls of common opening intents so the first LLM hop is skipped.
+        # Plans are tied to the catalog version, so the cache is off when it can't be read.
+        plan_cache = plan_processor = None
+        catalog_version = await asyncio.to_thread(get_catalog_version) if PLAN_CACHE_ENABLED else None
+        if catalog_version:
+            plan_cache = await asyncio.to_thread(ToolPlanCache, catalog_version)
+            plan_processor = ToolPlanCacheProcessor(plan_cache, tool_handlers)
+
+        def record_tool_call(handler):
+            async def wrapper(function_name, tool_call_id, args, llm, context, result_callback):
+                if plan_processor:
+                    plan_processor.note_tool_call(function_name, args, tool_call_id, context)
+                await handler(function_name, tool_call_id, args, llm, context, result_callback)
+            return wrapper
+
+        for name, handler in tool_handlers.items():
+            llm_service.register_function(name, record_tool_call(handler))
+
+        processors = [
+            daily_transport.input(),
+            stt_service,
+            rtvi,
+            context_aggregator.user(),
+            llm_service,
+            tts_service,
+            turn_latency,
+            daily_transport.output(),
+            context_aggregator.assistant(),
+        ]
+        if speculation_gate:
+            processors.insert(processors.index(stt_service) + 1, speculation_gate)
+            processors.insert(processors.index(llm_service), speculation_gate.context_guard())
+        # Ahead of the gate, so the marker sees every final transcript
+        processors.insert(processors.index(stt_service) + 1, turn_latency.transcript_marker())
+        if plan_processor:
+            processors.insert(processors.index(llm_service), plan_processor)
+
+        pipeline = Pipeline(processors)
 
         task = PipelineTask(
             pipeline,
@@ -305,20 +442,92 @@ async def main():
         async def on_client_ready(rtvi):
             await rtvi.set_bot_ready()
 
+        async def synthesize_greeting():
+            # Synthesized once, then replayed from the TTS cache in every session
+            if await tts_cache.aget(WARMUP_GREETING, tts_voice, audio_profile.sample_rate) is None:
+                async for _ in tts_service.run_tts(WARMUP_GREETING):
+                    pass
+
+        async def warm_shopify():
+            cold_ms = await asyncio.to_thread(warm_shopify_connection)
+            warm_ms = await asyncio.to_thread(warm_shopify_connection)
+            warmup.record_connection(cold_ms, warm_ms)
+            warmup.keep_alive(warm_shopify_connection)
+
+        def prefetch_tool(name, fn, *args):
+            # Same arguments as the handlers' defaults, so their first call is a cache hit
+            return lambda: warmup.prefetch(name, lambda: shopify.call(name, fn, *args))
+
+        async def prefetch_deals():
+            results = await prefetch_tool("get_deals_of_the_day", get_deals_of_the_day, 5)()
+            if "product_ids" in results:
+                prefetcher.prefetch(results["product_ids"][:PAGE_SIZE])
+
+        # The greeting is prepared as soon as the bot starts, before anyone joins
+        warmup_tasks = []
+        if WARMUP_GREETING:
+            warmup_tasks.append(asyncio.create_task(warmup.run({"greeting": synthesize_greeting})))
+
         @daily_transport.event_handler("on_first_participant_joined")
         async def on_first_participant_joined(transport, participant):
             await transport.capture_participant_transcription(participant["id"])
-            await task.queue_frames([context_aggregator.user().get_context_frame()])
+            warmup_tasks.append(asyncio.create_task(warmup.run({
+                "shopify_connection": warm_shopify,
+                "categories": prefetch_tool("get_categories", get_categories),
+                "deals": prefetch_deals,
+                "trending": prefetch_tool("get_trending_products", get_trending_products, 5),
+            })))
+            if WARMUP_GREETING:
+                context.add_message({"role": "assistant", "content": WARMUP_GREETING})
+                await task.queue_frames([TTSSpeakFrame(WARMUP_GREETING)])
+            else:
+                await task.queue_frames([context_aggregator.user().get_context_frame()])
 
         @daily_transport.event_handler("on_participant_left")
         async def on_participant_left(transport, participant, reason):
-            print(f"Participant left: {participant}")
+            logger.info(f"Participant left: {participant['id']} ({reason})")
             await task.cancel()
 
         runner = PipelineRunner()
 
         await runner.run(task)
 
+        warmup.close()
+        for warmup_task in warmup_tasks:
+            warmup_task.cancel()
+
+        session_report = turn_latency.report()
+        session_report["session_id"] = session_id
+        session_report["log_mode"] = log_filter.mode
+        session_report["logging"] = log_filter.stats()
+        stop_level_watch.set()
+        session_report["warmup"] = warmup.report()
+        logger.info(f"Warm-up saved {session_report['warmup']['first_turn_saved_ms']} ms on the first tool call")
+        if speculation_gate:
+            session_report["speculation"] = speculation_gate.stats.as_dict()
+            logger.info(f"Speculative LLM stats: {session_report['speculation']}")
+        await tts_cache.flush()
+        session_report["tts_cache"] = tts_cache.stats
+        session_report["cursors"] = {**cursors.stats, **prefetcher.stats}
+        session_report["shopify"] = {
+            **shopify.stats,
+            "breaker_trips": shopify_breaker.trips,
+            "hedging": hedging_report(),
+            "product_cache": product_cache.stats,
+        }
+        if plan_cache:
+            session_report["plan_cache"] = plan_cache.stats
+        session_report["memory"] = session_memory.finish()
+        if loop_watchdog:
+            loop_watchdog.stop()
+            session_report["event_loop"] = loop_watchdog.report()
+            logger.info(f"Event loop: {loop_watchdog.stall_count} stalls, p99 lag {session_report['event_loop']['lag_p99_ms']} ms")
+        logger.info(f"Session memory: {session_report['memory']}")
+        if tool_tracer:
+            session_report["tool_trace"] = {"session": tool_tracer.session_id, "calls": tool_tracer.calls}
+            tool_tracer.close()
+        write_report(session_report)
+
 
 if __name__ == "__main__":
     asyncio.run(main())
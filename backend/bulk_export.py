@@ -0,0 +1,244 @@
+import argparse
+import json
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from api import SHOPIFY_ACCESS_KEY, SHOPIFY_API_URL
+from catalog import CatalogStore
+from recommender import refresh_recommendations
+
+PRODUCTS_BULK_QUERY = """
+{
+  products {
+    edges {
+      node {
+        id
+        title
+        handle
+        vendor
+        productType
+        tags
+        status
+        updatedAt
+        featuredImage { id url width height }
+        options { id name position values }
+        rating: metafield(namespace: "reviews", key: "rating") { value }
+        variants {
+          edges {
+            node {
+              id
+              title
+              price
+              compareAtPrice
+              position
+              sku
+              barcode
+              taxable
+              inventoryPolicy
+              inventoryQuantity
+              inventoryItem { id }
+              selectedOptions { name value }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+RUN_BULK_QUERY_MUTATION = """
+mutation bulkOperationRunQuery($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+CURRENT_BULK_OPERATION_QUERY = """
+{
+  currentBulkOperation {
+    id
+    status
+    errorCode
+    objectCount
+    url
+  }
+}
+"""
+
+
+def _graphql(query, variables=None, timeout=30):
+    response = requests.post(
+        f"{SHOPIFY_API_URL}/graphql.json",
+        json={"query": query, "variables": variables or {}},
+        headers={"X-Shopify-Access-Token": SHOPIFY_ACCESS_KEY},
+        timeout=timeout,
+    )
+    if response.status_code != 200:
+        raise Exception(f"Shopify GraphQL request failed: {response.status_code} - {response.text}")
+    data = response.json()
+    if data.get("errors"):
+        raise Exception(f"Shopify GraphQL errors: {data['errors']}")
+    return data["data"]
+
+
+def start_bulk_export(query=PRODUCTS_BULK_QUERY):
+    """Start a bulk operation for `query` and return its id."""
+    result = _graphql(RUN_BULK_QUERY_MUTATION, {"query": query})["bulkOperationRunQuery"]
+    if result["userErrors"]:
+        raise Exception(f"Bulk operation rejected: {result['userErrors']}")
+    return result["bulkOperation"]["id"]
+
+
+def wait_for_bulk_export(operation_id, poll_interval=2.0, timeout=3600, sleep=time.sleep):
+    """Poll the current bulk operation until it completes and return the JSONL URL.
+
+    Returns None when the export finished without producing a file (empty catalog).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        operation = _graphql(CURRENT_BULK_OPERATION_QUERY)["currentBulkOperation"]
+        if operation is None or operation["id"] != operation_id:
+            raise Exception(f"Bulk operation {operation_id} is no longer the current operation")
+        if operation["status"] == "COMPLETED":
+            return operation["url"]
+        if operation["status"] in ("FAILED", "CANCELED", "EXPIRED"):
+            raise Exception(f"Bulk operation {operation_id} ended with {operation['status']}: {operation.get('errorCode')}")
+        if time.monotonic() > deadline:
+            raise Exception(f"Bulk operation {operation_id} did not finish within {timeout}s")
+        sleep(poll_interval)
+
+
+def iter_jsonl(source):
+    """Yield parsed records one line at a time from a local path, file:// or http(s) URL."""
+    parsed = urlparse(str(source))
+    if parsed.scheme in ("http", "https"):
+        with requests.get(source, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+        return
+
+    path = parsed.path if parsed.scheme == "file" else str(source)
+    with open(path, "rb") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _legacy_id(gid):
+    """gid://shopify/Product/123 -> 123"""
+    return int(str(gid).rsplit("/", 1)[-1]) if gid else None
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def variant_to_rest(node, product_id):
+    options = [option["value"] for option in node.get("selectedOptions") or []]
+    options += [None] * (3 - len(options))
+    return {
+        "id": _legacy_id(node["id"]),
+        "product_id": product_id,
+        "title": node.get("title"),
+        "price": node.get("price"),
+        "compare_at_price": node.get("compareAtPrice"),
+        "position": node.get("position"),
+        "inventory_policy": _lower(node.get("inventoryPolicy")),
+        "inventory_quantity": node.get("inventoryQuantity"),
+        "inventory_item_id": _legacy_id((node.get("inventoryItem") or {}).get("id")),
+        "option1": options[0],
+        "option2": options[1],
+        "option3": options[2],
+        "taxable": node.get("taxable"),
+        "barcode": node.get("barcode"),
+        "sku": node.get("sku"),
+    }
+
+
+def product_to_rest(node, variant_nodes):
+    """Convert a bulk export Product row and its variant rows to the REST products.json shape."""
+    product_id = _legacy_id(node["id"])
+    image = node.get("featuredImage")
+    rating = (node.get("rating") or {}).get("value")
+    variants = sorted(
+        (variant_to_rest(variant, product_id) for variant in variant_nodes),
+        key=lambda variant: variant["position"] or 0,
+    )
+    return {
+        "id": product_id,
+        "title": node.get("title"),
+        "handle": node.get("handle"),
+        "vendor": node.get("vendor"),
+        "product_type": node.get("productType"),
+        "tags": ", ".join(node.get("tags") or []),
+        "status": _lower(node.get("status")),
+        "updated_at": node.get("updatedAt"),
+        "rating": float(rating) if rating not in (None, "") else None,
+        "variants": variants,
+        "options": [
+            {
+                "id": _legacy_id(option.get("id")),
+                "product_id": product_id,
+                "name": option.get("name"),
+                "position": option.get("position"),
+                "values": option.get("values", []),
+            }
+            for option in node.get("options") or []
+        ],
+        "image": {
+            "id": _legacy_id(image.get("id")),
+            "product_id": product_id,
+            "width": image.get("width"),
+            "height": image.get("height"),
+            "src": image.get("url"),
+        } if image else None,
+    }
+
+
+def stitch_products(records):
+    """Re-attach variant rows to their parent product.
+
+    Bulk exports write each child row (`__parentId`) after its parent and
+    before the next parent, so only one product is buffered at a time.
+    """
+    parent, children = None, []
+    for record in records:
+        if "__parentId" not in record:
+            if parent is not None:
+                yield product_to_rest(parent, children)
+            parent, children = record, []
+        elif parent is not None and record["__parentId"] == parent["id"]:
+            children.append(record)
+    if parent is not None:
+        yield product_to_rest(parent, children)
+
+
+def reindex(store=None, source=None):
+    """Replace the local catalog with a fresh export and rebuild recommendations.
+
+    `source` is a JSONL path or URL; without it a Shopify bulk export is
+    started and awaited. Returns the number of products loaded.
+    """
+    store = store or CatalogStore()
+    if source is None:
+        source = wait_for_bulk_export(start_bulk_export())
+    loaded = store.replace_all(stitch_products(iter_jsonl(source)) if source else [])
+    refresh_recommendations(store)
+    return loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the local catalog from a Shopify bulk export")
+    parser.add_argument("--source", help="Existing JSONL export (path or URL) instead of starting a new export")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    loaded = reindex(source=args.source)
+    print(f"Loaded {loaded} products in {time.monotonic() - started:.1f}s")
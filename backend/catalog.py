@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import sqlite_utils
+
+CATALOG_DB = Path(os.environ.get("CATALOG_DB", Path(os.path.dirname(os.path.abspath(__file__))) / "data" / "catalog.db"))
+
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def product_row(product):
+    """Flatten a REST-shaped product into the indexed columns of the store."""
+    variants = product.get("variants") or []
+    first = variants[0] if variants else {}
+    return {
+        "id": product["id"],
+        "title": product.get("title"),
+        "vendor": product.get("vendor"),
+        "product_type": product.get("product_type"),
+        "tags": product.get("tags", ""),
+        "status": product.get("status"),
+        "updated_at": product.get("updated_at"),
+        "price": _to_float(first.get("price")),
+        "compare_at_price": _to_float(first.get("compare_at_price")),
+        "inventory_quantity": sum(int(variant.get("inventory_quantity") or 0) for variant in variants),
+        "data": json.dumps(product),
+    }
+
+
+class CatalogStore:
+    """Local SQLite copy of the Shopify catalog.
+
+    Products are kept in the REST `products.json` shape (so existing
+    transforms apply) in a `data` JSON column, plus a few flat columns for
+    querying. Every full re-index bumps `version`.
+    """
+
+    def __init__(self, db_path=CATALOG_DB):
+        self._lock = threading.RLock()
+        self.listeners = []
+        if db_path is None:
+            self.db = sqlite_utils.Database(memory=True)
+        else:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite_utils.Database(sqlite3.connect(db_path, timeout=30, check_same_thread=False))
+            self.db.enable_wal()
+        self.db["meta"].create({"key": str, "value": str}, pk="key", if_not_exists=True)
+
+    @property
+    def version(self):
+        with self._lock:
+            rows = list(self.db["meta"].rows_where("key = 'version'"))
+            return rows[0]["value"] if rows else None
+
+    def count(self):
+        with self._lock:
+            return self.db["products"].count if self.db["products"].exists() else 0
+
+    def get(self, product_id):
+        with self._lock:
+            if not self.db["products"].exists():
+                return None
+            row = self.db.execute("SELECT data FROM products WHERE id = ?", [int(product_id)]).fetchone()
+            return json.loads(row[0]) if row else None
+
+    def search_titles(self, query, limit=10):
+        """Ids of products whose title contains `query` (case-insensitive)."""
+        with self._lock:
+            if not self.db["products"].exists():
+                return []
+            pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            rows = self.db.execute(
+                "SELECT id FROM products WHERE title LIKE ? ESCAPE '\\' ORDER BY id LIMIT ?", [f"%{pattern}%", limit]
+            ).fetchall()
+            return [row[0] for row in rows]
+
+    def iter_products(self, batch_size=1000):
+        """Yield every product without loading the whole table at once."""
+        last_id = -1
+        while True:
+            with self._lock:
+                if not self.db["products"].exists():
+                    return
+                rows = self.db.execute(
+                    "SELECT id, data FROM products WHERE id > ? ORDER BY id LIMIT ?", [last_id, batch_size]
+                ).fetchall()
+            if not rows:
+                return
+            for row_id, data in rows:
+                yield json.loads(data)
+            last_id = rows[-1][0]
+
+    def replace_all(self, products, batch_size=500):
+        """Load a full catalog into a staging table and swap it in atomically.
+
+        `products` may be any iterable; it is consumed in batches so memory
+        stays constant regardless of catalog size. Returns the number loaded.
+        """
+        loaded = 0
+
+        def rows():
+            nonlocal loaded
+            for product in products:
+                loaded += 1
+                yield product_row(product)
+
+        with self._lock:
+            self.db["products_staging"].drop(ignore=True)
+            self.db["products_staging"].insert_all(rows(), pk="id", batch_size=batch_size, replace=True)
+            with self.db.conn:
+                self.db["products"].drop(ignore=True)
+                if self.db["products_staging"].exists():
+                    self.db.rename_table("products_staging", "products")
+            self.db["meta"].upsert({"key": "version", "value": f"{loaded}:{int(time.time() * 1000)}"}, pk="key")
+        return loaded
+
+    def add_listener(self, listener):
+        """Call listener(old_products, new_products, version) after every upsert in this process."""
+        self.listeners.append(listener)
+
+    def upsert_products(self, products):
+        """Insert or update individual products (incremental sync)."""
+        products = list(products)
+        with self._lock:
+            previous = [self.get(product["id"]) for product in products] if self.listeners else []
+            self.db["products"].upsert_all((product_row(product) for product in products), pk="id")
+            version = f"{self.count()}:{int(time.time() * 1000)}"
+            self.db["meta"].upsert({"key": "version", "value": version}, pk="key")
+        for listener in self.listeners:
+            listener(previous, products, version)
+
+    def _recommendation_rows(self, neighbors, words):
+        for product_id, pairs in neighbors.items():
+            yield {
+                "product_id": product_id,
+                "neighbors": json.dumps(pairs),
+                "words": " ".join(sorted(words.get(product_id, ()))),
+            }
+
+    def replace_recommendations(self, neighbors, words):
+        """Replace the precomputed top-K neighbor table ({id: [(id, score), ...]})."""
+        with self._lock:
+            self.db["recommendations"].drop(ignore=True)
+            self.db["recommendations"].insert_all(self._recommendation_rows(neighbors, words), pk="product_id")
+
+    def save_recommendations(self, neighbors, words):
+        with self._lock:
+            self.db["recommendations"].upsert_all(self._recommendation_rows(neighbors, words), pk="product_id")
+
+    def delete_recommendations(self, product_ids):
+        with self._lock:
+            if self.db["recommendations"].exists():
+                for product_id in product_ids:
+                    self.db["recommendations"].delete_where("product_id = ?", [product_id])
+
+    def has_recommendations(self):
+        with self._lock:
+            return self.db["recommendations"].exists()
+
+    def get_recommendations(self, product_id):
+        """Saved neighbor pairs for one product, or None if it has no entry."""
+        with self._lock:
+            if not self.db["recommendations"].exists():
+                return None
+            row = self.db.execute("SELECT neighbors FROM recommendations WHERE product_id = ?", [int(product_id)]).fetchone()
+            return [tuple(pair) for pair in json.loads(row[0])] if row else None
+
+    def match_recommendation_words(self, words, limit=5):
+        """Ids of the products whose words match the most of `words` (plain [a-z0-9] words)."""
+        words = sorted(words)[:20]
+        with self._lock:
+            if not words or not self.db["recommendations"].exists():
+                return []
+            score = " + ".join("(' ' || words || ' ' LIKE ?)" for _ in words)
+            rows = self.db.execute(
+                f"SELECT product_id, {score} AS score FROM recommendations WHERE score > 0 ORDER BY score DESC, product_id LIMIT ?",
+                [f"% {word} %" for word in words] + [limit],
+            ).fetchall()
+            return [row[0] for row in rows]
+
+    def get_recommendation_words(self, product_ids):
+        with self._lock:
+            placeholders = ", ".join("?" for _ in product_ids)
+            rows = self.db.execute(
+                f"SELECT product_id, words FROM recommendations WHERE product_id IN ({placeholders})", list(product_ids)
+            ).fetchall()
+            return {product_id: set(words.split()) for product_id, words in rows}
+
+    def all_recommendations(self):
+        with self._lock:
+            if not self.db["recommendations"].exists():
+                return {}
+            rows = self.db.execute("SELECT product_id, neighbors FROM recommendations").fetchall()
+            return {product_id: [tuple(pair) for pair in json.loads(neighbors)] for product_id, neighbors in rows}
@@ -0,0 +1,233 @@
+import numpy as np
+
+MISSING_CENTS = -1
+
+
+def _cents(value):
+    try:
+        return int(round(float(value) * 100)) if value not in (None, "") else MISSING_CENTS
+    except (TypeError, ValueError):
+        return MISSING_CENTS
+
+
+def _split_tags(tags):
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return [tag.strip() for tag in tags or [] if tag and tag.strip()]
+
+
+def _colors(product):
+    colors = list(product.get("colors") or [])
+    for option in product.get("options") or []:
+        if str(option.get("name", "")).lower() in ("color", "colour"):
+            colors.extend(option.get("values") or [])
+    return colors
+
+
+def category_of(product_type):
+    """First level of a "Category > Subcategory" product type."""
+    category = str(product_type or "").split(" > ")[0].strip()
+    return category or None
+
+
+def subcategory_of(product):
+    """Explicit subcategory, else the last level of a "Category > Subcategory" product type."""
+    if product.get("subcategory"):
+        return product["subcategory"]
+    levels = str(product.get("product_type") or "").split(" > ")
+    return levels[-1].strip() if len(levels) > 1 else None
+
+
+class StringTable:
+    """Interns strings to small integer codes; lookups are case-insensitive."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def intern(self, value):
+        if value in (None, ""):
+            return -1
+        key = value.lower()
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code_of(self, value):
+        return self._codes.get(value.lower(), -1) if value else -1
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, code):
+        return self.values[code] if code >= 0 else None
+
+
+class ProductRow:
+    """Lightweight view of one catalog row."""
+
+    __slots__ = ("id", "vendor", "product_type", "subcategory", "tags", "colors", "price", "compare_at_price", "stock", "rating")
+
+    def __init__(self, id, vendor, product_type, subcategory, tags, colors, price, compare_at_price, stock, rating):
+        self.id = id
+        self.vendor = vendor
+        self.product_type = product_type
+        self.subcategory = subcategory
+        self.tags = tags
+        self.colors = colors
+        self.price = price
+        self.compare_at_price = compare_at_price
+        self.stock = stock
+        self.rating = rating
+
+    def __repr__(self):
+        return f"ProductRow(id={self.id}, vendor={self.vendor!r}, price={self.price})"
+
+
+class ColumnarCatalog:
+    """Column-per-field catalog with NumPy arrays and interned strings.
+
+    Prices are integer cents (-1 when missing) so predicates never parse
+    strings. Tags (and colors) are stored CSR-style: the tags of row i are
+    `tag_codes[tag_offsets[i]:tag_offsets[i + 1]]`. Categories are the first
+    level of a "Category > Subcategory" product type, as in the REST filter.
+    """
+
+    def __init__(self):
+        self.vendors = StringTable()
+        self.types = StringTable()
+        self.categories = StringTable()
+        self.subcategories = StringTable()
+        self.tags = StringTable()
+        self.colors = StringTable()
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.price_cents = np.zeros(0, dtype=np.int64)
+        self.compare_at_cents = np.zeros(0, dtype=np.int64)
+        self.stock = np.zeros(0, dtype=np.int32)
+        self.rating = np.zeros(0, dtype=np.float32)
+        self.vendor_codes = np.zeros(0, dtype=np.int32)
+        self.type_codes = np.zeros(0, dtype=np.int32)
+        self.category_codes = np.zeros(0, dtype=np.int32)
+        self.subcategory_codes = np.zeros(0, dtype=np.int32)
+        self.tag_offsets = np.zeros(1, dtype=np.int64)
+        self.tag_codes = np.zeros(0, dtype=np.int32)
+        self.color_offsets = np.zeros(1, dtype=np.int64)
+        self.color_codes = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def from_products(cls, products):
+        """Build from REST-shaped products (any iterable, consumed once)."""
+        catalog = cls()
+        ids, price, compare_at, stock, rating, vendor, product_type, category, subcategory = [], [], [], [], [], [], [], [], []
+        tag_offsets, tag_codes, color_offsets, color_codes = [0], [], [0], []
+        for product in products:
+            variants = product.get("variants") or []
+            first = variants[0] if variants else {}
+            ids.append(product["id"])
+            price.append(_cents(first.get("price")))
+            compare_at.append(_cents(first.get("compare_at_price")))
+            stock.append(sum(int(variant.get("inventory_quantity") or 0) for variant in variants))
+            product_rating = product.get("rating")
+            rating.append(float(product_rating) if product_rating is not None else np.nan)
+            vendor.append(catalog.vendors.intern(product.get("vendor")))
+            product_type.append(catalog.types.intern(product.get("product_type")))
+            category.append(catalog.categories.intern(category_of(product.get("product_type"))))
+            subcategory.append(catalog.subcategories.intern(subcategory_of(product)))
+            tag_codes.extend(catalog.tags.intern(tag) for tag in _split_tags(product.get("tags")))
+            tag_offsets.append(len(tag_codes))
+            color_codes.extend(dict.fromkeys(catalog.colors.intern(color) for color in _colors(product) if color))
+            color_offsets.append(len(color_codes))
+
+        catalog.ids = np.array(ids, dtype=np.int64)
+        catalog.price_cents = np.array(price, dtype=np.int64)
+        catalog.compare_at_cents = np.array(compare_at, dtype=np.int64)
+        catalog.stock = np.array(stock, dtype=np.int32)
+        catalog.rating = np.array(rating, dtype=np.float32)
+        catalog.vendor_codes = np.array(vendor, dtype=np.int32)
+        catalog.type_codes = np.array(product_type, dtype=np.int32)
+        catalog.category_codes = np.array(category, dtype=np.int32)
+        catalog.subcategory_codes = np.array(subcategory, dtype=np.int32)
+        catalog.tag_offsets = np.array(tag_offsets, dtype=np.int64)
+        catalog.tag_codes = np.array(tag_codes, dtype=np.int32)
+        catalog.color_offsets = np.array(color_offsets, dtype=np.int64)
+        catalog.color_codes = np.array(color_codes, dtype=np.int32)
+        return catalog
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self):
+        """Approximate memory held by the columns (string tables excluded)."""
+        arrays = (self.ids, self.price_cents, self.compare_at_cents, self.stock, self.rating,
+                  self.vendor_codes, self.type_codes, self.category_codes, self.subcategory_codes,
+                  self.tag_offsets, self.tag_codes, self.color_offsets, self.color_codes)
+        return sum(array.nbytes for array in arrays)
+
+    def row(self, index):
+        tags = self.tag_codes[self.tag_offsets[index]:self.tag_offsets[index + 1]]
+        colors = self.color_codes[self.color_offsets[index]:self.color_offsets[index + 1]]
+        price, compare_at = self.price_cents[index], self.compare_at_cents[index]
+        rating = self.rating[index]
+        return ProductRow(
+            id=int(self.ids[index]),
+            vendor=self.vendors[int(self.vendor_codes[index])],
+            product_type=self.types[int(self.type_codes[index])],
+            subcategory=self.subcategories[int(self.subcategory_codes[index])],
+            tags=[self.tags[int(code)] for code in tags],
+            colors=[self.colors[int(code)] for code in colors],
+            price=price / 100 if price >= 0 else None,
+            compare_at_price=compare_at / 100 if compare_at >= 0 else None,
+            stock=int(self.stock[index]),
+            rating=None if np.isnan(rating) else float(rating),
+        )
+
+    def price_range_mask(self, min_price=None, max_price=None):
+        mask = self.price_cents >= 0
+        if min_price is not None:
+            mask &= self.price_cents >= int(round(min_price * 100))
+        if max_price is not None:
+            mask &= self.price_cents <= int(round(max_price * 100))
+        return mask
+
+    def tags_mask(self, tags):
+        """Rows carrying any of `tags`."""
+        wanted = [code for code in (self.tags.code_of(tag) for tag in tags) if code >= 0]
+        if not wanted or not len(self.tag_codes):
+            return np.zeros(len(self), dtype=bool)
+        hits = np.isin(self.tag_codes, wanted).astype(np.int32)
+        # Per-row sum over each CSR slice; empty slices must be skipped by reduceat
+        counts = np.zeros(len(self), dtype=np.int32)
+        non_empty = self.tag_offsets[:-1] < self.tag_offsets[1:]
+        counts[non_empty] = np.add.reduceat(hits, self.tag_offsets[:-1][non_empty])
+        return counts > 0
+
+    def filter_mask(self, category=None, vendor=None, min_price=None, max_price=None, tags=None, in_stock=None):
+        mask = np.ones(len(self), dtype=bool)
+        # -1 is also the code of rows without a type or vendor, so unknown values match nothing
+        if category is not None:
+            code = self.categories.code_of(category)
+            mask &= self.category_codes == code if code >= 0 else False
+        if vendor is not None:
+            code = self.vendors.code_of(vendor)
+            mask &= self.vendor_codes == code if code >= 0 else False
+        if min_price is not None or max_price is not None:
+            mask &= self.price_range_mask(min_price, max_price)
+        if tags:
+            mask &= self.tags_mask(tags)
+        if in_stock is not None:
+            mask &= (self.stock > 0) == bool(in_stock)
+        return mask
+
+    def discount_order(self, limit=None):
+        """Row indices sorted by absolute discount (compare-at minus price), largest first."""
+        discount = np.where(
+            (self.compare_at_cents >= 0) & (self.price_cents >= 0),
+            self.compare_at_cents - self.price_cents,
+            0,
+        )
+        if limit is not None and limit < len(discount):
+            top = np.argpartition(-discount, limit - 1)[:limit]
+            return top[np.argsort(-discount[top], kind="stable")]
+        return np.argsort(-discount, kind="stable")
@@ -0,0 +1,121 @@
+import asyncio
+import secrets
+from collections import OrderedDict
+
+from resilience import is_error
+from tracing import create_background_task, note_outcome
+
+PAGE_SIZE = 3
+# How many ranked ids a search or filter fetches up front for its cursor
+CURSOR_FETCH_LIMIT = 60
+
+
+class ResultCursors:
+    """Ranked result lists of one session, paged from memory.
+
+    A search or filter stores its full ranked id list behind an opaque
+    cursor and returns the first page. Asking for "next" or "more" then
+    reads the following page from memory instead of re-running the query.
+    """
+
+    def __init__(self, page_size=PAGE_SIZE, max_cursors=20):
+        self.page_size = page_size
+        self.max_cursors = max_cursors
+        self._cursors = OrderedDict()
+        self.stats = {"opened": 0, "pages_served": 0}
+
+    def open(self, product_ids, source=None, page_size=None, extra=None):
+        """Store a ranked id list; returns its first page plus `extra` fields."""
+        cursor = secrets.token_urlsafe(6)
+        self._cursors[cursor] = {
+            "ids": list(product_ids),
+            "position": 0,
+            "page_size": page_size or self.page_size,
+            "source": source,
+        }
+        while len(self._cursors) > self.max_cursors:
+            self._cursors.popitem(last=False)
+        self.stats["opened"] += 1
+        return {**self.next_page(cursor), **(extra or {})}
+
+    def next_page(self, cursor, page_size=None):
+        """The next unseen page of a cursor (empty with has_more False at the end)."""
+        state = self._cursors.get(cursor)
+        if state is None:
+            return {"error": "Unknown or expired cursor; run the search again", "cursor": cursor}
+        self._cursors.move_to_end(cursor)
+        size = page_size or state["page_size"]
+        start = state["position"]
+        ids = state["ids"][start:start + size]
+        state["position"] = start + len(ids)
+        self.stats["pages_served"] += 1
+        note_outcome("cursor")
+        return {
+            "product_ids": ids,
+            "cursor": cursor,
+            "total": len(state["ids"]),
+            "shown": state["position"],
+            "has_more": state["position"] < len(state["ids"]),
+        }
+
+    def upcoming(self, cursor, page_size=None):
+        """Ids of the page that `next_page` would return, without advancing."""
+        state = self._cursors.get(cursor)
+        if state is None:
+            return []
+        start = state["position"]
+        return state["ids"][start:start + (page_size or state["page_size"])]
+
+    def latest(self):
+        return next(reversed(self._cursors), None)
+
+
+class ProductPrefetcher:
+    """Hydrates products ahead of display and shares in-flight fetches.
+
+    `fetch` is an async function taking a product id. Results stay in
+    memory for the session (LRU bounded); errors are dropped so they can be
+    retried.
+    """
+
+    def __init__(self, fetch, max_products=200):
+        self.fetch = fetch
+        self.max_products = max_products
+        self._products = OrderedDict()
+        self.stats = {"prefetched": 0, "hits": 0, "misses": 0}
+
+    def _task(self, product_id, background=False):
+        task = self._products.get(product_id)
+        if task is None:
+            # Prefetches run past the tool call that started them, so they are not traced as part of it
+            fetch = self.fetch(product_id)
+            task = create_background_task(fetch) if background else asyncio.ensure_future(fetch)
+            self._products[product_id] = task
+            task.add_done_callback(lambda done: self._forget_errors(product_id, done))
+            while len(self._products) > self.max_products:
+                self._products.popitem(last=False)
+        else:
+            self._products.move_to_end(product_id)
+        return task
+
+    def _forget_errors(self, product_id, task):
+        if task.cancelled() or task.exception() is not None or is_error(task.result()):
+            if self._products.get(product_id) is task:
+                del self._products[product_id]
+
+    def prefetch(self, product_ids):
+        for product_id in product_ids:
+            if product_id not in self._products:
+                self.stats["prefetched"] += 1
+                self._task(product_id, background=True)
+
+    async def get(self, product_ids):
+        tasks = []
+        for product_id in product_ids:
+            if product_id in self._products:
+                self.stats["hits"] += 1
+                note_outcome("prefetched")
+            else:
+                self.stats["misses"] += 1
+            tasks.append(self._task(product_id))
+        return list(await asyncio.gather(*tasks))
@@ -0,0 +1,104 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from columnar import category_of, subcategory_of
+
+
+def product_facets(product):
+    """(category, subcategory, vendor) of a REST-shaped (or local JSON) product.
+
+    The category is the first level of a "Category > Subcategory" product
+    type and the subcategory its last level (or the explicit subcategory).
+    """
+    return (
+        category_of(product.get("product_type") or product.get("category")),
+        subcategory_of(product),
+        product.get("vendor") or product.get("brand") or None,
+    )
+
+
+class FacetCatalog:
+    """Product counts per category, subcategory and vendor, answered from memory.
+
+    Everything derives from one Counter of (category, subcategory, vendor)
+    combinations, which stays small however large the catalog is and can
+    be updated in place as products change. Names are matched
+    case-insensitively, like the columnar catalog's string tables.
+    """
+
+    def __init__(self):
+        self.combos = Counter()
+        self.names = {}
+
+    def _key(self, facets):
+        key = []
+        for name in facets:
+            if name:
+                lowered = name.lower()
+                self.names.setdefault(lowered, name)
+                key.append(lowered)
+            else:
+                key.append(None)
+        return tuple(key)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Vectorized build from a ColumnarCatalog."""
+        facets = cls()
+        if not len(columns):
+            return facets
+        codes = np.stack([columns.category_codes, columns.subcategory_codes, columns.vendor_codes], axis=1)
+        combos, first_rows, counts = np.unique(codes, axis=0, return_index=True, return_counts=True)
+        # In order of first appearance, so ties rank as in from_products
+        order = np.argsort(first_rows, kind="stable")
+        for (category, subcategory, vendor), count in zip(combos[order].tolist(), counts[order].tolist()):
+            key = facets._key((columns.categories[category], columns.subcategories[subcategory], columns.vendors[vendor]))
+            facets.combos[key] += count
+        return facets
+
+    @classmethod
+    def from_products(cls, products):
+        facets = cls()
+        facets.add(products)
+        return facets
+
+    def add(self, products):
+        self.combos.update(self._key(product_facets(product)) for product in products)
+
+    def remove(self, products):
+        self.combos.subtract(self._key(product_facets(product)) for product in products)
+        self.combos += Counter()  # drop zero counts
+
+    def apply(self, old_products, new_products):
+        """Incremental update after `old_products` were replaced by `new_products`."""
+        self.remove(product for product in old_products if product is not None)
+        self.add(new_products)
+
+    def categories(self):
+        """[{"name", "count", "subcategories": [{"name", "count"}]}], largest first."""
+        totals, subcategories = Counter(), defaultdict(Counter)
+        for (category, subcategory, _), count in self.combos.items():
+            if category:
+                totals[category] += count
+                if subcategory:
+                    subcategories[category][subcategory] += count
+        return [
+            {
+                "name": self.names[category],
+                "count": count,
+                "subcategories": [{"name": self.names[name], "count": n} for name, n in subcategories[category].most_common()],
+            }
+            for category, count in totals.most_common()
+        ]
+
+    def brands(self, category=None):
+        """[{"name", "count"}] of vendors, optionally within one category (case-insensitive)."""
+        wanted = category.lower() if category else None
+        totals = Counter()
+        for (product_category, subcategory, vendor), count in self.combos.items():
+            if not vendor:
+                continue
+            if wanted is None or wanted in (product_category, subcategory):
+                totals[vendor] += count
+        return [{"name": self.names[vendor], "count": count} for vendor, count in totals.most_common()]
@@ -0,0 +1,225 @@
+import numpy as np
+
+FACET_LIMIT = 10
+
+
+class Bitmap:
+    """Set of row indices, stored sparse or dense depending on cardinality.
+
+    Like a roaring container: rare values keep a sorted int32 index array
+    (4 bytes per member), common ones a packed bitset (1 bit per row),
+    whichever is smaller.
+    """
+
+    __slots__ = ("size", "indices", "words", "cardinality")
+
+    def __init__(self, size, indices=None, words=None, cardinality=0):
+        self.size = size
+        self.indices = indices
+        self.words = words
+        self.cardinality = cardinality
+
+    @classmethod
+    def from_indices(cls, indices, size):
+        indices = np.asarray(indices, dtype=np.int32)
+        if len(indices) * 32 < size:
+            return cls(size, indices=np.sort(indices), cardinality=len(indices))
+        mask = np.zeros(size, dtype=bool)
+        mask[indices] = True
+        return cls.from_mask(mask)
+
+    @classmethod
+    def from_mask(cls, mask):
+        size = len(mask)
+        cardinality = int(np.count_nonzero(mask))
+        if cardinality * 32 < size:
+            return cls(size, indices=np.flatnonzero(mask).astype(np.int32), cardinality=cardinality)
+        return cls(size, words=np.packbits(mask, bitorder="little"), cardinality=cardinality)
+
+    @property
+    def nbytes(self):
+        return (self.indices if self.indices is not None else self.words).nbytes
+
+    def contains(self, rows):
+        """Vectorized membership test for an array of row indices."""
+        if self.indices is not None:
+            if not len(self.indices):
+                return np.zeros(len(rows), dtype=bool)
+            positions = np.searchsorted(self.indices, rows)
+            positions[positions == len(self.indices)] = 0
+            return self.indices[positions] == rows
+        return (self.words[rows >> 3] >> (rows & 7).astype(np.uint8)) & 1 == 1
+
+    def to_indices(self):
+        if self.indices is not None:
+            return self.indices
+        return np.flatnonzero(np.unpackbits(self.words, count=self.size, bitorder="little")).astype(np.int32)
+
+    def union(self, other):
+        if self.indices is not None and other.indices is not None:
+            return Bitmap.from_indices(np.union1d(self.indices, other.indices), self.size)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.to_indices()] = True
+        mask[other.to_indices()] = True
+        return Bitmap.from_mask(mask)
+
+
+def _group_bitmaps(codes, size, rows=None):
+    """{code: Bitmap} for a code column (or CSR codes with their owning rows)."""
+    rows = np.arange(size, dtype=np.int32) if rows is None else rows
+    valid = codes >= 0
+    codes, rows = codes[valid], rows[valid]
+    order = np.argsort(codes, kind="stable")
+    codes, rows = codes[order], rows[order]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    return {
+        int(group_codes[0]): Bitmap.from_indices(np.unique(group_rows), size)
+        for group_codes, group_rows in zip(np.split(codes, bounds), np.split(rows, bounds))
+        if len(group_codes)
+    }
+
+
+def _csr_rows(offsets):
+    """Owning row of every entry of a CSR code array."""
+    return np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+
+
+class FilterResult:
+    __slots__ = ("rows", "total", "facets")
+
+    def __init__(self, rows, total, facets):
+        self.rows = rows
+        self.total = total
+        self.facets = facets
+
+
+class FilterIndex:
+    """Faceted filter engine over a ColumnarCatalog.
+
+    Equality facets (category, subcategory, vendor, tag, color, in stock)
+    are bitmaps; price and rating ranges come from sorted value arrays.
+    A query intersects its candidate sets from the most to the least
+    selective and stops as soon as the intersection is empty.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        size = len(catalog)
+        self._tag_rows = _csr_rows(catalog.tag_offsets)
+        self._color_rows = _csr_rows(catalog.color_offsets)
+        self.bitmaps = {
+            "category": _group_bitmaps(catalog.category_codes, size),
+            "subcategory": _group_bitmaps(catalog.subcategory_codes, size),
+            "vendor": _group_bitmaps(catalog.vendor_codes, size),
+            "tag": _group_bitmaps(catalog.tag_codes, size, self._tag_rows),
+            "color": _group_bitmaps(catalog.color_codes, size, self._color_rows),
+        }
+        self.in_stock = Bitmap.from_mask(catalog.stock > 0)
+        self.out_of_stock = Bitmap.from_mask(catalog.stock <= 0)
+
+        priced = np.flatnonzero(catalog.price_cents >= 0)
+        self._price_rows = priced[np.argsort(catalog.price_cents[priced], kind="stable")].astype(np.int32)
+        self._sorted_prices = catalog.price_cents[self._price_rows]
+        rated = np.flatnonzero(~np.isnan(catalog.rating))
+        self._rating_rows = rated[np.argsort(catalog.rating[rated], kind="stable")].astype(np.int32)
+        self._sorted_ratings = catalog.rating[self._rating_rows]
+
+    @property
+    def tables(self):
+        catalog = self.catalog
+        return {
+            "category": catalog.categories,
+            "subcategory": catalog.subcategories,
+            "vendor": catalog.vendors,
+            "tag": catalog.tags,
+            "color": catalog.colors,
+        }
+
+    def nbytes(self):
+        bitmaps = sum(bitmap.nbytes for group in self.bitmaps.values() for bitmap in group.values())
+        return bitmaps + self.in_stock.nbytes + self.out_of_stock.nbytes + sum(
+            array.nbytes for array in (self._price_rows, self._sorted_prices, self._rating_rows, self._sorted_ratings)
+        )
+
+    def _any_of(self, facet, values):
+        """Union of the bitmaps of `values`; None when none of them exist."""
+        table, bitmaps = self.tables[facet], self.bitmaps[facet]
+        result = None
+        for value in values:
+            bitmap = bitmaps.get(table.code_of(value))
+            if bitmap is not None:
+                result = bitmap if result is None else result.union(bitmap)
+        return result
+
+    def _range(self, rows, sorted_values, low, high):
+        start = np.searchsorted(sorted_values, low, side="left") if low is not None else 0
+        stop = np.searchsorted(sorted_values, high, side="right") if high is not None else len(sorted_values)
+        return Bitmap.from_indices(rows[start:stop], len(self.catalog))
+
+    def _candidates(self, category, subcategory, vendor, tags, colors, in_stock, min_price, max_price, min_rating):
+        """Candidate sets for each criterion, or None if some criterion cannot match."""
+        sets = []
+        for facet, values in (("category", [category] if category else None),
+                              ("subcategory", [subcategory] if subcategory else None),
+                              ("vendor", [vendor] if vendor else None),
+                              ("tag", tags), ("color", colors)):
+            if values:
+                bitmap = self._any_of(facet, values)
+                if bitmap is None:
+                    return None
+                sets.append(bitmap)
+        if in_stock is not None:
+            sets.append(self.in_stock if in_stock else self.out_of_stock)
+        if min_price is not None or max_price is not None:
+            low = int(round(min_price * 100)) if min_price is not None else None
+            high = int(round(max_price * 100)) if max_price is not None else None
+            sets.append(self._range(self._price_rows, self._sorted_prices, low, high))
+        if min_rating is not None:
+            sets.append(self._range(self._rating_rows, self._sorted_ratings, np.float32(min_rating), None))
+        return sets
+
+    def query(self, category=None, subcategory=None, vendor=None, tags=None, colors=None, in_stock=None,
+              min_price=None, max_price=None, min_rating=None, limit=20, offset=0, facets=True):
+        """Matching rows in catalog order, the total match count and facet counts."""
+        sets = self._candidates(category, subcategory, vendor, tags, colors, in_stock, min_price, max_price, min_rating)
+        if sets is None:
+            rows = np.zeros(0, dtype=np.int32)
+        elif not sets:
+            rows = np.arange(len(self.catalog), dtype=np.int32)
+        else:
+            sets.sort(key=lambda bitmap: bitmap.cardinality)
+            rows = sets[0].to_indices()
+            for bitmap in sets[1:]:
+                if not len(rows):
+                    break
+                rows = rows[bitmap.contains(rows)]
+        return FilterResult(
+            rows=rows[offset:offset + limit],
+            total=len(rows),
+            facets=self.facet_counts(rows) if facets else None,
+        )
+
+    def facet_counts(self, rows, limit=FACET_LIMIT):
+        """Most common values of each facet among `rows`: {facet: {value: count}}."""
+        catalog = self.catalog
+        selected = np.zeros(len(catalog), dtype=bool)
+        selected[rows] = True
+        code_sources = {
+            "category": catalog.category_codes[rows],
+            "subcategory": catalog.subcategory_codes[rows],
+            "vendor": catalog.vendor_codes[rows],
+            "tag": catalog.tag_codes[selected[self._tag_rows]],
+            "color": catalog.color_codes[selected[self._color_rows]],
+        }
+        counts = {}
+        for facet, codes in code_sources.items():
+            table = self.tables[facet]
+            codes = codes[codes >= 0]
+            if not len(codes):
+                counts[facet] = {}
+                continue
+            totals = np.bincount(codes, minlength=len(table))
+            top = np.argsort(-totals, kind="stable")[:limit]
+            counts[facet] = {table[int(code)]: int(totals[code]) for code in top if totals[code]}
+        counts["in_stock"] = int(np.count_nonzero(catalog.stock[rows] > 0))
+        return counts
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from loguru import logger
+
+# Titles, images, tags and options change rarely
+METADATA_TTL_SECS = float(os.environ.get("METADATA_TTL_SECS", 6 * 3600))
+# Prices and stock change all the time
+PRICE_STOCK_TTL_SECS = float(os.environ.get("PRICE_STOCK_TTL_SECS", 60))
+# Shopify returns at most 250 products per request
+REFRESH_BATCH_SIZE = 250
+# After a failed refresh, stale prices and stock are served this long before trying again
+REFRESH_BACKOFF_SECS = 10.0
+
+VOLATILE_FIELDS = ("price", "compare_at_price", "inventory_quantity")
+
+
+def _key(product_id):
+    try:
+        return int(product_id)
+    except (TypeError, ValueError):
+        return product_id
+
+
+def volatile_fields(variants):
+    """{variant id: {price, compare_at_price, inventory_quantity}} of a variant list."""
+    return {
+        variant.get("id"): {field: variant.get(field) for field in VOLATILE_FIELDS if field in variant}
+        for variant in variants or []
+    }
+
+
+class ProductCache:
+    """Products cached in two tiers with separate TTLs.
+
+    The metadata tier keeps whole products for `metadata_ttl`. The
+    volatile tier keeps each variant's price, compare-at price and stock for
+    `volatile_ttl`. Reads overlay the volatile tier on the metadata, so a
+    product's stock can be refreshed many times without refetching it.
+
+    Stale volatile entries are refreshed in batches. A refresh for one
+    product also takes along other recently read products whose prices
+    and stock are stale, up to REFRESH_BATCH_SIZE per request.
+    """
+
+    def __init__(self, metadata_ttl=METADATA_TTL_SECS, volatile_ttl=PRICE_STOCK_TTL_SECS, max_products=5000,
+                 clock=time.monotonic):
+        self.metadata_ttl = metadata_ttl
+        self.volatile_ttl = volatile_ttl
+        self.max_products = max_products
+        self.clock = clock
+        self._metadata = OrderedDict()
+        self._volatile = OrderedDict()
+        self._retry_after = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"metadata_hits": 0, "metadata_misses": 0, "volatile_hits": 0,
+                      "refresh_requests": 0, "refreshed": 0, "refresh_errors": 0}
+
+    def _put(self, table, key, value):
+        table[key] = (value, self.clock())
+        table.move_to_end(key)
+        while len(table) > self.max_products:
+            table.popitem(last=False)
+
+    def remember(self, product):
+        """Store a full product in both tiers."""
+        if not product or product.get("id") is None:
+            return
+        key = _key(product["id"])
+        with self._lock:
+            self._put(self._metadata, key, product)
+            self._put(self._volatile, key, volatile_fields(product.get("variants")))
+
+    def remember_volatile(self, product_id, variants):
+        with self._lock:
+            self._put(self._volatile, _key(product_id), volatile_fields(variants))
+
+    def metadata(self, product_id):
+        """The cached product, or None when missing or older than the metadata TTL."""
+        key = _key(product_id)
+        with self._lock:
+            entry = self._metadata.get(key)
+            if entry is None or self.clock() - entry[1] >= self.metadata_ttl:
+                self.stats["metadata_misses"] += 1
+                return None
+            self._metadata.move_to_end(key)
+            self.stats["metadata_hits"] += 1
+            return entry[0]
+
+    def _is_fresh(self, key, now):
+        entry = self._volatile.get(key)
+        return entry is not None and now - entry[1] < self.volatile_ttl
+
+    def stale_ids(self, product_ids):
+        """Ids whose price and stock are missing or older than the volatile TTL."""
+        now = self.clock()
+        with self._lock:
+            return [product_id for product_id in product_ids if not self._is_fresh(_key(product_id), now)]
+
+    def refresh(self, product_ids, fetch_variants, with_recent=True):
+        """Refresh the stale prices and stock of `product_ids`, plus other stale recently read products.
+
+        `fetch_variants(ids)` returns {product id: variants}. On failure the
+        stale values stay in place and refreshes pause for REFRESH_BACKOFF_SECS.
+        With `with_recent=False` only `product_ids` are refreshed.
+        """
+        now = self.clock()
+        with self._lock:
+            if now < self._retry_after:
+                return
+            wanted = [_key(product_id) for product_id in product_ids if not self._is_fresh(_key(product_id), now)]
+            self.stats["volatile_hits"] += len(product_ids) - len(wanted)
+            if not wanted:
+                return
+            batch = list(dict.fromkeys(wanted))
+            for key in reversed(self._metadata) if with_recent else ():
+                if len(batch) >= REFRESH_BATCH_SIZE:
+                    break
+                if key not in batch and not self._is_fresh(key, now):
+                    batch.append(key)
+        for start in range(0, len(batch), REFRESH_BATCH_SIZE):
+            chunk = batch[start:start + REFRESH_BATCH_SIZE]
+            self.stats["refresh_requests"] += 1
+            try:
+                fetched = fetch_variants(chunk)
+            except Exception as e:
+                logger.warning(f"Price and stock refresh failed, serving cached values: {e}")
+                self.stats["refresh_errors"] += 1
+                with self._lock:
+                    self._retry_after = self.clock() + REFRESH_BACKOFF_SECS
+                return
+            for product_id, variants in fetched.items():
+                self.remember_volatile(product_id, variants)
+            self.stats["refreshed"] += len(fetched)
+
+    def merge(self, product):
+        """A copy of `product` with the latest cached price and stock of each variant."""
+        with self._lock:
+            entry = self._volatile.get(_key(product.get("id")))
+        if entry is None:
+            return product
+        latest = entry[0]
+        return {
+            **product,
+            "variants": [
+                {**variant, **latest.get(variant.get("id"), {})}
+                for variant in product.get("variants") or []
+            ],
+        }
+
+    def price_stock(self, product_id):
+        """(first variant price, total stock) from the volatile tier, or None when not cached."""
+        with self._lock:
+            entry = self._volatile.get(_key(product_id))
+        if entry is None or not entry[0]:
+            return None
+        variants = list(entry[0].values())
+        price = variants[0].get("price")
+        stock = sum(int(variant.get("inventory_quantity") or 0) for variant in variants)
+        return (float(price) if price not in (None, "") else None), stock
+
+    def clear(self):
+        with self._lock:
+            self._metadata.clear()
+            self._volatile.clear()
+            self._retry_after = 0.0
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from latency import percentile
+
+
+class LatencyTracker:
+    """Rolling latency window; the hedge delay is its p90."""
+
+    def __init__(self, window=200, quantile=0.9, default_ms=800, min_ms=50, max_ms=3000, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.quantile = quantile
+        self.default_ms = default_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms):
+        with self._lock:
+            self.samples.append(elapsed_ms)
+
+    def delay_secs(self):
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return self.default_ms / 1000
+            delay_ms = percentile(list(self.samples), self.quantile * 100)
+        return min(max(delay_ms, self.min_ms), self.max_ms) / 1000
+
+
+class RateBudget:
+    """Token bucket mirroring Shopify's REST leaky bucket (40 requests, 2/s)."""
+
+    def __init__(self, rate_per_sec=2.0, burst=40, clock=time.monotonic):
+        self.rate = rate_per_sec
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, reserve=0):
+        """Take a token if at least `reserve` tokens would be left; never blocks."""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens - 1 < reserve:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def make_sessions(count=2, pool_size=8):
+    """Independent sessions, so a hedge never reuses the primary's connection."""
+    sessions = []
+    for _ in range(count):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        sessions.append(session)
+    return sessions
+
+
+class Hedger:
+    """Hedged GETs: if the first request is slower than the p90 delay, a duplicate races it.
+
+    Only use for idempotent requests. Every request takes a rate budget
+    token when one is available. A hedge is only sent while at least
+    `hedge_reserve` tokens would remain, so hedging never eats the budget that
+    primary requests need. The first usable response wins: no exception,
+    status below 500 and not 429. The loser is cancelled if it has not
+    started yet, or its response is closed as soon as it arrives.
+    """
+
+    def __init__(self, sessions=None, tracker=None, budget=None, hedge_reserve=20, max_workers=16):
+        self.sessions = sessions or make_sessions()
+        self.tracker = tracker or LatencyTracker()
+        self.budget = budget or RateBudget()
+        self.hedge_reserve = hedge_reserve
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._next_session = 0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+
+    def _pick_sessions(self):
+        with self._lock:
+            index = self._next_session
+            self._next_session = (index + 1) % len(self.sessions)
+        return self.sessions[index], self.sessions[(index + 1) % len(self.sessions)]
+
+    def _timed_get(self, session, url, kwargs):
+        started = time.monotonic()
+        response = session.get(url, **kwargs)
+        self.tracker.record((time.monotonic() - started) * 1000)
+        return response
+
+    @staticmethod
+    def _usable(future):
+        if future.exception() is not None:
+            return False
+        status = future.result().status_code
+        return status < 500 and status != 429
+
+    @staticmethod
+    def _discard(future):
+        if not future.cancel():
+            future.add_done_callback(lambda done: done.exception() is None and done.result().close())
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.stats["requests"] += 1
+        self.budget.try_acquire()
+        primary_session, hedge_session = self._pick_sessions()
+        primary = self._executor.submit(self._timed_get, primary_session, url, kwargs)
+
+        done, _ = wait([primary], timeout=self.tracker.delay_secs())
+        if done:
+            return primary.result()
+
+        if not self.budget.try_acquire(reserve=self.hedge_reserve):
+            with self._lock:
+                self.stats["budget_denied"] += 1
+            return primary.result()
+
+        with self._lock:
+            self.stats["hedged"] += 1
+        hedge = self._executor.submit(self._timed_get, hedge_session, url, kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for winner in done:
+                if self._usable(winner):
+                    for loser in pending | ({primary, hedge} - {winner}):
+                        self._discard(loser)
+                    if winner is hedge:
+                        with self._lock:
+                            self.stats["hedge_wins"] += 1
+                    return winner.result()
+        # Neither was usable: surface the primary's error or response
+        self._discard(hedge)
+        return primary.result()
+
+    def report(self):
+        stats = dict(self.stats)
+        stats["hedge_rate"] = stats["hedged"] / stats["requests"] if stats["requests"] else 0.0
+        stats["hedge_win_rate"] = stats["hedge_wins"] / stats["hedged"] if stats["hedged"] else 0.0
+        stats["hedge_delay_ms"] = round(self.tracker.delay_secs() * 1000, 1)
+        return stats
@@ -0,0 +1,32 @@
+import json
+import os
+from pathlib import Path
+
+# Where per-session turn latency reports are appended (one JSON object per line)
+TURN_LATENCY_LOG = os.environ.get("TURN_LATENCY_LOG")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies_ms):
+    return {
+        "turns": len(latencies_ms),
+        "p50_ms": percentile(latencies_ms, 50),
+        "p90_ms": percentile(latencies_ms, 90),
+        "max_ms": max(latencies_ms) if latencies_ms else None,
+    }
+
+
+def write_report(report: dict, path=TURN_LATENCY_LOG):
+    """Append a session report to `path` (no-op when unset)."""
+    if not path:
+        return
+    with open(Path(path), "a") as file:
+        file.write(json.dumps(report) + "\n")
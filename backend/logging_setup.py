@@ -0,0 +1,228 @@
+"""Logging for the bot and the server.
+
+- The sink is enqueued: records are written by a background thread, so a
+  slow stderr never blocks the audio event loop.
+- DEBUG and TRACE records are sampled per logger name prefix and rate
+  limited per logger (pipecat logs every frame at DEBUG). INFO and above
+  always pass.
+- With LOG_JSON set, each record is one JSON line carrying the session id.
+- The level can be changed at runtime. The server writes it to
+  LOG_LEVEL_FILE and running bots pick it up within a few seconds.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from loguru import logger
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "DEBUG").upper()
+LOG_JSON = os.environ.get("LOG_JSON", "false").lower() in ("1", "true", "yes")
+# Set to false to write synchronously from the logging thread (for comparisons)
+LOG_ENQUEUE = os.environ.get("LOG_ENQUEUE", "true").lower() in ("1", "true", "yes")
+# Share of DEBUG/TRACE records kept per logger name prefix, e.g. "pipecat=0.1,pipecat.transports=0.01"
+LOG_SAMPLING = os.environ.get("LOG_SAMPLING", "pipecat=0.1")
+# Most DEBUG/TRACE records per second from one logger (0 = unlimited)
+LOG_DEBUG_RATE_LIMIT = float(os.environ.get("LOG_DEBUG_RATE_LIMIT", 50))
+LOG_LEVEL_FILE = Path(os.environ.get("LOG_LEVEL_FILE", Path(os.path.dirname(os.path.abspath(__file__))) / "data" / "log_level"))
+
+TEXT_FORMAT = "{time:HH:mm:ss.SSS} | {level: <8} | {extra[session_id]} | {name}:{function}:{line} - {message}\n{exception}"
+_INFO = 20
+
+_active_filter = None
+
+
+def parse_sampling(spec):
+    """{"pipecat": 0.1, ...} from "pipecat=0.1,..."."""
+    rates = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            prefix, rate = item.split("=", 1)
+            rates[prefix.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+def level_no(level):
+    """Severity number of a level name; ValueError for unknown names."""
+    return logger.level(str(level).upper()).no
+
+
+class LogFilter:
+    """Loguru filter: runtime level, then sampling and rate limits for debug records.
+
+    Sampling is deterministic (every Nth record of a logger), so a sampled
+    log still shows a regular trace of the loop. Counters are updated
+    without a lock; a rare lost increment only skews the sample slightly.
+    """
+
+    def __init__(self, level=LOG_LEVEL, sampling=None, rate_limit=LOG_DEBUG_RATE_LIMIT, clock=time.monotonic):
+        self.level = str(level).upper()
+        self.level_no = level_no(self.level)
+        self.sampling = sorted((sampling or {}).items(), key=lambda item: -len(item[0]))
+        self.rate_limit = rate_limit
+        self.clock = clock
+        self._every = {}
+        self._seen = Counter()
+        self._buckets = {}
+        self.dropped_sampled = Counter()
+        self.dropped_rate_limited = Counter()
+        self.mode = None
+
+    def set_level(self, level):
+        number = level_no(level)
+        self.level, self.level_no = str(level).upper(), number
+
+    def _sample_every(self, name):
+        every = self._every.get(name)
+        if every is None:
+            rate = next((rate for prefix, rate in self.sampling if name == prefix or name.startswith(prefix + ".")), 1.0)
+            every = self._every[name] = round(1 / rate) if rate > 0 else 0
+        return every
+
+    def _within_rate(self, name):
+        now = self.clock()
+        tokens, updated = self._buckets.get(name, (self.rate_limit, now))
+        tokens = min(self.rate_limit, tokens + (now - updated) * self.rate_limit)
+        if tokens < 1:
+            self._buckets[name] = (tokens, now)
+            return False
+        self._buckets[name] = (tokens - 1, now)
+        return True
+
+    def __call__(self, record):
+        number = record["level"].no
+        if number < self.level_no:
+            return False
+        if number >= _INFO:
+            return True
+        name = record["name"] or ""
+        every = self._sample_every(name)
+        if every != 1:
+            self._seen[name] += 1
+            if every == 0 or self._seen[name] % every != 1 % every:
+                self.dropped_sampled[name] += 1
+                return False
+        if self.rate_limit and not self._within_rate(name):
+            self.dropped_rate_limited[name] += 1
+            return False
+        return True
+
+    def stats(self, limit=10):
+        return {
+            "mode": self.mode,
+            "level": self.level,
+            "dropped_sampled": dict(self.dropped_sampled.most_common(limit)),
+            "dropped_rate_limited": dict(self.dropped_rate_limited.most_common(limit)),
+        }
+
+
+def _json_format(record):
+    payload = {
+        "ts": record["time"].isoformat(timespec="milliseconds"),
+        "level": record["level"].name,
+        "session_id": record["extra"].get("session_id"),
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    extra = {key: value for key, value in record["extra"].items() if key not in ("session_id", "_json")}
+    if extra:
+        payload["extra"] = extra
+    record["extra"]["_json"] = json.dumps(payload, default=str)
+    return "{extra[_json]}\n{exception}"
+
+
+def configure_logging(session_id=None, level=LOG_LEVEL, json_lines=LOG_JSON, enqueue=LOG_ENQUEUE,
+                      sampling=LOG_SAMPLING, rate_limit=LOG_DEBUG_RATE_LIMIT, sink=sys.stderr):
+    """Replace loguru's handlers with the configured sink; returns its LogFilter."""
+    global _active_filter
+    log_filter = LogFilter(level, parse_sampling(sampling), rate_limit)
+    logger.remove()
+    logger.configure(extra={"session_id": session_id or "-"})
+    logger.add(
+        sink,
+        level=0,
+        filter=log_filter,
+        format=_json_format if json_lines else TEXT_FORMAT,
+        enqueue=enqueue,
+        backtrace=False,
+        diagnose=False,
+    )
+    # Reported per session so turn_latency can compare logging setups
+    log_filter.mode = f"{'enqueue' if enqueue else 'sync'}{'+sampled' if sampling or rate_limit else ''}"
+    _active_filter = log_filter
+    return log_filter
+
+
+def current_level():
+    return _active_filter.level if _active_filter else None
+
+
+def set_level(level):
+    """Change the level of this process; ValueError for unknown levels."""
+    if _active_filter is None:
+        raise RuntimeError("Logging is not configured")
+    _active_filter.set_level(level)
+    logger.info(f"Log level set to {_active_filter.level}")
+
+
+def write_level_file(level, path=LOG_LEVEL_FILE, keep_since=None):
+    """Publish a level for running bots to pick up.
+
+    With `keep_since` a level published at or after that time (e.g. changed
+    at runtime through another worker) is kept, while an older file is left
+    over from a previous server run and replaced.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(str(level).upper())
+    try:
+        if keep_since is None or _modified_before(path, keep_since):
+            os.replace(tmp_path, path)
+        else:
+            # Linking fails if the file exists, so concurrent workers can't race past the check
+            os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _modified_before(path, timestamp):
+    try:
+        return path.stat().st_mtime < timestamp
+    except FileNotFoundError:
+        return False
+
+
+def watch_level_file(path=LOG_LEVEL_FILE, interval=2.0):
+    """Apply levels written by the server, polling the file's mtime in a daemon thread."""
+    path = Path(path)
+    stop = threading.Event()
+
+    def apply_if_changed(last_mtime):
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return last_mtime
+        if mtime != last_mtime:
+            level = path.read_text().strip()
+            try:
+                if level and level != current_level():
+                    set_level(level)
+            except ValueError:
+                logger.warning(f"Ignoring unknown log level {level!r} in {path}")
+        return mtime
+
+    def poll():
+        last_mtime = apply_if_changed(None)
+        while not stop.wait(interval):
+            last_mtime = apply_if_changed(last_mtime)
+
+    threading.Thread(target=poll, name="log-level-watcher", daemon=True).start()
+    return stop
@@ -0,0 +1,144 @@
+"""Event-loop stall detection for bot processes.
+
+A heartbeat task on the loop sleeps LOOP_LAG_INTERVAL_MS at a time and
+records how late it wakes up: that lateness is the loop lag, kept as a
+histogram for the session report. A monitor thread watches the heartbeat.
+When the loop is blocked for longer than LOOP_STALL_MS, it captures the
+loop thread's stack while the blocking callback is still running. It also
+names the tool handler that callback belongs to, for handlers wrapped
+with LoopWatchdog.wrap().
+"""
+import asyncio
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from loguru import logger
+
+from latency import percentile
+
+LOOP_WATCHDOG_ENABLED = os.environ.get("LOOP_WATCHDOG_ENABLED", "true").lower() in ("1", "true", "yes")
+# Loop callbacks blocking longer than this are reported with their stack
+LOOP_STALL_MS = float(os.environ.get("LOOP_STALL_MS", 100))
+# Heartbeat period; also the resolution of the lag measurements
+LOOP_LAG_INTERVAL_MS = float(os.environ.get("LOOP_LAG_INTERVAL_MS", 20))
+
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, math.inf)
+STACK_DEPTH = 12
+MAX_STALLS = 20
+# Lag samples kept for percentiles (10 minutes at the default interval)
+MAX_LAG_SAMPLES = 30000
+
+
+async def _watched(tool, handler, args, kwargs):
+    # The monitor finds this frame on the loop thread's stack to name the tool
+    return await handler(*args, **kwargs)
+
+
+def _tool_on_stack(frame):
+    while frame is not None:
+        if frame.f_code is _watched.__code__:
+            return frame.f_locals.get("tool")
+        frame = frame.f_back
+    return None
+
+
+class LoopWatchdog:
+    """Loop lag histogram and stall captures for one event loop."""
+
+    def __init__(self, stall_ms=LOOP_STALL_MS, interval_ms=LOOP_LAG_INTERVAL_MS, max_stalls=MAX_STALLS):
+        self.stall_ms = stall_ms
+        self.interval = interval_ms / 1000
+        self.max_stalls = max_stalls
+        self.lags_ms = deque(maxlen=MAX_LAG_SAMPLES)
+        self.histogram = [0] * len(LAG_BUCKETS_MS)
+        self.stalls = []
+        self.stall_count = 0
+        self.stalled_ms = 0.0
+        self._lock = threading.Lock()
+        self._pending = None
+        self._last_beat = None
+        self._thread_id = None
+        self._heartbeat = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start watching the running loop; call from a coroutine."""
+        self._thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._heartbeat = asyncio.create_task(self._beat())
+        threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.cancel()
+
+    def wrap(self, name, handler):
+        """Wrap an async tool handler so stalls inside it are attributed to `name`."""
+        async def watched(*args, **kwargs):
+            return await _watched(name, handler, args, kwargs)
+
+        return watched
+
+    async def _beat(self):
+        while True:
+            scheduled = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._last_beat = now
+            self._record_lag(max(0.0, (now - scheduled) * 1000))
+
+    def _record_lag(self, lag_ms):
+        self.lags_ms.append(lag_ms)
+        self.histogram[next(i for i, bound in enumerate(LAG_BUCKETS_MS) if lag_ms <= bound)] += 1
+        with self._lock:
+            stall, self._pending = self._pending, None
+        if stall is None and lag_ms <= self.stall_ms:
+            return
+        # A stall between two monitor checks is still counted, without a stack
+        stall = stall or {"tool": None, "stack": None}
+        stall["ms"] = round(lag_ms, 1)
+        self.stall_count += 1
+        self.stalled_ms += lag_ms
+        if len(self.stalls) < self.max_stalls:
+            self.stalls.append(stall)
+        where = f" in tool {stall['tool']}" if stall["tool"] else ""
+        stack = "".join(stall["stack"][-3:]) if stall["stack"] else ""
+        logger.warning(f"Event loop blocked for {lag_ms:.0f} ms{where}\n{stack}")
+
+    def _monitor(self):
+        check = min(self.interval, self.stall_ms / 1000 / 4)
+        while not self._stop.wait(check):
+            blocked_ms = (time.perf_counter() - self._last_beat - self.interval) * 1000
+            if blocked_ms > self.stall_ms and self._pending is None:
+                self._capture()
+
+    def _capture(self):
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return
+        stall = {"tool": _tool_on_stack(frame), "stack": traceback.format_stack(frame, limit=STACK_DEPTH)}
+        with self._lock:
+            # The heartbeat may have run since the check; only keep captures of ongoing stalls
+            if (time.perf_counter() - self._last_beat - self.interval) * 1000 > self.stall_ms:
+                self._pending = stall
+
+    def report(self):
+        labels = [f"<={bound}" if bound != math.inf else f">{LAG_BUCKETS_MS[-2]}" for bound in LAG_BUCKETS_MS]
+        return {
+            "samples": sum(self.histogram),
+            "lag_p50_ms": round(percentile(self.lags_ms, 50), 2) if self.lags_ms else None,
+            "lag_p99_ms": round(percentile(self.lags_ms, 99), 2) if self.lags_ms else None,
+            "lag_max_ms": round(max(self.lags_ms), 1) if self.lags_ms else None,
+            "lag_histogram_ms": dict(zip(labels, self.histogram)),
+            "stall_threshold_ms": self.stall_ms,
+            "stall_count": self.stall_count,
+            "stalled_ms": round(self.stalled_ms, 1),
+            "stalls": self.stalls,
+        }
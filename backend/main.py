@@ -1,15 +1,22 @@
 import argparse
+import asyncio
 import os, httpx
-import subprocess
+import time
 from contextlib import asynccontextmanager
 from typing import Any, Dict
 
 import aiohttp
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
+from loguru import logger
+
+from logging_setup import configure_logging, current_level, set_level, watch_level_file, write_level_file
+from memory import start_tracing
+from static_files import IMMUTABLE_CACHE, PrecompressedStaticFiles, precompress_directory
+from supervisor import BotRegistry, BotSupervisor
+from thumbnails import CARD_WIDTH, MEDIA_TYPES, ThumbnailCache, ThumbnailError
 
 
 # Load environment variables from .env file
@@ -17,24 +24,23 @@ load_dotenv(override=True)
 DAILY_API_KEY = os.environ.get("DAILY_API_KEY")
 DEEPGRAM_API_KEY = os.environ.get("DEEPGRAM_API_KEY")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# Seconds bots get to exit after SIGTERM when the server shuts down
+BOT_DRAIN_TIMEOUT = float(os.environ.get("BOT_DRAIN_TIMEOUT", "10"))
+# Set once by the process that starts the server; uvicorn workers inherit it
+SERVER_STARTED_AT = float(os.environ.setdefault("SERVER_STARTED_AT", str(time.time())))
+
+configure_logging()
 
 # Maximum number of bot instances allowed per room
 MAX_BOTS_PER_ROOM = 1
 
-# Dictionary to track bot processes: {pid: (process, room_url)}
-bot_procs = {}
-
-daily_client = httpx.AsyncClient(base_url="https://api.daily.co/v1", headers={"Authorization": f"Bearer {DAILY_API_KEY}"})
+# Bot processes are tracked in a SQLite registry shared by all workers; each
+# worker keeps the process handles of the bots it spawned
+bot_supervisor = BotSupervisor(BotRegistry())
 
-def cleanup():
-    """Cleanup function to terminate all bot processes.
+thumbnail_cache = ThumbnailCache()
 
-    Called during server shutdown.
-    """
-    for entry in bot_procs.values():
-        proc = entry[0]
-        proc.terminate()
-        proc.wait()
+daily_client = httpx.AsyncClient(base_url="https://api.daily.co/v1", headers={"Authorization": f"Bearer {DAILY_API_KEY}"})
 
 
 @asynccontextmanager
@@ -42,13 +48,23 @@ async def lifespan(app: FastAPI):
     """FastAPI lifespan manager that handles startup and shutdown tasks.
 
     - Creates aiohttp session
-    - Initializes Daily API helper
-    - Cleans up resources on shutdown
+    - Reaps finished bots in the background
+    - Drains this worker's bots on shutdown
+    - Starts tracemalloc when MEMORY_TRACE_FRAMES is set
+    - Publishes the log level for bots (and the other workers) to follow,
+      unless one was already set at runtime since the server started
     """
+    start_tracing()
+    write_level_file(current_level(), keep_since=SERVER_STARTED_AT)
+    stop_level_watch = watch_level_file()
     aiohttp_session = aiohttp.ClientSession()
+    bot_supervisor.registry.mark_orphans_finished()
+    reaper = asyncio.create_task(bot_supervisor.run_reaper())
     yield
+    reaper.cancel()
+    stop_level_watch.set()
     await aiohttp_session.close()
-    cleanup()
+    await bot_supervisor.drain(timeout=BOT_DRAIN_TIMEOUT)
 
 
 # Initialize FastAPI app with lifespan manager
@@ -97,19 +113,17 @@ async def create_room_and_token() -> tuple[str, str]:
 
 @app.post("/api/connect")
 async def rtvi_connect(request: Request) -> Dict[Any, Any]:
-    print("Creating room for RTVI connection")
+    logger.info("Creating room for RTVI connection")
     room_url, token = await create_room_and_token()
-    print(f"Room URL: {room_url}")
+    logger.info(f"Room URL: {room_url}")
 
     # Start the bot process
     try:
-        proc = subprocess.Popen(
-            [f"python3 -m bot -u {room_url} -t {token}"],
-            shell=True,
-            bufsize=1,
+        bot_supervisor.spawn(
+            f"python3 -m bot -u {room_url} -t {token}",
+            room_url,
             cwd=os.path.dirname(os.path.abspath(__file__)),
         )
-        bot_procs[proc.pid] = (proc, room_url)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start subprocess: {e}")
 
@@ -119,19 +133,54 @@ async def rtvi_connect(request: Request) -> Dict[Any, Any]:
 
 @app.get("/api/status/{pid}")
 def get_status(pid: int):
-    # Look up the subprocess
-    proc = bot_procs.get(pid)
+    # Look up the subprocess in the shared registry
+    status = bot_supervisor.status(pid)
 
     # If the subprocess doesn't exist, return an error
-    if not proc:
+    if status is None:
         raise HTTPException(status_code=404, detail=f"Bot with process id: {pid} not found")
 
-    # Check the status of the subprocess
-    status = "running" if proc[0].poll() is None else "finished"
     return JSONResponse({"bot_id": pid, "status": status})
 
+@app.get("/api/memory")
+def get_memory():
+    # This worker's RSS (and top allocations when tracing) plus the last sampled RSS of every running bot
+    return JSONResponse(bot_supervisor.memory_report())
+
+@app.get("/api/log-level")
+def get_log_level():
+    return JSONResponse({"level": current_level()})
+
+@app.put("/api/log-level")
+async def put_log_level(request: Request):
+    # Applies to this worker right away; bots and other workers poll the level file
+    level = str((await request.json()).get("level", ""))
+    try:
+        set_level(level)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unknown log level: {level}")
+    write_level_file(current_level())
+    return JSONResponse({"level": current_level()})
+
+@app.get("/api/static/metrics")
+def get_static_metrics():
+    return JSONResponse(static_files.metrics.as_dict())
+
+@app.get("/api/thumbnail")
+def get_thumbnail(src: str, w: int = CARD_WIDTH, fmt: str = "webp"):
+    # Plain def: resizing runs in the threadpool, off the event loop
+    try:
+        path = thumbnail_cache.get(src, width=w, fmt=fmt)
+    except ThumbnailError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # Shopify image URLs carry a version parameter, so a URL's rendition never changes
+    return FileResponse(path, media_type=MEDIA_TYPES[fmt], headers={"Cache-Control": IMMUTABLE_CACHE})
+
 # Mount React's build output (the "dist" folder) at the root path.
-app.mount("/", StaticFiles(directory="frontend-dist", html=True), name="static")
+# Brotli/gzip variants are normally built into the image; this only fills in missing ones.
+precompress_directory("frontend-dist")
+static_files = PrecompressedStaticFiles(directory="frontend-dist", html=True)
+app.mount("/", static_files, name="static")
 
 if __name__ == "__main__":
     import uvicorn
@@ -144,13 +193,21 @@ if __name__ == "__main__":
     parser.add_argument("--host", type=str, default=default_host, help="Host address")
     parser.add_argument("--port", type=int, default=default_port, help="Port number")
     parser.add_argument("--reload", action="store_true", help="Reload code on change")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of worker processes (ignored with --reload)",
+    )
 
     config = parser.parse_args()
 
     # Start the FastAPI server
     uvicorn.run(
-        "server:app",
+        "main:app",
         host=config.host,
         port=config.port,
         reload=config.reload,
+        workers=None if config.reload else config.workers,
+        timeout_graceful_shutdown=int(BOT_DRAIN_TIMEOUT) + 5,
     )
@@ -0,0 +1,167 @@
+"""Process memory accounting: RSS, tracemalloc top allocations and per-session diffs.
+
+RSS is read from /proc (Linux); elsewhere only the peak from getrusage is
+known. tracemalloc slows allocation-heavy code down, so it only runs when
+MEMORY_TRACE_FRAMES is set.
+"""
+import os
+import resource
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Frames kept per traced allocation; 0 leaves tracemalloc off
+MEMORY_TRACE_FRAMES = int(os.environ.get("MEMORY_TRACE_FRAMES", 0))
+# Bots above the soft limit are logged; above the hard limit they are recycled (0 = no limit)
+BOT_RSS_SOFT_LIMIT_MB = float(os.environ.get("BOT_RSS_SOFT_LIMIT_MB", 0))
+BOT_RSS_LIMIT_MB = float(os.environ.get("BOT_RSS_LIMIT_MB", 0))
+
+MB = 1024 * 1024
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def to_mb(size):
+    return round(size / MB, 1) if size is not None else None
+
+
+def rss_bytes(pid=None):
+    """Current resident set size of a process (this one by default); None if unknown."""
+    try:
+        statm = Path(f"/proc/{pid or 'self'}/statm").read_text()
+        return int(statm.split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def child_pids(pid):
+    pids = []
+    for children in Path(f"/proc/{pid}/task").glob("*/children"):
+        try:
+            pids.extend(int(child) for child in children.read_text().split())
+        except (OSError, ValueError):
+            continue
+    return pids
+
+
+def tree_rss_bytes(pid):
+    """RSS of a process and its descendants (e.g. the shell wrapping a bot and the bot)."""
+    total, pending, seen = None, [pid], set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        rss = rss_bytes(current)
+        if rss is not None:
+            total = (total or 0) + rss
+            pending.extend(child_pids(current))
+    return total
+
+
+def start_tracing(frames=MEMORY_TRACE_FRAMES):
+    """Start tracemalloc when configured; returns whether it is tracing."""
+    if frames and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return tracemalloc.is_tracing()
+
+
+def take_snapshot():
+    """A tracemalloc snapshot without the tracer's and importlib's own allocations (None when off)."""
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+    )
+
+
+def _where(traceback):
+    frame = traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def top_allocations(snapshot=None, limit=10):
+    """Largest live allocations by source line; [] when tracemalloc is off."""
+    snapshot = snapshot or take_snapshot()
+    if snapshot is None:
+        return []
+    return [
+        {"where": _where(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def top_growth(before, after, limit=10):
+    """Source lines whose live allocations grew the most between two snapshots."""
+    return [
+        {"where": _where(stat.traceback), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+        for stat in after.compare_to(before, "lineno")[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def process_memory(limit=10):
+    return {
+        "pid": os.getpid(),
+        "rss_mb": to_mb(rss_bytes()),
+        "peak_rss_mb": to_mb(peak_rss_bytes()),
+        "tracing": tracemalloc.is_tracing(),
+        "top_allocations": top_allocations(limit=limit),
+    }
+
+
+class SessionMemory:
+    """RSS (and a tracemalloc snapshot when tracing) at session start, diffed at the end."""
+
+    def __init__(self):
+        self.rss_start = None
+        self.snapshot = None
+
+    def start(self):
+        self.rss_start = rss_bytes()
+        self.snapshot = take_snapshot()
+        return self
+
+    def finish(self, limit=10):
+        rss_end = rss_bytes()
+        report = {
+            "rss_start_mb": to_mb(self.rss_start),
+            "rss_end_mb": to_mb(rss_end),
+            "rss_growth_mb": to_mb(rss_end - self.rss_start) if None not in (rss_end, self.rss_start) else None,
+            "peak_rss_mb": to_mb(peak_rss_bytes()),
+        }
+        end_snapshot = take_snapshot() if self.snapshot is not None else None
+        if end_snapshot is not None:
+            report["top_growth"] = top_growth(self.snapshot, end_snapshot, limit)
+            report["traced_growth_kb"] = round(
+                (sum(stat.size for stat in end_snapshot.statistics("filename"))
+                 - sum(stat.size for stat in self.snapshot.statistics("filename"))) / 1024, 1)
+        return report
+
+
+class MemoryCeiling:
+    """Soft and hard RSS limits in MB; 0 disables a limit."""
+
+    def __init__(self, soft_mb=BOT_RSS_SOFT_LIMIT_MB, hard_mb=BOT_RSS_LIMIT_MB):
+        self.soft_mb = soft_mb
+        self.hard_mb = hard_mb
+
+    def check(self, rss):
+        """'ok', 'soft' or 'hard' for an RSS in bytes."""
+        if rss is None:
+            return "ok"
+        if self.hard_mb and rss >= self.hard_mb * MB:
+            return "hard"
+        if self.soft_mb and rss >= self.soft_mb * MB:
+            return "soft"
+        return "ok"
+
+    def as_dict(self):
+        return {"soft_mb": self.soft_mb or None, "hard_mb": self.hard_mb or None}
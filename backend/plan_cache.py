@@ -0,0 +1,230 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import sqlite_utils
+
+from speculation import normalize_transcript
+
+PLAN_CACHE_DB = Path(os.environ.get("PLAN_CACHE_DB", Path(os.path.dirname(os.path.abspath(__file__))) / "data" / "plan_cache.db"))
+PLAN_CACHE_THRESHOLD = float(os.environ.get("PLAN_CACHE_THRESHOLD", "0.8"))
+
+# Tools with side effects on the client are never replayed from the cache
+UNCACHEABLE_TOOLS = {"display_products_to_user", "next_page"}
+# Content of a tool message whose call has not returned yet
+IN_PROGRESS = "IN_PROGRESS"
+# Set by the model rather than taken from what the user said
+PAGING_ARGS = {"limit", "offset"}
+# Words that flip a comparison or negate a filter ("under 50" vs "over 50", "not in stock")
+QUALIFIER_WORDS = frozenset({
+    "over", "under", "above", "below", "more", "less", "fewer", "than", "least", "most",
+    "max", "maximum", "min", "minimum", "cheaper", "pricier", "between",
+    "not", "no", "without", "out", "except", "excluding", "dont", "isnt", "arent",
+})
+
+
+def normalize_utterance(text: str) -> str:
+    """Transcript normalization plus apostrophes, so "what's" matches "whats"."""
+    return normalize_transcript(text).replace("'", "")
+
+
+def trigrams(text: str) -> Counter:
+    padded = f"  {text} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def cosine_similarity(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[gram] for gram, count in a.items())
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+def _words(utterance: str) -> set:
+    return set(utterance.split())
+
+
+def _arg_values(value):
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _arg_values(item)
+    else:
+        yield value
+
+
+def _number_text(value) -> str:
+    value = float(value)
+    return normalize_utterance(str(int(value)) if value.is_integer() else str(value))
+
+
+def plan_fits_utterance(plan, utterance: str, cached_utterance: str = None) -> bool:
+    """Reject plans whose arguments don't appear in the new utterance.
+
+    "show me red shoes" and "show me red shirts" are near-duplicates by
+    n-grams, but a cached search_products(query="red shoes") must not be
+    replayed for the second one. Likewise numbers ("under 50" vs "under
+    80") must appear in the utterance. Comparison and negation words,
+    which decide min/max prices and booleans such as in_stock ("over 50",
+    "not in stock"), must be the same as in `cached_utterance`.
+    Paging arguments are chosen by the model and not checked.
+    """
+    padded = f" {utterance} "
+    for step in plan:
+        for name, arg in step["args"].items():
+            if name in PAGING_ARGS:
+                continue
+            for value in _arg_values(arg):
+                if isinstance(value, bool):
+                    continue
+                if isinstance(value, (int, float)):
+                    if f" {_number_text(value)} " not in padded:
+                        return False
+                elif isinstance(value, str) and normalize_utterance(value) not in utterance:
+                    return False
+    if cached_utterance is not None:
+        words, cached_words = _words(utterance), _words(cached_utterance)
+        if words & QUALIFIER_WORDS != cached_words & QUALIFIER_WORDS:
+            return False
+        if {word for word in words if word.isdigit()} != {word for word in cached_words if word.isdigit()}:
+            return False
+    return True
+
+
+class PlanRecorder:
+    """The tool calls of one opening turn's first LLM hop.
+
+    Calls are recorded until one arrives whose context already holds the
+    result of a recorded call. That call belongs to a later hop (e.g.
+    display_products_to_user while answering), so recording stops there.
+    Results still in progress don't count, so parallel first-hop calls are
+    all kept.
+    """
+
+    def __init__(self, utterance, clock=time.monotonic):
+        self.utterance = utterance
+        self.clock = clock
+        self.started_at = clock()
+        self.first_hop_ms = None
+        self.steps = []
+        self.closed = False
+        self._call_ids = set()
+
+    def _has_result(self, messages):
+        return any(
+            message.get("role") == "tool" and message.get("tool_call_id") in self._call_ids
+            and message.get("content") != IN_PROGRESS
+            for message in messages
+        )
+
+    def note_tool_call(self, name, args, tool_call_id=None, messages=()):
+        if self.closed:
+            return
+        if self._has_result(messages):
+            self.closed = True
+            return
+        if self.first_hop_ms is None:
+            self.first_hop_ms = (self.clock() - self.started_at) * 1000
+        self.steps.append({"name": name, "args": args})
+        if tool_call_id is not None:
+            self._call_ids.add(tool_call_id)
+
+
+class ToolPlanCache:
+    """Caches the first-hop tool calls the LLM made for an opening utterance.
+
+    Entries are keyed on normalized utterance plus catalog version and live
+    in SQLite so every bot process shares them. Lookups match near-duplicate
+    utterances by character trigram cosine similarity. Methods are
+    thread-safe, so the bot calls them through asyncio.to_thread.
+    """
+
+    def __init__(self, catalog_version: str, db_path=PLAN_CACHE_DB, threshold=PLAN_CACHE_THRESHOLD, max_entries=500):
+        self.catalog_version = str(catalog_version)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        if db_path is None:
+            self.db = sqlite_utils.Database(sqlite3.connect(":memory:", check_same_thread=False))
+        else:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite_utils.Database(sqlite3.connect(db_path, timeout=5, check_same_thread=False))
+        self.table = self.db["plans"]
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stored": 0, "saved_ms": 0.0}
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = []
+            if self.table.exists():
+                for row in self.table.rows_where("catalog_version = ?", [self.catalog_version]):
+                    self._entries.append({**row, "plan": json.loads(row["plan"]), "grams": trigrams(row["utterance"])})
+        return self._entries
+
+    def lookup(self, utterance: str):
+        """Return (plan, entry) for the closest cached utterance, or (None, None)."""
+        with self._lock:
+            return self._lookup(utterance)
+
+    def _lookup(self, utterance):
+        self.stats["lookups"] += 1
+        normalized = normalize_utterance(utterance)
+        grams = trigrams(normalized)
+
+        best, best_score = None, 0.0
+        for entry in self._load():
+            if entry["utterance"] == normalized:
+                best, best_score = entry, 1.0
+                break
+            score = cosine_similarity(grams, entry["grams"])
+            if score > best_score and plan_fits_utterance(entry["plan"], normalized, entry["utterance"]):
+                best, best_score = entry, score
+
+        if best is None or best_score < self.threshold:
+            self.stats["misses"] += 1
+            return None, None
+
+        self.stats["hits"] += 1
+        self.stats["saved_ms"] += best["first_hop_ms"]
+        self.table.update((best["utterance"], self.catalog_version), {"hits": best["hits"] + 1})
+        best["hits"] += 1
+        return best["plan"], best
+
+    def store(self, utterance: str, plan, first_hop_ms: float):
+        """Remember the tool calls made for `utterance` (ignored if not replayable)."""
+        if not plan or any(step["name"] in UNCACHEABLE_TOOLS for step in plan):
+            return
+        with self._lock:
+            self._store(utterance, plan, first_hop_ms)
+
+    def _store(self, utterance, plan, first_hop_ms):
+        normalized = normalize_utterance(utterance)
+        record = {
+            "utterance": normalized,
+            "catalog_version": self.catalog_version,
+            "plan": json.dumps(plan),
+            "first_hop_ms": round(first_hop_ms, 1),
+            "hits": 0,
+            "created_at": time.time(),
+        }
+        self.table.upsert(record, pk=("utterance", "catalog_version"))
+        self.stats["stored"] += 1
+
+        entries = [entry for entry in self._load() if entry["utterance"] != normalized]
+        entries.append({**record, "plan": plan, "grams": trigrams(normalized)})
+        self._entries = entries
+        self._prune()
+
+    def _prune(self):
+        """Drop plans for other catalog versions and the least used overflow."""
+        self.table.delete_where("catalog_version != ?", [self.catalog_version])
+        if self.table.count > self.max_entries:
+            self.db.execute(
+                "DELETE FROM plans WHERE rowid IN (SELECT rowid FROM plans ORDER BY hits ASC, created_at ASC LIMIT ?)",
+                [self.table.count - self.max_entries],
+            )
+            self._entries = None
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import time
+import uuid
+
+from loguru import logger
+from pipecat.frames.frames import (
+    BotInterruptionFrame,
+    ErrorFrame,
+    Frame,
+    InterimTranscriptionFrame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame,
+)
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContextFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from latency import summarize
+from plan_cache import PlanRecorder
+from speculation import SpeculativeTurn
+
+
+class TurnLatencyTracker(FrameProcessor):
+    """Measures end of user speech to first bot audio for every turn.
+
+    Place it right before the transport output so the measurement includes
+    STT finalization, the LLM hop(s) and TTS. Turns start at
+    UserStoppedSpeakingFrame. Profiles without local VAD never send one, so
+    until one is seen the final transcript (reported by the
+    `transcript_marker()` placed after STT) starts the turn instead.
+    """
+
+    def __init__(self, profile_name: str, **kwargs):
+        super().__init__(**kwargs)
+        self.profile_name = profile_name
+        self.latencies_ms = []
+        self.turn_start = "transcript"
+        self._speech_ended_at = None
+
+    def note_final_transcript(self):
+        if self.turn_start == "transcript" and self._speech_ended_at is None:
+            self._speech_ended_at = time.monotonic()
+
+    def transcript_marker(self) -> "FrameProcessor":
+        return _TranscriptMarker(self)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, UserStoppedSpeakingFrame):
+            self.turn_start = "vad"
+            self._speech_ended_at = time.monotonic()
+        elif isinstance(frame, TTSAudioRawFrame) and self._speech_ended_at is not None:
+            self.latencies_ms.append((time.monotonic() - self._speech_ended_at) * 1000)
+            self._speech_ended_at = None
+
+        await self.push_frame(frame, direction)
+
+    def report(self, **extra) -> dict:
+        return {"profile": self.profile_name, "turn_start": self.turn_start, **extra,
+                **summarize(self.latencies_ms), "latencies_ms": self.latencies_ms}
+
+
+class _TranscriptMarker(FrameProcessor):
+    """Pass-through after STT that tells the tracker when a final transcript arrives."""
+
+    def __init__(self, tracker, **kwargs):
+        super().__init__(**kwargs)
+        self._tracker = tracker
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, TranscriptionFrame) and not isinstance(frame, InterimTranscriptionFrame):
+            self._tracker.note_final_transcript()
+        await self.push_frame(frame, direction)
+
+
+class _StaleTurnGuard(FrameProcessor):
+    """Pass-through ahead of the LLM that drops a missed speculative turn from the context."""
+
+    def __init__(self, turn, **kwargs):
+        super().__init__(**kwargs)
+        self._turn = turn
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, OpenAILLMContextFrame) and direction == FrameDirection.DOWNSTREAM:
+            self._turn.discard_stale()
+        await self.push_frame(frame, direction)
+
+
+class SpeculativeTranscriptGate(FrameProcessor):
+    """Starts the LLM on a stable interim transcript instead of the final one.
+
+    Sits between STT and the user context aggregator. When an interim
+    transcript stabilizes, it is added to the context as the user message
+    and an OpenAILLMContextFrame starts inference right away (the
+    aggregator would hold transcriptions until the user stops speaking).
+    Final transcripts of a speculative turn are held until the user stops
+    speaking and then resolved together (see SpeculativeTurn). On a hit
+    they are dropped; on a miss the bot is interrupted and they are pushed
+    so the aggregator starts the turn on the right text. `context_guard()`
+    goes right before the LLM and clears the missed turn from the context.
+    """
+
+    def __init__(self, context, stabilizer=None, stats=None, **kwargs):
+        super().__init__(**kwargs)
+        self._context = context
+        self._turn = SpeculativeTurn(context, stabilizer, stats)
+        self._held = []
+        self.stats = self._turn.stats
+
+    def context_guard(self):
+        return _StaleTurnGuard(self._turn)
+
+    async def confirmed(self) -> bool:
+        """For client-visible tools: False when the speculative turn they belong to missed."""
+        return await self._turn.confirmed()
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, InterimTranscriptionFrame):
+            await self.push_frame(frame, direction)
+            if self._turn.on_interim(frame.text):
+                logger.debug(f"Speculative LLM start on: {frame.text!r}")
+                self._held = []
+                await self.push_frame(OpenAILLMContextFrame(self._context))
+        elif isinstance(frame, TranscriptionFrame):
+            speculative_text = self._turn.text
+            outcome = self._turn.on_final(frame.text)
+            if outcome is None:
+                await self.push_frame(frame, direction)
+                return
+            self._held.append(frame)
+            await self._resolved(outcome, speculative_text)
+        elif isinstance(frame, UserStoppedSpeakingFrame):
+            speculative_text = self._turn.text
+            # Held finals go out ahead of the stop, so the aggregator sees them in the turn
+            await self._resolved(self._turn.on_user_stopped(), speculative_text)
+            await self.push_frame(frame, direction)
+        elif isinstance(frame, UserStartedSpeakingFrame):
+            self._turn.on_user_started()
+            if not self._turn.active:
+                self._held = []
+            await self.push_frame(frame, direction)
+        else:
+            await self.push_frame(frame, direction)
+
+    async def _resolved(self, outcome, speculative_text):
+        if outcome == "hit":
+            logger.debug(f"Speculation hit on: {speculative_text!r}")
+        elif outcome == "miss":
+            held, self._held = self._held, []
+            logger.debug(f"Speculation wasted: {speculative_text!r} != {' '.join(frame.text for frame in held)!r}")
+            await self.push_frame(BotInterruptionFrame(), FrameDirection.UPSTREAM)
+            for frame in held:
+                await self.push_frame(frame)
+
+
+class CachingTTSMixin:
+    """Replays cached audio for recurring bot sentences instead of synthesizing them.
+
+    Mix in front of a TTS service class, e.g.
+    `class CachedDeepgramTTSService(CachingTTSMixin, DeepgramTTSService)`.
+    Caching at `run_tts` keeps the service's own sentence aggregation,
+    interruption handling and transcript frames intact; only the vendor
+    round trip is skipped on a hit. Audio is assumed to be 16-bit mono PCM.
+    """
+
+    def __init__(self, *, tts_cache, voice, sample_rate, replay_chunk_ms=40, **kwargs):
+        super().__init__(voice=voice, sample_rate=sample_rate, **kwargs)
+        self._tts_cache = tts_cache
+        self._cache_voice = voice
+        self._cache_sample_rate = sample_rate
+        self._replay_chunk_bytes = max(2, sample_rate * 2 * replay_chunk_ms // 1000)
+
+    async def run_tts(self, text: str):
+        if not self._tts_cache.cacheable(text):
+            async for frame in super().run_tts(text):
+                yield frame
+            return
+
+        audio = await self._tts_cache.aget(text, self._cache_voice, self._cache_sample_rate)
+        if audio is not None:
+            logger.debug(f"TTS cache hit: [{text}]")
+            yield TTSStartedFrame()
+            for start in range(0, len(audio), self._replay_chunk_bytes):
+                yield TTSAudioRawFrame(audio[start:start + self._replay_chunk_bytes], self._cache_sample_rate, 1)
+            yield TTSStoppedFrame()
+            return
+
+        chunks = []
+        failed = False
+        async for frame in super().run_tts(text):
+            if isinstance(frame, TTSAudioRawFrame):
+                chunks.append(frame.audio)
+            elif isinstance(frame, ErrorFrame):
+                failed = True
+            yield frame
+        if not failed:
+            self._tts_cache.put_in_background(text, self._cache_voice, self._cache_sample_rate, b"".join(chunks))
+
+
+class ToolPlanCacheProcessor(FrameProcessor):
+    """Skips the tool-selection LLM hop for opening utterances seen before.
+
+    Sits between the user context aggregator and the LLM. Only opening
+    turns (no tool calls in the conversation yet) are considered, since
+    later turns depend on what was already shown. On a hit the cached tool
+    calls are executed locally and added to the context, so the LLM starts
+    directly on the answering hop. On a miss, the tool calls reported through
+    `note_tool_call` during the first hop are stored as the plan (see
+    PlanRecorder for where the first hop ends).
+    """
+
+    def __init__(self, plan_cache, handlers, **kwargs):
+        super().__init__(**kwargs)
+        self._plan_cache = plan_cache
+        self._handlers = handlers
+        self._recording = None
+
+    def note_tool_call(self, name, args, tool_call_id=None, context=None):
+        if self._recording is not None:
+            self._recording.note_tool_call(name, args, tool_call_id, context.messages if context else ())
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, OpenAILLMContextFrame) and direction == FrameDirection.DOWNSTREAM:
+            await self._finish_recording()
+            messages = frame.context.messages
+            is_user_turn = bool(messages) and messages[-1].get("role") == "user"
+            is_opening = not any(message.get("role") == "tool" for message in messages)
+            if is_user_turn and is_opening:
+                await self._start_turn(frame.context, str(messages[-1].get("content", "")))
+
+        await self.push_frame(frame, direction)
+
+    async def _finish_recording(self):
+        recording, self._recording = self._recording, None
+        if recording and recording.steps:
+            # SQLite work stays off the event loop
+            await asyncio.to_thread(self._plan_cache.store, recording.utterance, recording.steps, recording.first_hop_ms)
+
+    async def _start_turn(self, context, utterance):
+        plan, _ = await asyncio.to_thread(self._plan_cache.lookup, utterance)
+        if plan is None or any(step["name"] not in self._handlers for step in plan):
+            self._recording = PlanRecorder(utterance)
+            return
+
+        logger.debug(f"Tool plan cache hit for {utterance!r}: {[step['name'] for step in plan]}")
+        tool_calls, tool_messages = [], []
+        for step in plan:
+            call_id = f"call_cached_{uuid.uuid4().hex[:16]}"
+            result = await self._run_tool(step, call_id, context)
+            tool_calls.append({
+                "id": call_id,
+                "type": "function",
+                "function": {"name": step["name"], "arguments": json.dumps(step["args"])},
+            })
+            tool_messages.append({"role": "tool", "tool_call_id": call_id, "content": json.dumps(result)})
+
+        context.add_message({"role": "assistant", "tool_calls": tool_calls})
+        for message in tool_messages:
+            context.add_message(message)
+
+    async def _run_tool(self, step, call_id, context):
+        results = []
+
+        async def result_callback(result, **kwargs):
+            results.append(result)
+
+        await self._handlers[step["name"]](step["name"], call_id, step["args"], None, context, result_callback)
+        return results[0] if results else None
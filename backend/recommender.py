@@ -0,0 +1,248 @@
+import math
+import re
+import zlib
+
+import numpy as np
+
+# Features are hashed into a fixed number of dimensions so new tags or
+# vendors never change the vector layout (needed for incremental refresh)
+FEATURE_DIM = 512
+TOP_K = 20
+
+FEATURE_WEIGHTS = {"type": 2.0, "vendor": 1.0, "tag": 1.0, "feature": 0.75, "color": 0.5, "price": 1.0}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _price_band(price):
+    """Log2 price bucket: 8-16, 16-32, 32-64, ..."""
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        return None
+    return int(math.log2(price)) if price >= 1 else 0
+
+
+def product_terms(product):
+    """Weighted content terms for a REST-shaped (or local JSON) product."""
+    terms = {}
+
+    def add(kind, value):
+        if value not in (None, ""):
+            terms[f"{kind}:{str(value).strip().lower()}"] = FEATURE_WEIGHTS[kind]
+
+    add("type", product.get("product_type") or product.get("category"))
+    add("vendor", product.get("vendor") or product.get("brand"))
+
+    tags = product.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    for tag in tags:
+        add("tag", tag)
+    for feature in product.get("features") or []:
+        add("feature", feature)
+
+    colors = list(product.get("colors") or [])
+    for option in product.get("options") or []:
+        if str(option.get("name", "")).lower() in ("color", "colour"):
+            colors.extend(option.get("values") or [])
+    for color in colors:
+        add("color", color)
+
+    variants = product.get("variants") or []
+    add("price", _price_band(variants[0].get("price") if variants else product.get("price")))
+    return terms
+
+
+def term_words(terms):
+    """Plain words of a product's terms, used to match user preferences."""
+    return {word for term in terms for word in _WORD.findall(term.split(":", 1)[1])}
+
+
+def vectorize(terms, dim=FEATURE_DIM):
+    vector = np.zeros(dim, dtype=np.float32)
+    for term, weight in terms.items():
+        vector[zlib.crc32(term.encode("utf-8")) % dim] += weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class Recommender:
+    """Top-K item-to-item neighbors by cosine similarity of content vectors."""
+
+    def __init__(self, top_k=TOP_K, dim=FEATURE_DIM, block_size=1024):
+        self.top_k = top_k
+        self.dim = dim
+        self.block_size = block_size
+        self.ids = []
+        self.words = {}
+        self.neighbors = {}
+        self._rows = {}
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+
+    def _set_vectors(self, products):
+        changed = []
+        base = len(self.ids)
+        added = []
+        for product in products:
+            terms = product_terms(product)
+            product_id = product["id"]
+            self.words[product_id] = term_words(terms)
+            vector = vectorize(terms, self.dim)
+            row = self._rows.get(product_id)
+            if row is None:
+                self._rows[product_id] = len(self.ids)
+                self.ids.append(product_id)
+                added.append(vector)
+            elif row >= base:
+                added[row - base] = vector
+            else:
+                self._matrix[row] = vector
+            changed.append(product_id)
+        # One stack for all new rows; growing the matrix per product is quadratic
+        if added:
+            self._matrix = np.vstack([self._matrix, np.stack(added)])
+        return changed
+
+    def _top_k(self, rows):
+        """Neighbor lists for the given matrix rows, computed in blocks."""
+        results = {}
+        ids = np.array(self.ids, dtype=object)
+        k = min(self.top_k, len(self.ids) - 1)
+        if k <= 0:
+            return {self.ids[row]: [] for row in rows}
+        for start in range(0, len(rows), self.block_size):
+            block = np.array(rows[start:start + self.block_size])
+            scores = self._matrix[block] @ self._matrix.T
+            scores[np.arange(len(block)), block] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for i, row in enumerate(block):
+                order = top[i][np.argsort(-scores[i, top[i]])]
+                results[self.ids[row]] = [(ids[j], float(scores[i, j])) for j in order if scores[i, j] > 0]
+        return results
+
+    def fit(self, products):
+        """Build vectors and neighbor lists for a full catalog."""
+        self.ids, self.words, self.neighbors, self._rows = [], {}, {}, {}
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        vectors = []
+        for product in products:
+            terms = product_terms(product)
+            self._rows[product["id"]] = len(self.ids)
+            self.ids.append(product["id"])
+            self.words[product["id"]] = term_words(terms)
+            vectors.append(vectorize(terms, self.dim))
+        if vectors:
+            self._matrix = np.vstack(vectors)
+        self.neighbors = self._top_k(list(range(len(self.ids))))
+        return self
+
+    def load_vectors(self, products, neighbors):
+        """Restore a fitted model from products plus a saved neighbor table."""
+        self.ids, self.words, self._rows = [], {}, {}
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._set_vectors(products)
+        self.neighbors = dict(neighbors)
+        return self
+
+    def update(self, products=(), removed_ids=()):
+        """Refresh neighbors after some products changed or were removed.
+
+        Changed products get a full neighbor recomputation. Every other
+        product only gets recomputed if a changed or removed product was
+        among its neighbors; otherwise changed products are merged into its
+        list when they beat its current K-th score. Returns the ids whose
+        neighbor lists were rewritten.
+        """
+        removed = set(removed_ids)
+        if removed & self._rows.keys():
+            keep = [row for product_id, row in self._rows.items() if product_id not in removed]
+            keep.sort()
+            self._matrix = self._matrix[keep]
+            self.ids = [self.ids[row] for row in keep]
+            self._rows = {product_id: row for row, product_id in enumerate(self.ids)}
+            for product_id in removed:
+                self.words.pop(product_id, None)
+                self.neighbors.pop(product_id, None)
+
+        changed = self._set_vectors(products)
+        changed_set = set(changed)
+        touched = changed_set | removed
+        stale = [self._rows[product_id] for product_id in self.ids
+                 if product_id in changed_set or any(n in touched for n, _ in self.neighbors.get(product_id, []))]
+        updates = self._top_k(stale)
+
+        if changed:
+            changed_rows = np.array([self._rows[product_id] for product_id in changed])
+            scores = self._matrix @ self._matrix[changed_rows].T
+            for row, product_id in enumerate(self.ids):
+                if product_id in updates:
+                    continue
+                current = self.neighbors.get(product_id, [])
+                floor = current[-1][1] if len(current) >= self.top_k else 0.0
+                merged = None
+                for j, changed_id in enumerate(changed):
+                    score = float(scores[row, j])
+                    if changed_id != product_id and score > floor:
+                        merged = (merged or list(current)) + [(changed_id, score)]
+                if merged:
+                    merged.sort(key=lambda pair: -pair[1])
+                    updates[product_id] = merged[:self.top_k]
+
+        self.neighbors.update(updates)
+        return set(updates)
+
+    def recommend(self, product_id, user_preferences=None, limit=5):
+        return rerank(self.neighbors.get(product_id, []), self.words, user_preferences, limit)
+
+
+def preference_words(user_preferences):
+    """Words from free text, a list, or a dict of preferences."""
+    if not user_preferences:
+        return set()
+    if isinstance(user_preferences, dict):
+        user_preferences = " ".join(str(value) for value in user_preferences.values())
+    elif isinstance(user_preferences, (list, tuple)):
+        user_preferences = " ".join(str(value) for value in user_preferences)
+    return set(_WORD.findall(str(user_preferences).lower()))
+
+
+def rerank(neighbors, words, user_preferences=None, limit=5, boost=0.1):
+    """Order neighbor (id, score) pairs, boosting those matching the user's preferences."""
+    wanted = preference_words(user_preferences)
+    if wanted:
+        neighbors = sorted(
+            neighbors,
+            key=lambda pair: -(pair[1] + boost * len(wanted & words.get(pair[0], set()))),
+        )
+    return [product_id for product_id, _ in neighbors[:limit]]
+
+
+def refresh_recommendations(store, changed_ids=None, removed_ids=()):
+    """Recompute the neighbor table saved in a CatalogStore.
+
+    Without `changed_ids` the whole table is rebuilt. Otherwise the saved
+    table is updated for the changed and removed products: every product's
+    vector is still read (changed products are compared against all of
+    them), but only neighbor lists a change can affect are recomputed.
+    """
+    if changed_ids is None:
+        recommender = Recommender().fit(store.iter_products())
+        store.replace_recommendations(recommender.neighbors, recommender.words)
+        return len(recommender.neighbors)
+
+    changed_ids = set(changed_ids)
+    changed = []
+
+    def unchanged(products):
+        for product in products:
+            if product["id"] in changed_ids:
+                changed.append(product)
+            else:
+                yield product
+
+    recommender = Recommender().load_vectors(unchanged(store.iter_products()), store.all_recommendations())
+    updated = recommender.update(changed, removed_ids)
+    store.save_recommendations({product_id: recommender.neighbors[product_id] for product_id in updated}, recommender.words)
+    store.delete_recommendations(removed_ids)
+    return len(updated)
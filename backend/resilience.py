@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+
+from loguru import logger
+
+from tracing import create_background_task, note_outcome
+
+# Longest a voice turn waits on one tool before falling back (seconds)
+TOOL_DEADLINE_SECS = float(os.environ.get("TOOL_DEADLINE_SECS", 2.5))
+TOOL_DEADLINES = {
+    "display_products_to_user": float(os.environ.get("DISPLAY_DEADLINE_SECS", 4.0)),
+}
+# Results younger than this are served without asking Shopify again
+FRESH_SECS = float(os.environ.get("SHOPIFY_FRESH_SECS", 30))
+
+
+def tool_deadline(name):
+    return TOOL_DEADLINES.get(name, TOOL_DEADLINE_SECS)
+
+
+def is_error(result):
+    return isinstance(result, dict) and "error" in result
+
+
+# Tokens returned by CircuitBreaker.allow()
+CALL = "call"
+PROBE = "probe"
+
+
+class CircuitBreaker:
+    """Trips when too many recent calls failed or were slow.
+
+    Outcomes of the last `window` calls are kept. Once at least `min_calls`
+    are recorded and the failure or slow-call rate reaches its threshold,
+    the breaker opens for `open_secs`. After that one probe call is let
+    through (half-open): success closes the breaker, failure reopens it.
+
+    `allow()` returns a token to hand back to `record()`. Only the outcome
+    of the call admitted as the probe changes an open breaker; calls that
+    started before it opened and finish later are ignored.
+    """
+
+    def __init__(self, name, failure_rate=0.5, slow_call_ms=2000, slow_rate=0.5,
+                 window=20, min_calls=5, open_secs=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_rate = slow_rate
+        self.min_calls = min_calls
+        self.open_secs = open_secs
+        self.clock = clock
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.open_secs:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """CALL or PROBE when the call may go ahead, None when it is rejected."""
+        state = self.state
+        if state == "closed":
+            return CALL
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return PROBE
+        return None
+
+    def release(self, token):
+        """Give back a token whose call was cancelled before it finished; the next call may probe."""
+        if token is PROBE:
+            self.probing = False
+
+    def record(self, success, elapsed_ms, token=CALL):
+        if self.opened_at is not None:
+            if token is not PROBE:
+                return
+            self.probing = False
+            if success and elapsed_ms < self.slow_call_ms:
+                logger.info(f"Circuit {self.name} closed")
+                self.opened_at = None
+                self.outcomes.clear()
+            else:
+                self.opened_at = self.clock()
+            return
+
+        self.outcomes.append((success, elapsed_ms >= self.slow_call_ms))
+        if len(self.outcomes) < self.min_calls:
+            return
+        failures = sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+        slow = sum(1 for _, is_slow in self.outcomes if is_slow) / len(self.outcomes)
+        if failures >= self.failure_rate or slow >= self.slow_rate:
+            logger.warning(f"Circuit {self.name} opened (failures {failures:.0%}, slow {slow:.0%})")
+            self.opened_at = self.clock()
+            self.trips += 1
+
+
+class ResilientCaller:
+    """Runs blocking API calls off the event loop with deadlines, stale-while-revalidate and a breaker.
+
+    For each (tool, arguments):
+    - a result younger than `fresh_secs` is returned as is;
+    - an older one (the last known good result) is returned immediately
+      while a background refresh runs;
+    - otherwise the call runs with a deadline. On error, timeout or an open
+      breaker the `fallback` (e.g. the local catalog) answers, else an
+      error dict is returned.
+
+    Known results are never dropped for age, only evicted by LRU, so
+    during an outage every call seen before keeps being answered.
+    """
+
+    def __init__(self, breaker, fresh_secs=FRESH_SECS, max_entries=512, clock=time.monotonic):
+        self.breaker = breaker
+        self.fresh_secs = fresh_secs
+        self.max_entries = max_entries
+        self.clock = clock
+        self._results = OrderedDict()
+        self._refreshing = {}
+        self.stats = {"fresh": 0, "stale": 0, "upstream": 0, "fallback": 0, "errors": 0, "timeouts": 0}
+
+    @staticmethod
+    def _key(name, args, kwargs):
+        return json.dumps([name, args, kwargs], sort_keys=True, default=str)
+
+    def _remember(self, key, result):
+        self._results[key] = (result, self.clock())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def _upstream(self, key, fn, args, kwargs, deadline, token):
+        """Call `fn` once under the breaker `token`; returns (ok, result)."""
+        self.stats["upstream"] += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(fn, *args, **kwargs), deadline)
+        except asyncio.CancelledError:
+            # E.g. the user interrupted the tool call; that says nothing about Shopify
+            self.breaker.release(token)
+            raise
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            self.breaker.record(False, (time.monotonic() - started) * 1000, token)
+            return False, {"error": f"{fn.__name__} timed out after {deadline}s"}
+        except Exception as e:
+            self.breaker.record(False, (time.monotonic() - started) * 1000, token)
+            return False, {"error": f"{fn.__name__} failed: {e}"}
+
+        ok = not is_error(result)
+        self.breaker.record(ok, (time.monotonic() - started) * 1000, token)
+        if ok:
+            self._remember(key, result)
+        return ok, result
+
+    def _refresh_in_background(self, key, fn, args, kwargs, deadline):
+        if key in self._refreshing:
+            return
+        token = self.breaker.allow()
+        if token is None:
+            return
+        task = create_background_task(self._upstream(key, fn, args, kwargs, deadline, token))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    def has(self, name, *args, **kwargs):
+        """Whether a call with these arguments would be answered from known results."""
+        return self._key(name, args, kwargs) in self._results
+
+    async def call(self, name, fn, *args, deadline=None, fallback=None, **kwargs):
+        deadline = deadline if deadline is not None else tool_deadline(name)
+        key = self._key(name, args, kwargs)
+        cached = self._results.get(key)
+
+        if cached is not None:
+            result, stored_at = cached
+            if self.clock() - stored_at < self.fresh_secs:
+                self.stats["fresh"] += 1
+                note_outcome("fresh")
+            else:
+                self.stats["stale"] += 1
+                note_outcome("stale")
+                self._refresh_in_background(key, fn, args, kwargs, deadline)
+            return result
+
+        error = {"error": f"{name} is temporarily unavailable"}
+        token = self.breaker.allow()
+        if token is not None:
+            ok, result = await self._upstream(key, fn, args, kwargs, deadline, token)
+            if ok:
+                note_outcome("upstream")
+                return result
+            error = result
+
+        if fallback is not None:
+            try:
+                result = await asyncio.to_thread(fallback, *args, **kwargs)
+            except Exception as e:
+                logger.warning(f"Local fallback for {name} failed: {e}")
+                result = None
+            if result is not None:
+                self.stats["fallback"] += 1
+                note_outcome("fallback")
+                return result
+        self.stats["errors"] += 1
+        note_outcome("error")
+        return error
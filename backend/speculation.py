@@ -0,0 +1,212 @@
+import asyncio
+import re
+import time
+
+_PUNCTUATION = re.compile(r"[^\w\s']")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+class TranscriptStabilizer:
+    """Decides when an interim transcript has stopped changing.
+
+    A partial is stable once the same normalized text has been seen
+    `min_repeats` times in a row, or has stayed unchanged for `min_stable_ms`.
+    """
+
+    def __init__(self, min_repeats=2, min_stable_ms=300, min_words=2):
+        self.min_repeats = min_repeats
+        self.min_stable_ms = min_stable_ms
+        self.min_words = min_words
+        self.reset()
+
+    def reset(self):
+        self._text = ""
+        self._repeats = 0
+        self._since = None
+
+    def update(self, text: str, now=None) -> bool:
+        now = time.monotonic() if now is None else now
+        normalized = normalize_transcript(text)
+        if normalized != self._text:
+            self._text = normalized
+            self._repeats = 1
+            self._since = now
+        else:
+            self._repeats += 1
+
+        if len(normalized.split()) < self.min_words:
+            return False
+        return self._repeats >= self.min_repeats or (now - self._since) * 1000 >= self.min_stable_ms
+
+
+class SpeculationStats:
+    """Counters for speculative LLM starts."""
+
+    def __init__(self):
+        self.started = 0
+        self.hits = 0
+        self.wasted = 0
+        self.saved_ms = 0.0
+
+    def record_hit(self, saved_ms):
+        self.hits += 1
+        self.saved_ms += saved_ms
+
+    def record_waste(self):
+        self.wasted += 1
+
+    def revoke_hit(self, saved_ms):
+        """A hit that a later segment of the same utterance contradicted."""
+        self.hits -= 1
+        self.saved_ms -= saved_ms
+
+    def as_dict(self):
+        resolved = self.hits + self.wasted
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "wasted": self.wasted,
+            "hit_rate": self.hits / resolved if resolved else None,
+            "saved_ms": round(self.saved_ms, 1),
+            "avg_saved_ms": round(self.saved_ms / self.hits, 1) if self.hits else None,
+        }
+
+
+class SpeculativeTurn:
+    """Context bookkeeping for starting the LLM on a stable interim transcript.
+
+    `context` is the LLM context (messages, add_message, set_messages). A
+    speculative start adds the interim as the user message itself, so the
+    caller can start inference with a context frame instead of waiting for
+    the user aggregator.
+
+    Deepgram sends an utterance as one or more final segments. The caller
+    holds them back while a turn is speculative. Once the user has stopped
+    speaking, they are resolved together against the speculative text:
+    - "hit": the texts match, the held finals are dropped and the turn stands.
+      A later segment of the same utterance that no longer matches turns
+      it into a miss.
+    - "miss": the caller interrupts the bot and pushes the held finals as
+      usual. Everything since the speculative message is discarded from the
+      context by `discard_stale` once the corrected turn reaches the LLM. That
+      includes the interrupted reply, which the assistant aggregator appends
+      after the interruption.
+
+    Tools with client-visible effects await `confirmed()`, so nothing is
+    shown for a speculation that turns out wrong.
+    """
+
+    def __init__(self, context, stabilizer=None, stats=None):
+        self.context = context
+        self.stabilizer = stabilizer or TranscriptStabilizer()
+        self.stats = stats or SpeculationStats()
+        self.text = None
+        self.finals = []
+        self.user_stopped = False
+        self.confirmed_hit = False
+        self._started_at = None
+        self._saved_ms = 0.0
+        self._rollback_to = None
+        self._stale_from = None
+        self._waiter = None
+
+    @property
+    def active(self):
+        """Whether finals belong to a speculative turn (pending or confirmed)."""
+        return self.text is not None
+
+    def on_interim(self, text, now=None) -> bool:
+        """True when the caller should start the LLM on the context now."""
+        if self.active or not self.stabilizer.update(text, now):
+            return False
+        self.text = text
+        self._started_at = time.monotonic() if now is None else now
+        self._rollback_to = len(self.context.messages)
+        self.context.add_message({"role": "user", "content": text})
+        self.stats.started += 1
+        return True
+
+    def on_final(self, text, now=None):
+        """None (not speculating: pass the final on), "hold", "hit" or "miss"."""
+        if not self.active:
+            return None
+        self.finals.append(text)
+        if self.confirmed_hit:
+            return "hit" if self._matches() else self._miss()
+        if not self.user_stopped:
+            return "hold"
+        return self._resolve(now)
+
+    def on_user_stopped(self, now=None):
+        """Resolve the held finals: "hit", "miss" or None (nothing to resolve yet)."""
+        if not self.active or self.confirmed_hit:
+            return None
+        self.user_stopped = True
+        return self._resolve(now) if self.finals else None
+
+    def on_user_started(self):
+        """A confirmed turn is over once the user speaks again; a pending one continues."""
+        if self.confirmed_hit:
+            self._reset()
+        else:
+            self.user_stopped = False
+
+    async def confirmed(self) -> bool:
+        """Wait for a pending speculation to resolve: False when it missed."""
+        if not self.active or self.confirmed_hit:
+            return True
+        if self._waiter is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+        # Shielded, so one cancelled waiter doesn't cancel the others
+        return await asyncio.shield(self._waiter)
+
+    def discard_stale(self) -> bool:
+        """After a miss, drop the speculative turn once the corrected user message is in the context."""
+        if self._stale_from is None:
+            return False
+        messages = self.context.messages
+        last_user = max((i for i, message in enumerate(messages) if message.get("role") == "user"), default=-1)
+        if last_user <= self._stale_from:
+            return False
+        self.context.set_messages(messages[:self._stale_from] + [messages[last_user]])
+        self._stale_from = None
+        return True
+
+    def _matches(self):
+        return normalize_transcript(" ".join(self.finals)) == normalize_transcript(self.text)
+
+    def _resolve(self, now):
+        if not self._matches():
+            return self._miss()
+        now = time.monotonic() if now is None else now
+        self._saved_ms = (now - self._started_at) * 1000
+        self.stats.record_hit(self._saved_ms)
+        self.confirmed_hit = True
+        self._settle(True)
+        return "hit"
+
+    def _miss(self):
+        if self.confirmed_hit:
+            self.stats.revoke_hit(self._saved_ms)
+        self.stats.record_waste()
+        self._stale_from = self._rollback_to
+        self._settle(False)
+        self._reset()
+        return "miss"
+
+    def _settle(self, hit):
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(hit)
+
+    def _reset(self):
+        self.text = None
+        self.finals = []
+        self.user_stopped = False
+        self.confirmed_hit = False
+        self.stabilizer.reset()
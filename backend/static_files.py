@@ -0,0 +1,170 @@
+import argparse
+import gzip
+import os
+import re
+import stat
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # gzip variants are still served without it
+    brotli = None
+
+# File types worth compressing; images like png are already compressed
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".map", ".wasm", ".onnx", ".ico"}
+# A variant is only kept if it saves at least this fraction of the original size
+MIN_SAVINGS = 0.05
+
+# Vite emits content-hashed bundles such as assets/index-BtD3s7Xa.js (an 8 character hash).
+# Files copied as-is (ort-wasm-simd.wasm, images) land outside assets/ and are not hashed.
+HASHED_ASSET = re.compile(r"^assets/(?:.+/)?[^/]+-[A-Za-z0-9_-]{8}\.[a-z0-9]+$")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+HTML_CACHE = "no-cache"
+# Un-hashed assets (VAD model, background image) revalidate with ETags after a day
+DEFAULT_CACHE = "public, max-age=86400, stale-while-revalidate=604800"
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def precompress_directory(directory, min_size=1024):
+    """Write .br/.gz siblings for compressible files; returns the number written.
+
+    Variants newer than their source are left alone, so this is cheap to run
+    at every startup after the image build already did the work.
+    """
+    written = 0
+    for path in Path(directory).rglob("*"):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        source_stat = path.stat()
+        if source_stat.st_size < min_size:
+            continue
+
+        data = None
+        for encoding, suffix in ENCODINGS:
+            if encoding == "br" and brotli is None:
+                continue
+            variant = path.with_name(path.name + suffix)
+            if variant.exists() and variant.stat().st_mtime >= source_stat.st_mtime:
+                continue
+            data = data if data is not None else path.read_bytes()
+            compressed = brotli.compress(data, quality=11) if encoding == "br" else gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) <= len(data) * (1 - MIN_SAVINGS):
+                _write_atomic(variant, compressed)
+                written += 1
+    return written
+
+
+def cache_control_for(path: str) -> str:
+    """Cache-Control for a path relative to the static root."""
+    if path.endswith(".html"):
+        return HTML_CACHE
+    if HASHED_ASSET.match(path.replace(os.sep, "/")):
+        return IMMUTABLE_CACHE
+    return DEFAULT_CACHE
+
+
+class StaticMetrics:
+    """Counters for bytes actually written to clients, split by content encoding."""
+
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.partial = 0
+        self.bytes_served = {}
+
+    def record(self, status, encoding, body_bytes):
+        self.requests += 1
+        if status == 304:
+            self.not_modified += 1
+        elif status == 206:
+            self.partial += 1
+        self.bytes_served[encoding] = self.bytes_served.get(encoding, 0) + body_bytes
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "partial": self.partial,
+            "bytes_served": dict(self.bytes_served),
+            "total_bytes_served": sum(self.bytes_served.values()),
+        }
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves .br/.gz variants and sets cache headers.
+
+    Conditional (ETag / Last-Modified) and Range requests are handled by
+    Starlette's FileResponse against whichever variant is served, so every
+    encoding gets its own ETag.
+    """
+
+    def __init__(self, *args, metrics=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics or StaticMetrics()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await super().__call__(scope, receive, send)
+            return
+
+        state = {"status": 200, "encoding": "identity", "bytes": 0}
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                headers = Headers(raw=message["headers"])
+                state["encoding"] = headers.get("content-encoding", "identity")
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        await super().__call__(scope, receive, counting_send)
+        self.metrics.record(state["status"], state["encoding"], state["bytes"])
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        accepted = request_headers.get("accept-encoding", "")
+        served_path, served_stat, encoding = full_path, stat_result, None
+
+        for candidate, suffix in ENCODINGS:
+            if candidate not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(f"{full_path}{suffix}")
+            except OSError:
+                continue
+            if stat.S_ISREG(variant_stat.st_mode) and variant_stat.st_mtime >= stat_result.st_mtime:
+                served_path, served_stat, encoding = f"{full_path}{suffix}", variant_stat, candidate
+                break
+
+        media_type = FileResponse(full_path, stat_result=stat_result).media_type
+        response = FileResponse(served_path, status_code=status_code, stat_result=served_stat, media_type=media_type)
+        response.headers["Cache-Control"] = cache_control_for(os.path.relpath(full_path, self.directory))
+        if os.path.splitext(str(full_path))[1] in COMPRESSIBLE_EXTENSIONS:
+            response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompress static assets with brotli and gzip")
+    parser.add_argument("directory", help="Directory to precompress, e.g. frontend-dist")
+    args = parser.parse_args()
+
+    print(f"Wrote {precompress_directory(args.directory)} compressed variants")
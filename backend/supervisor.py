@@ -0,0 +1,222 @@
+import asyncio
+import os
+import signal
+import sqlite3
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import sqlite_utils
+from loguru import logger
+
+from memory import MemoryCeiling, process_memory, to_mb, tree_rss_bytes
+
+BOT_REGISTRY_DB = Path(os.environ.get("BOT_REGISTRY_DB", Path(os.path.dirname(os.path.abspath(__file__))) / "data" / "bots.db"))
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BotRegistry:
+    """Bot processes and their rooms, shared by every ASGI worker through SQLite.
+
+    The connection is used from the event loop and from FastAPI's threadpool
+    (sync endpoints), so access is serialized with a lock.
+    """
+
+    def __init__(self, db_path=BOT_REGISTRY_DB):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self.db = sqlite_utils.Database(sqlite3.connect(db_path, timeout=5, check_same_thread=False))
+        self.db.enable_wal()
+        self.table = self.db["bots"]
+        self.table.create(
+            {
+                "pid": int,
+                "room_url": str,
+                "worker_pid": int,
+                "status": str,
+                "started_at": float,
+                "finished_at": float,
+                "exit_code": int,
+            },
+            pk="pid",
+            if_not_exists=True,
+        )
+        # Added after the first release; older registries lack them
+        columns = self.table.columns_dict
+        for column, column_type in (("rss_bytes", int), ("peak_rss_bytes", int), ("finish_reason", str)):
+            if column not in columns:
+                self.table.add_column(column, column_type)
+
+    def add(self, pid, room_url):
+        with self._lock:
+            self.table.upsert(
+                {
+                    "pid": pid,
+                    "room_url": room_url,
+                    "worker_pid": os.getpid(),
+                    "status": "running",
+                    "started_at": time.time(),
+                    "finished_at": None,
+                    "exit_code": None,
+                },
+                pk="pid",
+            )
+
+    def record_memory(self, pid, rss):
+        with self._lock:
+            self.db.execute(
+                "UPDATE bots SET rss_bytes = ?, peak_rss_bytes = MAX(COALESCE(peak_rss_bytes, 0), ?) WHERE pid = ?",
+                [rss, rss, pid],
+            )
+            self.db.conn.commit()
+
+    def get(self, pid):
+        with self._lock:
+            rows = list(self.table.rows_where("pid = ?", [pid]))
+            return rows[0] if rows else None
+
+    def mark_finished(self, pid, exit_code=None):
+        with self._lock:
+            self.table.update(pid, {"status": "finished", "finished_at": time.time(), "exit_code": exit_code})
+
+    def set_finish_reason(self, pid, reason):
+        with self._lock:
+            self.table.update(pid, {"finish_reason": reason})
+
+    def running(self, room_url=None):
+        with self._lock:
+            where, args = "status = 'running'", []
+            if room_url is not None:
+                where, args = where + " AND room_url = ?", [room_url]
+            return list(self.table.rows_where(where, args))
+
+    def mark_orphans_finished(self):
+        """Finish rows whose worker is gone and whose bot process no longer exists."""
+        for row in self.running():
+            if not pid_alive(row["worker_pid"]) and not pid_alive(row["pid"]):
+                self.mark_finished(row["pid"])
+
+
+class BotSupervisor:
+    """Starts, tracks and drains the bot processes owned by this worker.
+
+    Popen handles only exist in the worker that spawned them; every other
+    worker answers status requests from the shared registry. The reaper
+    also samples each bot's RSS into the registry. A bot above the hard
+    ceiling is recycled: SIGTERM first, then SIGKILL if it is still running
+    after `recycle_grace` seconds.
+    """
+
+    def __init__(self, registry: BotRegistry, ceiling: MemoryCeiling = None, recycle_grace=10.0):
+        self.registry = registry
+        self.ceiling = ceiling or MemoryCeiling()
+        self.recycle_grace = recycle_grace
+        self.procs = {}
+        self._over_soft = set()
+        self._recycling = {}
+
+    def spawn(self, command, room_url, cwd=None):
+        proc = subprocess.Popen([command], shell=True, bufsize=1, cwd=cwd)
+        self.procs[proc.pid] = (proc, room_url)
+        self.registry.add(proc.pid, room_url)
+        return proc
+
+    def status(self, pid):
+        """'running' / 'finished', or None when the pid was never registered."""
+        if pid in self.procs:
+            self.reap()
+        row = self.registry.get(pid)
+        if row is None:
+            return None
+        if row["status"] == "running" and pid not in self.procs and not pid_alive(pid):
+            self.registry.mark_finished(pid)
+            return "finished"
+        return row["status"]
+
+    def reap(self):
+        """Collect exited children of this worker and record their exit codes."""
+        for pid, (proc, _) in list(self.procs.items()):
+            exit_code = proc.poll()
+            if exit_code is not None:
+                self.registry.mark_finished(pid, exit_code)
+                self.procs.pop(pid, None)
+                self._over_soft.discard(pid)
+                self._recycling.pop(pid, None)
+
+    def sample_memory(self):
+        """Record the RSS of this worker's bots and recycle those above the hard ceiling."""
+        for pid, (proc, _) in list(self.procs.items()):
+            if proc.poll() is not None:
+                continue
+            rss = tree_rss_bytes(pid)
+            if rss is None:
+                continue
+            self.registry.record_memory(pid, rss)
+            level = self.ceiling.check(rss)
+            if level == "soft" and pid not in self._over_soft:
+                self._over_soft.add(pid)
+                logger.warning(f"Bot {pid} RSS {to_mb(rss)} MB is above the soft limit of {self.ceiling.soft_mb} MB")
+            elif level == "hard":
+                self._recycle(pid, proc, rss)
+
+    def _recycle(self, pid, proc, rss):
+        signalled_at = self._recycling.get(pid)
+        if signalled_at is None:
+            logger.warning(f"Bot {pid} RSS {to_mb(rss)} MB is above the limit of {self.ceiling.hard_mb} MB, recycling it")
+            self.registry.set_finish_reason(pid, "rss_limit")
+            self._recycling[pid] = time.monotonic()
+            proc.send_signal(signal.SIGTERM)
+        elif time.monotonic() - signalled_at >= self.recycle_grace:
+            logger.warning(f"Bot {pid} did not exit within {self.recycle_grace}s of recycling, killing it")
+            proc.kill()
+
+    def memory_report(self):
+        """This worker's memory and the last sampled RSS of every running bot."""
+        return {
+            "worker": process_memory(),
+            "limits": self.ceiling.as_dict(),
+            "bots": [
+                {
+                    "pid": row["pid"],
+                    "room_url": row["room_url"],
+                    "worker_pid": row["worker_pid"],
+                    "rss_mb": to_mb(row["rss_bytes"]),
+                    "peak_rss_mb": to_mb(row["peak_rss_bytes"]),
+                }
+                for row in self.registry.running()
+            ],
+        }
+
+    async def run_reaper(self, interval=5.0):
+        while True:
+            self.reap()
+            self.sample_memory()
+            await asyncio.sleep(interval)
+
+    async def drain(self, timeout=10.0, poll_interval=0.1):
+        """SIGTERM every bot, wait up to `timeout` for them to exit, then SIGKILL the rest."""
+        for proc, _ in self.procs.values():
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGTERM)
+
+        deadline = time.monotonic() + timeout
+        while self.procs and time.monotonic() < deadline:
+            self.reap()
+            if self.procs:
+                await asyncio.sleep(poll_interval)
+
+        for pid, (proc, _) in list(self.procs.items()):
+            logger.warning(f"Bot {pid} did not exit within {timeout}s, killing it")
+            proc.kill()
+            proc.wait()
+        self.reap()
@@ -3,6 +3,9 @@ import unittest
 from unittest.mock import patch, mock_open, MagicMock
 
 from backend import api
+from recommender import refresh_recommendations
+from catalog import CatalogStore
+from freshness import ProductCache
 
 
 class TestTransformProductResponse(unittest.TestCase):
@@ -111,14 +114,18 @@ class TestLoadProductsData(unittest.TestCase):
 
     @patch("builtins.open", side_effect=Exception("File error"))
     def test_load_products_data_failure(self, mock_file):
-        with patch('builtins.print') as mock_print:
+        with patch.object(api.logger, "error") as mock_error:
             result = api.load_products_data()
             self.assertEqual(result, {"products": [], "categories": [], "brands": []})
-            mock_print.assert_called()
+            mock_error.assert_called_once()
 
 
 class TestAPIRequests(unittest.TestCase):
-    @patch("backend.api.requests.get")
+    def setUp(self):
+        # Products fetched by one test must not be served from cache in the next
+        api.product_cache.clear()
+
+    @patch("backend.api._shopify_session.get")
     def test_get_product_by_id_success(self, mock_get):
         # Setup mock response for product API call
         product_data = {
@@ -141,7 +148,7 @@ class TestAPIRequests(unittest.TestCase):
         transformed = api.transform_product_response(product_data)
         self.assertEqual(result, transformed)
 
-    @patch("backend.api.requests.get")
+    @patch("backend.api._shopify_session.get")
     def test_get_product_by_id_failure(self, mock_get):
         mock_response = MagicMock()
         mock_response.status_code = 404
@@ -151,7 +158,7 @@ class TestAPIRequests(unittest.TestCase):
         result = api.get_product_by_id(1)
         self.assertIn("error", result)
 
-    @patch("backend.api.requests.get")
+    @patch("backend.api._shopify_session.get")
     def test_get_all_products(self, mock_get):
         # Prepare a mock response with 2 products and Link header for pagination
         products_list = [{"id": 1}, {"id": 2}]
@@ -169,7 +176,7 @@ class TestAPIRequests(unittest.TestCase):
         self.assertEqual(result["next_page_info"], "next123")
         self.assertEqual(result["prev_page_info"], "prev456")
 
-    @patch("backend.api.requests.get")
+    @patch("backend.api._shopify_session.get")
     def test_search_products_success(self, mock_get):
         products_list = [{"id": 3}, {"id": 4}]
         response_json = {"products": products_list}
@@ -181,8 +188,9 @@ class TestAPIRequests(unittest.TestCase):
 
         result = api.search_products("Test")
         self.assertEqual(result["product_ids"], [3, 4])
+        self.assertEqual(mock_get.call_args.kwargs["params"], {"title": "Test", "limit": 10, "fields": "id"})
 
-    @patch("backend.api.requests.get")
+    @patch("backend.api._shopify_session.get")
     def test_search_products_failure(self, mock_get):
         mock_response = MagicMock()
         mock_response.status_code = 400
@@ -192,7 +200,7 @@ class TestAPIRequests(unittest.TestCase):
         result = api.search_products("Test")
         self.assertIn("error", result)
 
-    @patch("backend.api.requests.get")
+    @patch("backend.api._shopify_session.get")
     def test_filter_products(self, mock_get):
         # Setup two products; one matching the criteria and one not
         product1 = {
@@ -220,7 +228,34 @@ class TestAPIRequests(unittest.TestCase):
         result = api.filter_products(category="Electronics", vendor="VendorA", min_price=100, max_price=200, tags=["sale"], in_stock=True)
         self.assertEqual(result["product_ids"], [1])
 
-    @patch("backend.api.requests.get")
+    @patch("backend.api._shopify_session.get")
+    def test_filter_products_pages_past_the_offset(self, mock_get):
+        def page(first_id, link):
+            response = MagicMock(status_code=200, headers={"Link": link} if link else {})
+            response.json.return_value = {"products": [
+                {"id": product_id, "product_type": "Electronics > Audio" if product_id % 2 else "Fashion", "vendor": "V",
+                 "tags": "", "variants": [{"price": "10", "inventory_quantity": 1}]}
+                for product_id in range(first_id, first_id + 4)
+            ]}
+            return response
+
+        mock_get.side_effect = [page(1, '<https://shop/products.json?page_info=abc>; rel="next"'), page(5, None)]
+        # The first level of the product type is the category
+        result = api.filter_products(category="electronics", limit=3, offset=1)
+        self.assertEqual(result["product_ids"], [3, 5, 7])
+        self.assertEqual(mock_get.call_args_list[1].kwargs["params"], {"limit": api.FILTER_PAGE_SIZE, "page_info": "abc"})
+
+    @patch("backend.api._shopify_session.get")
+    def test_get_catalog_version(self, mock_get):
+        count_response = MagicMock(status_code=200)
+        count_response.json.return_value = {"count": 42}
+        latest_response = MagicMock(status_code=200)
+        latest_response.json.return_value = {"products": [{"id": 1, "updated_at": "2025-01-01T00:00:00Z"}]}
+        mock_get.side_effect = [count_response, latest_response]
+
+        self.assertEqual(api.get_catalog_version(), "42:2025-01-01T00:00:00Z")
+
+    @patch("backend.api._shopify_session.get")
     def test_get_product_recommendations_failure(self, mock_get):
         mock_response = MagicMock()
         mock_response.status_code = 404
@@ -230,6 +265,183 @@ class TestAPIRequests(unittest.TestCase):
         result = api.get_product_recommendations(product_id=1)
         self.assertIn("error", result)
 
+    @patch("backend.api._shopify_session.get")
+    def test_get_deals_of_the_day_without_compare_at_price(self, mock_get):
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"products": [
+            {"id": 1, "variants": [{"price": "10.00", "compare_at_price": None}]},
+            {"id": 2, "variants": [{"price": "10.00", "compare_at_price": "15.00", "sku": "A"}, {"price": "1"}]},
+        ]}
+        mock_get.return_value = mock_response
+
+        self.assertEqual(api.get_deals_of_the_day(limit=1), {"product_ids": [2]})
+
+    def test_filter_and_deals_from_local_catalog(self):
+        store = CatalogStore(db_path=None)
+        store.replace_all([
+            {"id": 1, "product_type": "Electronics", "vendor": "VendorA", "tags": "sale, new",
+             "variants": [{"price": "150", "compare_at_price": "160", "inventory_quantity": 10}]},
+            {"id": 2, "product_type": "Electronics", "vendor": "VendorA", "tags": "sale",
+             "variants": [{"price": "120", "compare_at_price": "200", "inventory_quantity": 0}]},
+            {"id": 3, "product_type": "Fashion", "vendor": "VendorB", "tags": "old",
+             "variants": [{"price": "50", "inventory_quantity": 5}]},
+        ])
+        with patch.object(api, "local_catalog", return_value=store):
+            result = api.filter_products(category="electronics", brand="VendorA", min_price=100, max_price=200, tags=["sale"], in_stock=True)
+            self.assertEqual((result["product_ids"], result["total"]), ([1], 1))
+            result = api.filter_products(max_price=130, limit=1)
+            self.assertEqual((result["product_ids"], result["total"]), ([2], 2))
+            self.assertEqual(result["facets"]["vendor"], {"VendorA": 1, "VendorB": 1})
+            self.assertEqual(api.get_deals_of_the_day(limit=2), {"product_ids": [2, 1]})
+
+    @patch("backend.api._shopify_session.get")
+    def test_get_product_by_id_refreshes_only_price_and_stock(self, mock_get):
+        now = [0.0]
+        product = {"id": 1, "title": "Hat", "tags": "", "variants": [{"id": 11, "price": "20.00", "inventory_quantity": 3}]}
+        full = MagicMock(status_code=200)
+        full.json.return_value = {"product": product}
+        prices = MagicMock(status_code=200)
+        prices.json.return_value = {"products": [
+            {"id": 1, "variants": [{"id": 11, "price": "15.00", "inventory_quantity": 0, "sku": "ignored"}]}
+        ]}
+        mock_get.side_effect = [full, prices]
+
+        with patch.object(api, "product_cache", ProductCache(metadata_ttl=3600, volatile_ttl=60, clock=lambda: now[0])):
+            self.assertEqual(api.get_product_by_id(1)["product"]["variants"][0]["price"], "20.00")
+            self.assertEqual(api.get_product_by_id(1)["product"]["title"], "Hat")
+            self.assertEqual(mock_get.call_count, 1)
+
+            now[0] = 61
+            result = api.get_product_by_id(1)
+        self.assertEqual((result["product"]["title"], result["product"]["variants"][0]["price"]), ("Hat", "15.00"))
+        self.assertNotEqual(result["product"]["variants"][0]["sku"], "ignored")
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs["params"], {"ids": "1", "fields": "id,variants", "limit": 250})
+
+    @patch("backend.api._shopify_session.get")
+    def test_local_filter_rechecks_current_stock(self, mock_get):
+        store = CatalogStore(db_path=None)
+        store.replace_all([
+            {"id": 1, "product_type": "Hats", "variants": [{"id": 11, "price": "10", "inventory_quantity": 4}]},
+            {"id": 2, "product_type": "Hats", "variants": [{"id": 21, "price": "12", "inventory_quantity": 2}]},
+        ])
+        # Product 2 sold out since the snapshot was taken
+        prices = MagicMock(status_code=200)
+        prices.json.return_value = {"products": [
+            {"id": 1, "variants": [{"id": 11, "price": "10", "inventory_quantity": 4}]},
+            {"id": 2, "variants": [{"id": 21, "price": "12", "inventory_quantity": 0}]},
+        ]}
+        mock_get.return_value = prices
+
+        with patch.object(api, "local_catalog", return_value=store), patch.object(api, "SHOPIFY_ACCESS_KEY", "key"):
+            result = api.filter_products(category="Hats", in_stock=True)
+            self.assertEqual((result["product_ids"], result["total"]), ([1], 1))
+            api.filter_products(category="Hats", in_stock=True)
+            self.assertEqual(mock_get.call_count, 1)
+            self.assertEqual(api.filter_products(category="Hats")["product_ids"], [1, 2])
+
+    @patch("backend.api._shopify_session.get")
+    def test_local_filter_recheck_pages_without_repeats(self, mock_get):
+        store = CatalogStore(db_path=None)
+        store.replace_all([
+            {"id": i, "product_type": "Hats", "variants": [{"id": i * 10, "price": "10", "inventory_quantity": 1}]}
+            for i in range(1, 7)
+        ] + [{"id": 9, "product_type": "Scarves", "variants": [{"id": 90, "price": "5", "inventory_quantity": 1}]}])
+        # Products 2 and 3 sold out since the snapshot was taken
+        sold_out = {2, 3}
+
+        def prices(url, params, **kwargs):
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"products": [
+                {"id": int(i), "variants": [{"id": int(i) * 10, "price": "10", "inventory_quantity": 0 if int(i) in sold_out else 1}]}
+                for i in params["ids"].split(",")
+            ]}
+            return response
+
+        mock_get.side_effect = prices
+        cache = ProductCache(metadata_ttl=3600, volatile_ttl=60)
+        cache.remember({"id": 9, "variants": []})
+        cache.remember_volatile(9, [])
+        with patch.object(api, "local_catalog", return_value=store), patch.object(api, "SHOPIFY_ACCESS_KEY", "key"), \
+                patch.object(api, "product_cache", cache):
+            first = api.filter_products(category="Hats", in_stock=True, limit=2)
+            second = api.filter_products(category="Hats", in_stock=True, limit=2, offset=first["next_offset"])
+        self.assertEqual((first["product_ids"], first["next_offset"]), ([1, 4], 4))
+        self.assertEqual((second["product_ids"], second["next_offset"]), ([5, 6], 6))
+        requested = [call.kwargs["params"]["ids"] for call in mock_get.call_args_list]
+        # Only ids that may land on the page are refreshed (a dropped id is replaced by the next), never product 9
+        self.assertEqual(requested, ["1,2", "3", "4", "5,6"])
+
+    def test_local_fallbacks(self):
+        store = CatalogStore(db_path=None)
+        store.replace_all([
+            {"id": 1, "title": "Blue 100% Wool Hat", "variants": []},
+            {"id": 2, "title": "Red Hat", "variants": []},
+            {"id": 3, "title": "Scarf", "variants": []},
+        ])
+        with patch.object(api, "local_catalog", return_value=store):
+            self.assertEqual(api.LOCAL_FALLBACKS["get_product_by_id"](2)["product"]["title"], "Red Hat")
+            self.assertIsNone(api.LOCAL_FALLBACKS["get_product_by_id"](99))
+            self.assertEqual(api.LOCAL_FALLBACKS["search_products"]("hat"), {"product_ids": [1, 2]})
+            self.assertEqual(api.LOCAL_FALLBACKS["search_products"]("100%"), {"product_ids": [1]})
+            page = api.LOCAL_FALLBACKS["get_all_products"](limit=2)
+            self.assertEqual((page["product_ids"], page["next_page_info"]), ([1, 2], "2"))
+            self.assertEqual(api.LOCAL_FALLBACKS["get_all_products"](limit=2, page_info="2")["product_ids"], [3])
+        with patch.object(api, "local_catalog", return_value=None):
+            self.assertIsNone(api.LOCAL_FALLBACKS["search_products"]("hat"))
+
+    @patch("backend.api._shopify_session.get")
+    def test_get_brands_counts_vendors(self, mock_get):
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"products": [
+            {"id": 1, "vendor": "VendorA", "product_type": "Shoes"},
+            {"id": 2, "vendor": "VendorA", "product_type": "Hats"},
+            {"id": 3, "vendor": "VendorB", "product_type": "Shoes"},
+        ]}
+        mock_get.return_value = mock_response
+
+        self.assertEqual(api.get_brands(), {"brands": [{"name": "VendorA", "count": 2}, {"name": "VendorB", "count": 1}]})
+        self.assertEqual(api.get_brands("hats"), {"brands": [{"name": "VendorA", "count": 1}], "category": "hats"})
+
+    def test_categories_and_brands_from_local_catalog(self):
+        store = CatalogStore(db_path=None)
+        store.replace_all([
+            {"id": 1, "product_type": "Shoes", "vendor": "VendorA", "variants": []},
+            {"id": 2, "product_type": "Hats", "vendor": "VendorB", "variants": []},
+        ])
+        with patch.object(api, "local_catalog", return_value=store):
+            self.assertEqual([c["name"] for c in api.get_categories()["categories"]], ["Shoes", "Hats"])
+            store.upsert_products([{"id": 3, "product_type": "Hats", "vendor": "VendorC", "variants": []}])
+            self.assertEqual(api.get_brands("Hats")["brands"], [{"name": "VendorB", "count": 1}, {"name": "VendorC", "count": 1}])
+            self.assertEqual(api.get_categories()["categories"][0], {"name": "Hats", "count": 2, "subcategories": []})
+
+    def test_get_product_recommendations_from_local_catalog(self):
+        store = CatalogStore(db_path=None)
+        store.replace_recommendations(
+            {1: [(2, 0.9), (3, 0.8)], 2: [(1, 0.9)], 3: [(1, 0.8)]},
+            {2: {"wired"}, 3: {"wireless", "black"}},
+        )
+        with patch.object(api, "local_catalog", return_value=store):
+            self.assertEqual(api.get_product_recommendations(1, limit=1), {"product_ids": [2]})
+            self.assertEqual(api.get_product_recommendations(1, "black wireless", limit=1), {"product_ids": [3]})
+            self.assertIn("error", api.get_product_recommendations(99))
+            # Preferences alone match products by their content words
+            self.assertEqual(api.get_product_recommendations(user_preferences="black wireless"), {"product_ids": [3]})
+            self.assertEqual(api.get_product_recommendations(user_preferences="wired or wireless"), {"product_ids": [2, 3]})
+            self.assertIn("error", api.get_product_recommendations())
+
+    def test_upserts_refresh_recommendations(self):
+        store = CatalogStore(db_path=None)
+        store.replace_all([
+            {"id": 1, "product_type": "Mug", "vendor": "Kiln", "tags": "ceramic", "variants": [{"price": "12.00"}]},
+            {"id": 2, "product_type": "Lamp", "vendor": "Glow", "tags": "brass", "variants": [{"price": "80.00"}]},
+        ])
+        refresh_recommendations(store)
+        store.add_listener(api._refresh_changed_recommendations)
+        with patch.object(api, "local_catalog", return_value=store):
+            store.upsert_products([{"id": 3, "product_type": "Mug", "vendor": "Kiln", "tags": "ceramic, travel", "variants": [{"price": "14.00"}]}])
+            self.assertEqual(api.get_product_recommendations(1, limit=1), {"product_ids": [3]})
+
 
 if __name__ == "__main__":
     unittest.main()
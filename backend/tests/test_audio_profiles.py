@@ -0,0 +1,41 @@
+import unittest
+
+from audio_profiles import PRESETS, load_audio_profile
+
+
+class TestLoadAudioProfile(unittest.TestCase):
+    def test_default_profile_matches_previous_settings(self):
+        profile = load_audio_profile(environ={})
+        self.assertEqual(profile.name, "balanced")
+        self.assertEqual(profile.sample_rate, 16000)
+        self.assertFalse(profile.interim_results)
+        self.assertFalse(profile.vad_enabled)
+        self.assertTrue(profile.live_options()["vad_events"])
+
+    def test_preset_selected_from_env(self):
+        profile = load_audio_profile(environ={"AUDIO_PROFILE": "low-latency"})
+        self.assertEqual(profile, PRESETS["low-latency"])
+        self.assertTrue(profile.live_options()["interim_results"])
+        self.assertFalse(profile.live_options()["vad_events"])
+
+    def test_env_overrides(self):
+        profile = load_audio_profile(
+            "low-cpu",
+            environ={"AUDIO_SAMPLE_RATE": "24000", "AUDIO_INTERIM_RESULTS": "true", "AUDIO_VAD_STOP_SECS": "0.5"},
+        )
+        self.assertEqual(profile.sample_rate, 24000)
+        self.assertTrue(profile.interim_results)
+        self.assertEqual(profile.vad_stop_secs, 0.5)
+        self.assertEqual(profile.transport_params()["audio_out_sample_rate"], 24000)
+
+    def test_out_chunks_rounded_to_10ms(self):
+        profile = load_audio_profile("low-cpu", environ={"AUDIO_OUT_CHUNK_MS": "25"})
+        self.assertEqual(profile.out_10ms_chunks, 2)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            load_audio_profile("turbo", environ={})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from api import _parse_link_header
+from benchmarks.bench_api import compare, confirmed_regressions, link_headers, run, wide_product
+
+
+class TestBenchApi(unittest.TestCase):
+    def test_compare_flags_regressions_beyond_threshold(self):
+        baselines = {"a": {"relative": 1.0}, "b": {"relative": 1.0}}
+        results = {"a": {"relative": 1.2}, "b": {"relative": 1.3}, "new": {"relative": 9.0}}
+        self.assertEqual(compare(results, baselines, threshold=0.25), ["b"])
+
+    def test_regressions_are_confirmed_by_measuring_again(self):
+        results = {"link_header": {"relative": 1.0}, "deals[10]": {"relative": 1.0}}
+        # A baseline far below any real timing stays flagged, a noisy one clears on the rerun
+        baselines = {"link_header": {"relative": 1e-12}, "deals[10]": {"relative": 1.0 / 2}}
+        self.assertEqual(confirmed_regressions(results, baselines, [10], repeat=1, runs=1), ["link_header"])
+        self.assertLess(results["deals[10]"]["relative"], 1.0)
+
+    def test_fixtures(self):
+        self.assertEqual(len(wide_product(300)["variants"]), 300)
+        next_page_info, prev_page_info = _parse_link_header(link_headers(1)[0])
+        self.assertEqual((len(next_page_info), len(prev_page_info)), (64, 64))
+        self.assertNotEqual(next_page_info, prev_page_info)
+
+    def test_runs_every_case(self):
+        results = run([10], repeat=1)
+        self.assertEqual(set(results), {"transform[100 variants]", "transform[500 variants]", "link_header",
+                                        "deals_page[full]", "deals_page[projected]", "matches[10]", "deals[10]"})
+        self.assertTrue(all(result["relative"] > 0 for result in results.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
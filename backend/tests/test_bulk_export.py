@@ -0,0 +1,124 @@
+import functools
+import http.server
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import bulk_export
+from catalog import CatalogStore
+
+EXPORT_ROWS = [
+    {
+        "id": "gid://shopify/Product/1",
+        "title": "Trail Runner",
+        "vendor": "Stride",
+        "productType": "Shoes",
+        "tags": ["running", "sale"],
+        "status": "ACTIVE",
+        "featuredImage": {"id": "gid://shopify/ProductImage/11", "url": "https://cdn.shopify.com/a.png", "width": 800, "height": 600},
+        "options": [{"id": "gid://shopify/ProductOption/21", "name": "Color", "position": 1, "values": ["Red"]}],
+        "rating": {"value": "4.5"},
+    },
+    {
+        "id": "gid://shopify/ProductVariant/102",
+        "title": "Red / 10",
+        "price": "89.00",
+        "compareAtPrice": "120.00",
+        "position": 2,
+        "inventoryPolicy": "DENY",
+        "inventoryQuantity": 0,
+        "inventoryItem": {"id": "gid://shopify/InventoryItem/202"},
+        "selectedOptions": [{"name": "Color", "value": "Red"}, {"name": "Size", "value": "10"}],
+        "__parentId": "gid://shopify/Product/1",
+    },
+    {
+        "id": "gid://shopify/ProductVariant/101",
+        "title": "Red / 9",
+        "price": "79.00",
+        "compareAtPrice": None,
+        "position": 1,
+        "inventoryPolicy": "DENY",
+        "inventoryQuantity": 3,
+        "selectedOptions": [{"name": "Color", "value": "Red"}, {"name": "Size", "value": "9"}],
+        "__parentId": "gid://shopify/Product/1",
+    },
+    {"id": "gid://shopify/Product/2", "title": "Mug", "vendor": "Kiln", "productType": "Kitchen", "tags": [], "status": "DRAFT"},
+]
+
+
+class TestStitchProducts(unittest.TestCase):
+    def test_variants_attached_to_parent_in_position_order(self):
+        products = list(bulk_export.stitch_products(iter(EXPORT_ROWS)))
+        self.assertEqual([product["id"] for product in products], [1, 2])
+
+        shoe = products[0]
+        self.assertEqual(shoe["tags"], "running, sale")
+        self.assertEqual(shoe["status"], "active")
+        self.assertEqual(shoe["rating"], 4.5)
+        self.assertEqual(shoe["image"]["src"], "https://cdn.shopify.com/a.png")
+        self.assertEqual([variant["id"] for variant in shoe["variants"]], [101, 102])
+        self.assertEqual(shoe["variants"][1]["inventory_item_id"], 202)
+        self.assertEqual(shoe["variants"][1]["option2"], "10")
+        self.assertEqual(products[1]["variants"], [])
+        self.assertIsNone(products[1]["image"])
+
+
+class TestReindex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.export_path = os.path.join(self.tmp.name, "export.jsonl")
+        with open(self.export_path, "w") as file:
+            file.write("\n".join(json.dumps(row) for row in EXPORT_ROWS) + "\n")
+
+    def test_reindex_from_local_file(self):
+        store = CatalogStore(db_path=None)
+        self.assertEqual(bulk_export.reindex(store, source=self.export_path), 2)
+        self.assertEqual(store.count(), 2)
+        self.assertEqual(store.get(1)["variants"][0]["price"], "79.00")
+        first_version = store.version
+
+        with open(self.export_path, "w") as file:
+            file.write(json.dumps(EXPORT_ROWS[-1]) + "\n")
+        self.assertEqual(bulk_export.reindex(store, source=f"file://{self.export_path}"), 1)
+        self.assertIsNone(store.get(1))
+        self.assertNotEqual(store.version, first_version)
+
+    def test_reindex_from_http_stand_in(self):
+        handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=self.tmp.name)
+        handler.log_message = lambda *args: None
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+
+        store = CatalogStore(db_path=None)
+        url = f"http://127.0.0.1:{server.server_address[1]}/export.jsonl"
+        self.assertEqual(bulk_export.reindex(store, source=url), 2)
+        self.assertEqual([product["id"] for product in store.iter_products(batch_size=1)], [1, 2])
+
+    @patch("bulk_export.requests.post")
+    def test_start_and_wait_for_export(self, mock_post):
+        responses = [
+            {"data": {"bulkOperationRunQuery": {"bulkOperation": {"id": "op1", "status": "CREATED"}, "userErrors": []}}},
+            {"data": {"currentBulkOperation": {"id": "op1", "status": "RUNNING", "url": None}}},
+            {"data": {"currentBulkOperation": {"id": "op1", "status": "COMPLETED", "url": "https://storage/export.jsonl"}}},
+        ]
+        mock_post.side_effect = [MagicMock(status_code=200, json=MagicMock(return_value=body)) for body in responses]
+
+        operation_id = bulk_export.start_bulk_export()
+        url = bulk_export.wait_for_bulk_export(operation_id, sleep=lambda seconds: None)
+        self.assertEqual(url, "https://storage/export.jsonl")
+
+    @patch("bulk_export.requests.post")
+    def test_failed_export_raises(self, mock_post):
+        body = {"data": {"currentBulkOperation": {"id": "op1", "status": "FAILED", "errorCode": "TIMEOUT"}}}
+        mock_post.return_value = MagicMock(status_code=200, json=MagicMock(return_value=body))
+        with self.assertRaises(Exception):
+            bulk_export.wait_for_bulk_export("op1", sleep=lambda seconds: None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+from columnar import ColumnarCatalog, StringTable
+
+
+def product(product_id, price, compare_at=None, vendor="Acme", product_type="Shoes", tags="", stock=1, rating=None):
+    return {
+        "id": product_id,
+        "vendor": vendor,
+        "product_type": product_type,
+        "tags": tags,
+        "rating": rating,
+        "variants": [{"price": price, "compare_at_price": compare_at, "inventory_quantity": stock}],
+    }
+
+
+class TestColumnarCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = ColumnarCatalog.from_products([
+            product(1, "150.00", "200.00", tags="sale, new", stock=3, rating=4.5),
+            product(2, "50.00", None, vendor="Other", product_type="Hats", tags="old", stock=0),
+            product(3, "120.00", "125.00", vendor="acme", tags="Sale"),
+            product(4, None, "10.00", tags=""),
+        ])
+
+    def test_string_table_interns_case_insensitively(self):
+        table = StringTable()
+        self.assertEqual(table.intern("Acme"), table.intern("ACME"))
+        self.assertEqual(table[table.code_of("acme")], "Acme")
+        self.assertEqual(table.code_of("missing"), -1)
+        self.assertEqual(table.intern(None), -1)
+
+    def test_columns_use_cents_and_codes(self):
+        self.assertEqual(self.catalog.price_cents.tolist(), [15000, 5000, 12000, -1])
+        self.assertEqual(self.catalog.compare_at_cents.tolist(), [20000, -1, 12500, 1000])
+        self.assertEqual(len(self.catalog.vendors), 2)
+        self.assertEqual(self.catalog.tag_offsets.tolist(), [0, 2, 3, 4, 4])
+
+    def test_row_view(self):
+        row = self.catalog.row(0)
+        self.assertEqual((row.id, row.vendor, row.product_type), (1, "Acme", "Shoes"))
+        self.assertEqual(row.tags, ["sale", "new"])
+        self.assertEqual((row.price, row.compare_at_price, row.stock, row.rating), (150.0, 200.0, 3, 4.5))
+        self.assertIsNone(self.catalog.row(1).compare_at_price)
+        self.assertIsNone(self.catalog.row(1).rating)
+        self.assertFalse(hasattr(row, "__dict__"))
+
+    def test_price_range_mask_skips_missing_prices(self):
+        self.assertEqual(self.catalog.price_range_mask(100, 150).tolist(), [True, False, True, False])
+        self.assertEqual(self.catalog.price_range_mask().tolist(), [True, True, True, False])
+
+    def test_filter_mask(self):
+        ids = lambda mask: self.catalog.ids[mask].tolist()
+        self.assertEqual(ids(self.catalog.filter_mask(vendor="ACME", tags=["sale"])), [1, 3])
+        self.assertEqual(ids(self.catalog.filter_mask(category="hats", in_stock=False)), [2])
+        self.assertEqual(ids(self.catalog.filter_mask(tags=["unknown"])), [])
+        self.assertEqual(ids(self.catalog.filter_mask(vendor="Nobody")), [])
+
+    def test_unknown_values_do_not_match_rows_missing_them(self):
+        catalog = ColumnarCatalog.from_products([product(1, "10.00"), product(2, "12.00", vendor=None, product_type=None)])
+        ids = lambda mask: catalog.ids[mask].tolist()
+        self.assertEqual(ids(catalog.filter_mask(vendor="Nobody")), [])
+        self.assertEqual(ids(catalog.filter_mask(category="Nothing")), [])
+        self.assertEqual(ids(catalog.filter_mask(category="Shoes")), [1])
+
+    def test_discount_order(self):
+        self.assertEqual(self.catalog.ids[self.catalog.discount_order()].tolist()[:2], [1, 3])
+        self.assertEqual(self.catalog.ids[self.catalog.discount_order(limit=1)].tolist(), [1])
+
+    def test_empty_catalog(self):
+        catalog = ColumnarCatalog.from_products([])
+        self.assertEqual(len(catalog), 0)
+        self.assertEqual(catalog.tags_mask(["sale"]).tolist(), [])
+        self.assertEqual(catalog.discount_order(limit=5).tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+
+from cursors import ProductPrefetcher, ResultCursors
+
+
+class TestResultCursors(unittest.TestCase):
+    def test_pages_through_ranked_ids(self):
+        cursors = ResultCursors(page_size=2)
+        first = cursors.open([5, 4, 3, 2, 1], source="search_products", extra={"facets": {}})
+        self.assertEqual((first["product_ids"], first["has_more"], first["total"]), ([5, 4], True, 5))
+        self.assertIn("facets", first)
+        self.assertEqual(cursors.upcoming(first["cursor"]), [3, 2])
+        self.assertEqual(cursors.next_page(first["cursor"])["product_ids"], [3, 2])
+        last = cursors.next_page(first["cursor"])
+        self.assertEqual((last["product_ids"], last["has_more"], last["shown"]), ([1], False, 5))
+        self.assertEqual(cursors.next_page(first["cursor"])["product_ids"], [])
+
+    def test_latest_and_eviction(self):
+        cursors = ResultCursors(max_cursors=2)
+        oldest = cursors.open([1])["cursor"]
+        cursors.open([2])
+        newest = cursors.open([3], page_size=5)["cursor"]
+        self.assertEqual(cursors.latest(), newest)
+        self.assertIn("error", cursors.next_page(oldest))
+        self.assertEqual(cursors.upcoming(oldest), [])
+
+
+class TestProductPrefetcher(unittest.TestCase):
+    def test_prefetched_products_are_shared(self):
+        fetched = []
+
+        async def fetch(product_id):
+            fetched.append(product_id)
+            await asyncio.sleep(0)
+            return {"product": {"id": product_id}}
+
+        async def scenario():
+            prefetcher = ProductPrefetcher(fetch)
+            prefetcher.prefetch([1, 2])
+            products = await prefetcher.get([1, 2, 3])
+            self.assertEqual([p["product"]["id"] for p in products], [1, 2, 3])
+            await prefetcher.get([1])
+            return prefetcher.stats
+
+        stats = asyncio.run(scenario())
+        self.assertEqual(fetched, [1, 2, 3])
+        self.assertEqual(stats, {"prefetched": 2, "hits": 3, "misses": 1})
+
+    def test_errors_are_refetched(self):
+        responses = [{"error": "502"}, {"product": {"id": 1}}]
+
+        async def fetch(product_id):
+            return responses.pop(0)
+
+        async def scenario():
+            prefetcher = ProductPrefetcher(fetch)
+            self.assertIn("error", (await prefetcher.get([1]))[0])
+            return (await prefetcher.get([1]))[0]
+
+        self.assertEqual(asyncio.run(scenario()), {"product": {"id": 1}})
+
+
+if __name__ == "__main__":
+    unittest.main()
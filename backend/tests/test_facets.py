@@ -0,0 +1,52 @@
+import unittest
+
+from columnar import ColumnarCatalog
+from facets import FacetCatalog
+
+PRODUCTS = [
+    {"id": 1, "product_type": "Electronics", "subcategory": "Audio", "vendor": "SoundMaster"},
+    {"id": 2, "product_type": "Electronics", "subcategory": "Audio", "vendor": "soundmaster"},
+    {"id": 3, "product_type": "Electronics > Cameras", "vendor": "Snap"},
+    {"id": 4, "product_type": "Fashion", "vendor": "Stride"},
+    {"id": 5, "product_type": None, "vendor": None},
+    {"id": 7, "product_type": "Electronics > TV", "vendor": "Vision"},
+]
+
+
+class TestFacetCatalog(unittest.TestCase):
+    def test_columnar_and_product_builds_agree(self):
+        from_products = FacetCatalog.from_products(PRODUCTS)
+        from_columns = FacetCatalog.from_columns(ColumnarCatalog.from_products(PRODUCTS))
+        self.assertEqual(from_products.categories(), from_columns.categories())
+        self.assertEqual(from_products.brands(), from_columns.brands())
+
+    def test_categories_with_counts(self):
+        categories = FacetCatalog.from_products(PRODUCTS).categories()
+        self.assertEqual(categories[0], {
+            "name": "Electronics", "count": 4, "subcategories": [
+                {"name": "Audio", "count": 2}, {"name": "Cameras", "count": 1}, {"name": "TV", "count": 1},
+            ],
+        })
+        self.assertEqual([category["name"] for category in categories], ["Electronics", "Fashion"])
+
+    def test_brands_by_category_or_subcategory(self):
+        facets = FacetCatalog.from_products(PRODUCTS)
+        self.assertEqual(facets.brands()[0], {"name": "SoundMaster", "count": 2})
+        self.assertEqual(facets.brands("electronics"), [
+            {"name": "SoundMaster", "count": 2}, {"name": "Snap", "count": 1}, {"name": "Vision", "count": 1},
+        ])
+        self.assertEqual(facets.brands("Cameras"), [{"name": "Snap", "count": 1}])
+        self.assertEqual(facets.brands("Toys"), [])
+
+    def test_incremental_apply(self):
+        facets = FacetCatalog.from_products(PRODUCTS)
+        facets.apply([PRODUCTS[3], None], [{"id": 4, "product_type": "Fashion", "vendor": "Runner"},
+                                           {"id": 6, "product_type": "Toys", "vendor": "Blocks"}])
+        self.assertEqual(facets.brands("Fashion"), [{"name": "Runner", "count": 1}])
+        self.assertEqual(facets.brands("Toys"), [{"name": "Blocks", "count": 1}])
+        facets.apply([{"id": 6, "product_type": "Toys", "vendor": "Blocks"}], [])
+        self.assertNotIn("Toys", [category["name"] for category in facets.categories()])
+
+
+if __name__ == "__main__":
+    unittest.main()
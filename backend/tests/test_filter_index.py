@@ -0,0 +1,100 @@
+import unittest
+
+import numpy as np
+
+from benchmarks.catalog_gen import generate_products
+from columnar import ColumnarCatalog
+from filter_index import Bitmap, FilterIndex
+
+
+def product(product_id, price, product_type="Electronics > Audio", vendor="Acme", tags="", colors=(), stock=1, rating=None):
+    return {
+        "id": product_id,
+        "product_type": product_type,
+        "vendor": vendor,
+        "tags": tags,
+        "rating": rating,
+        "options": [{"name": "Color", "values": list(colors)}],
+        "variants": [{"price": price, "inventory_quantity": stock}],
+    }
+
+
+class TestBitmap(unittest.TestCase):
+    def test_sparse_and_dense_membership(self):
+        sparse = Bitmap.from_indices([5, 900], 1000)
+        dense = Bitmap.from_mask(np.arange(1000) % 2 == 0)
+        self.assertIsNotNone(sparse.indices)
+        self.assertIsNotNone(dense.words)
+        rows = np.array([0, 5, 6, 900, 999])
+        self.assertEqual(sparse.contains(rows).tolist(), [False, True, False, True, False])
+        self.assertEqual(dense.contains(rows).tolist(), [True, False, True, True, False])
+        self.assertEqual(dense.cardinality, 500)
+        self.assertEqual(dense.to_indices()[:3].tolist(), [0, 2, 4])
+        self.assertEqual(sparse.union(Bitmap.from_indices([7], 1000)).to_indices().tolist(), [5, 7, 900])
+
+    def test_empty_bitmap(self):
+        empty = Bitmap.from_indices([], 100)
+        self.assertEqual(empty.contains(np.array([1, 2])).tolist(), [False, False])
+
+
+class TestFilterIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = FilterIndex(ColumnarCatalog.from_products([
+            product(1, "150.00", tags="sale, new", colors=["Black", "Silver"], rating=4.5),
+            product(2, "50.00", product_type="Fashion", vendor="Other", tags="old", colors=["Red"], stock=0, rating=3.0),
+            product(3, "120.00", tags="sale", colors=["black"], rating=4.8),
+            product(4, "90.00", vendor="Other", colors=["White"]),
+        ]))
+
+    def ids(self, **query):
+        result = self.index.query(**query)
+        return self.index.catalog.ids[result.rows].tolist()
+
+    def test_single_facets(self):
+        self.assertEqual(self.ids(vendor="acme"), [1, 3])
+        self.assertEqual(self.ids(subcategory="Audio"), [1, 3, 4])
+        self.assertEqual(self.ids(colors=["BLACK"]), [1, 3])
+        self.assertEqual(self.ids(colors=["red", "white"]), [2, 4])
+        self.assertEqual(self.ids(in_stock=False), [2])
+        self.assertEqual(self.ids(min_rating=4.6), [3])
+
+    def test_category_is_the_first_level_of_the_product_type(self):
+        self.assertEqual(self.ids(category="electronics"), [1, 3, 4])
+        self.assertEqual(self.ids(category="Electronics > Audio"), [])
+        facets = self.index.query(in_stock=True).facets
+        self.assertEqual(facets["category"], {"Electronics": 3})
+        mask = self.index.catalog.filter_mask(category="Electronics", vendor="Acme")
+        self.assertEqual(self.index.catalog.ids[mask].tolist(), [1, 3])
+
+    def test_price_range_is_inclusive(self):
+        self.assertEqual(self.ids(min_price=90, max_price=150), [1, 3, 4])
+        self.assertEqual(self.ids(max_price=49.99), [])
+
+    def test_combined_query_with_paging(self):
+        self.assertEqual(self.ids(tags=["sale"], colors=["black"], max_price=200, in_stock=True), [1, 3])
+        self.assertEqual(self.ids(tags=["sale"], limit=1, offset=1), [3])
+        result = self.index.query(tags=["sale"], limit=1)
+        self.assertEqual(result.total, 2)
+
+    def test_unknown_value_matches_nothing(self):
+        self.assertEqual(self.ids(vendor="Nobody", in_stock=True), [])
+        self.assertEqual(self.index.query(colors=["purple"]).total, 0)
+
+    def test_facet_counts(self):
+        facets = self.index.query(in_stock=True).facets
+        self.assertEqual(facets["vendor"], {"Acme": 2, "Other": 1})
+        self.assertEqual(facets["color"]["Black"], 2)
+        self.assertEqual(facets["tag"], {"sale": 2, "new": 1})
+        self.assertEqual(facets["in_stock"], 3)
+
+    def test_matches_columnar_predicates(self):
+        catalog = ColumnarCatalog.from_products(generate_products(3000, seed=1))
+        index = FilterIndex(catalog)
+        query = {"vendor": "Vendor 3", "tags": ["sale", "eco"], "min_price": 20, "max_price": 300, "in_stock": True}
+        expected = np.flatnonzero(catalog.filter_mask(**query))
+        result = index.query(limit=len(catalog), **query)
+        self.assertEqual(result.rows.tolist(), expected.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
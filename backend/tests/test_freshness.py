@@ -0,0 +1,96 @@
+import unittest
+
+from freshness import REFRESH_BACKOFF_SECS, ProductCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def product(product_id, price="10.00", stock=5):
+    return {
+        "id": product_id,
+        "title": f"Product {product_id}",
+        "variants": [
+            {"id": product_id * 10, "price": price, "compare_at_price": None, "inventory_quantity": stock, "sku": "A"},
+            {"id": product_id * 10 + 1, "price": price, "compare_at_price": None, "inventory_quantity": 0, "sku": "B"},
+        ],
+    }
+
+
+class TestProductCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ProductCache(metadata_ttl=3600, volatile_ttl=60, clock=self.clock)
+        self.fetched = []
+
+    def fetch(self, ids):
+        self.fetched.append(list(ids))
+        return {product_id: [{"id": product_id * 10, "price": "8.00", "inventory_quantity": 0}] for product_id in ids}
+
+    def test_tiers_expire_separately(self):
+        self.cache.remember(product(1))
+        self.assertEqual(self.cache.metadata("1")["title"], "Product 1")
+        self.assertEqual(self.cache.stale_ids([1, 2]), [2])
+
+        self.clock.now = 61
+        self.assertIsNotNone(self.cache.metadata(1))
+        self.assertEqual(self.cache.stale_ids([1]), [1])
+
+        self.clock.now = 3601
+        self.assertIsNone(self.cache.metadata(1))
+
+    def test_refresh_batches_stale_products_and_merges(self):
+        for product_id in (1, 2, 3):
+            self.cache.remember(product(product_id))
+        self.clock.now = 30
+        self.cache.remember(product(4))
+        self.clock.now = 61
+
+        self.cache.refresh([2], self.fetch)
+        # The requested id first, then other stale products, most recently read first
+        self.assertEqual(self.fetched, [[2, 3, 1]])
+        self.cache.refresh([1, 2, 3], self.fetch)
+        self.assertEqual(len(self.fetched), 1)
+        self.assertEqual(self.cache.stats["volatile_hits"], 3)
+
+        merged = self.cache.merge(self.cache.metadata(2))
+        self.assertEqual(merged["variants"][0], {"id": 20, "price": "8.00", "compare_at_price": None, "inventory_quantity": 0, "sku": "A"})
+        self.assertEqual(merged["variants"][1]["sku"], "B")
+        self.assertEqual(self.cache.metadata(2)["variants"][0]["price"], "10.00")
+        self.assertEqual(self.cache.price_stock(2), (8.0, 0))
+        self.assertEqual(self.cache.price_stock(4), (10.0, 5))
+        self.assertIsNone(self.cache.price_stock(99))
+
+    def test_failed_refresh_keeps_stale_values_and_backs_off(self):
+        self.cache.remember(product(1))
+        self.clock.now = 61
+
+        def failing(ids):
+            self.fetched.append(list(ids))
+            raise ConnectionError("down")
+
+        self.cache.refresh([1], failing)
+        self.cache.refresh([1], failing)
+        self.assertEqual(len(self.fetched), 1)
+        self.assertEqual(self.cache.price_stock(1), (10.0, 5))
+
+        self.clock.now += REFRESH_BACKOFF_SECS
+        self.cache.refresh([1], self.fetch)
+        self.assertEqual(self.cache.price_stock(1), (8.0, 0))
+        self.assertEqual(self.cache.stats["refresh_errors"], 1)
+
+    def test_lru_bound(self):
+        cache = ProductCache(max_products=2, clock=self.clock)
+        for product_id in (1, 2, 3):
+            cache.remember(product(product_id))
+        self.assertIsNone(cache.metadata(1))
+        self.assertIsNotNone(cache.metadata(3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import time
+import unittest
+
+from hedging import Hedger, LatencyTracker, RateBudget
+
+
+class FakeResponse:
+    def __init__(self, name, status_code=200):
+        self.name = name
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, name, delay, fail=False, status_code=200):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.status_code = status_code
+        self.responses = []
+
+    def get(self, url, **kwargs):
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(self.name)
+        response = FakeResponse(self.name, self.status_code)
+        self.responses.append(response)
+        return response
+
+
+def tracker(delay_ms):
+    return LatencyTracker(default_ms=delay_ms, min_ms=1, min_samples=1000)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_delay_is_clamped_p90(self):
+        latencies = LatencyTracker(min_samples=10, min_ms=50, max_ms=1000)
+        self.assertEqual(latencies.delay_secs(), 0.8)
+        for ms in range(10, 110, 10):
+            latencies.record(ms)
+        self.assertEqual(latencies.delay_secs(), 0.09)
+        latencies.record(5000)
+        latencies.record(5000)
+        self.assertEqual(latencies.delay_secs(), 1.0)
+
+
+class TestRateBudget(unittest.TestCase):
+    def test_reserve_and_refill(self):
+        now = [0.0]
+        budget = RateBudget(rate_per_sec=2, burst=3, clock=lambda: now[0])
+        self.assertTrue(budget.try_acquire(reserve=1))
+        self.assertFalse(budget.try_acquire(reserve=2))
+        self.assertTrue(budget.try_acquire())
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+        now[0] = 0.5
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+
+
+class TestHedger(unittest.TestCase):
+    def test_fast_primary_is_not_hedged(self):
+        primary, backup = FakeSession("a", 0), FakeSession("b", 0)
+        hedger = Hedger([primary, backup], tracker(200))
+        self.assertEqual(hedger.get("https://shop/products.json").name, "a")
+        self.assertEqual(hedger.report()["hedged"], 0)
+
+    def test_hedge_wins_and_slow_primary_is_closed(self):
+        slow, fast = FakeSession("slow", 0.3), FakeSession("fast", 0)
+        hedger = Hedger([slow, fast], tracker(20))
+        self.assertEqual(hedger.get("https://shop/products.json").name, "fast")
+        time.sleep(0.4)
+        self.assertTrue(slow.responses[0].closed)
+        report = hedger.report()
+        self.assertEqual((report["hedged"], report["hedge_wins"], report["hedge_win_rate"]), (1, 1, 1.0))
+
+    def test_failed_hedge_falls_back_to_primary(self):
+        slow, broken = FakeSession("slow", 0.1), FakeSession("broken", 0, fail=True)
+        hedger = Hedger([slow, broken], tracker(20))
+        self.assertEqual(hedger.get("https://shop/products.json").name, "slow")
+        self.assertEqual(hedger.report()["hedge_wins"], 0)
+
+    def test_throttled_or_failing_hedge_does_not_win(self):
+        for status in (429, 503):
+            with self.subTest(status=status):
+                slow, busy = FakeSession("slow", 0.1), FakeSession("busy", 0, status_code=status)
+                hedger = Hedger([slow, busy], tracker(20))
+                self.assertEqual(hedger.get("https://shop/products.json").name, "slow")
+                self.assertTrue(busy.responses[0].closed)
+                self.assertEqual(hedger.report()["hedge_wins"], 0)
+
+    def test_both_failing_returns_the_primary_response(self):
+        slow, busy = FakeSession("slow", 0.1, status_code=502), FakeSession("busy", 0, status_code=503)
+        hedger = Hedger([slow, busy], tracker(20))
+        response = hedger.get("https://shop/products.json")
+        self.assertEqual((response.name, response.status_code), ("slow", 502))
+        self.assertTrue(busy.responses[0].closed)
+
+    def test_no_hedge_without_budget(self):
+        slow, fast = FakeSession("slow", 0.1), FakeSession("fast", 0)
+        hedger = Hedger([slow, fast], tracker(20), RateBudget(rate_per_sec=0, burst=1), hedge_reserve=0)
+        self.assertEqual(hedger.get("https://shop/products.json").name, "slow")
+        self.assertEqual(hedger.report()["budget_denied"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from loguru import logger
+
+import logging_setup
+from logging_setup import LogFilter, configure_logging, parse_sampling, watch_level_file, write_level_file
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        self.lines = []
+
+    def tearDown(self):
+        logger.remove()
+        logger.configure(extra={})
+        logger.add(sys.stderr)
+        logging_setup._active_filter = None
+
+    def configure(self, **kwargs):
+        options = {"enqueue": False, "sampling": "", "rate_limit": 0, **kwargs}
+        return configure_logging("abc123", sink=self.lines.append, **options)
+
+    def test_debug_records_are_sampled_and_rate_limited_per_logger(self):
+        clock = FakeClock()
+        log_filter = LogFilter("DEBUG", parse_sampling("pipecat=0.25,pipecat.transports=0"), rate_limit=2, clock=clock)
+
+        def passed(name, level="DEBUG", count=8):
+            records = [{"name": name, "level": logger.level(level)} for _ in range(count)]
+            return sum(log_filter(record) for record in records)
+
+        self.assertEqual(passed("pipecat.processors.frame_processor"), 2)
+        self.assertEqual(passed("pipecat.transports.base_output"), 0)
+        self.assertEqual(passed("pipecat.transports.base_output", "INFO"), 8)
+        # Not sampled, but only 2 records per second
+        self.assertEqual(passed("bot"), 2)
+        clock.now = 1.0
+        self.assertEqual(passed("bot"), 2)
+        self.assertEqual(passed("bot", "WARNING"), 8)
+
+        stats = log_filter.stats()
+        self.assertEqual(stats["dropped_sampled"], {"pipecat.transports.base_output": 8, "pipecat.processors.frame_processor": 6})
+        self.assertEqual(stats["dropped_rate_limited"], {"bot": 12})
+
+    def test_json_lines_carry_the_session_id(self):
+        self.configure(json_lines=True)
+        logger.bind(tool="search_products").info("Calling tool")
+        record = json.loads(self.lines[0])
+        self.assertEqual(record["session_id"], "abc123")
+        self.assertEqual(record["message"], "Calling tool")
+        self.assertEqual(record["extra"], {"tool": "search_products"})
+        self.assertEqual(record["level"], "INFO")
+
+    def test_level_changes_at_runtime(self):
+        log_filter = self.configure(level="INFO")
+        logger.debug("hidden")
+        logging_setup.set_level("debug")
+        logger.debug("shown")
+        self.assertEqual(log_filter.level, "DEBUG")
+        self.assertEqual([line.split(" - ")[-1].strip() for line in self.lines], ["Log level set to DEBUG", "shown"])
+        with self.assertRaises(ValueError):
+            logging_setup.set_level("LOUD")
+
+    def test_enqueued_sink_writes_off_the_calling_thread(self):
+        self.configure(enqueue=True)
+        logger.info("queued")
+        logger.complete()
+        self.assertIn("abc123", self.lines[0])
+        self.assertIn("queued", self.lines[0])
+
+    def test_bots_follow_the_level_file(self):
+        self.configure(level="DEBUG")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "log_level"
+            write_level_file("warning", path)
+            stop = watch_level_file(path, interval=0.01)
+            try:
+                deadline = time.monotonic() + 2
+                while logging_setup.current_level() != "WARNING" and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            finally:
+                stop.set()
+        self.assertEqual(logging_setup.current_level(), "WARNING")
+
+
+    def test_startup_keeps_a_level_set_at_runtime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "log_level"
+            started = time.time() - 60
+            write_level_file("info", path, keep_since=started)
+            self.assertEqual(path.read_text(), "INFO")
+            write_level_file("debug", path)
+            write_level_file("info", path, keep_since=started)
+            self.assertEqual(path.read_text(), "DEBUG")
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], ["log_level"])
+
+    def test_startup_replaces_a_level_left_by_a_previous_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "log_level"
+            write_level_file("debug", path)
+            os.utime(path, (1, 1))
+            write_level_file("info", path, keep_since=time.time())
+            self.assertEqual(path.read_text(), "INFO")
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], ["log_level"])
+
+if __name__ == "__main__":
+    unittest.main()
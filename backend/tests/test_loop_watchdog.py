@@ -0,0 +1,61 @@
+import asyncio
+import time
+import unittest
+
+from loop_watchdog import LoopWatchdog
+
+
+def blocking_lookup():
+    time.sleep(0.2)
+    return {"product_ids": [1]}
+
+
+class TestLoopWatchdog(unittest.TestCase):
+    def run_session(self, scenario, **kwargs):
+        async def main():
+            watchdog = LoopWatchdog(**kwargs).start()
+            try:
+                await scenario(watchdog)
+                # Let the heartbeat observe the end of the last stall
+                await asyncio.sleep(0.05)
+            finally:
+                watchdog.stop()
+            return watchdog.report()
+
+        return asyncio.run(main())
+
+    def test_stall_in_a_tool_is_captured_with_its_stack(self):
+        async def handler(function_name, args):
+            return blocking_lookup()
+
+        async def scenario(watchdog):
+            await asyncio.sleep(0.05)
+            await watchdog.wrap("search_products", handler)("search_products", {})
+
+        report = self.run_session(scenario, stall_ms=50, interval_ms=5)
+        self.assertEqual(report["stall_count"], 1)
+        stall = report["stalls"][0]
+        self.assertEqual(stall["tool"], "search_products")
+        self.assertGreaterEqual(stall["ms"], 150)
+        self.assertIn("blocking_lookup", "".join(stall["stack"]))
+        self.assertIn("time.sleep(0.2)", stall["stack"][-1])
+        self.assertEqual(report["lag_histogram_ms"][">1000"], 0)
+        self.assertEqual(report["lag_histogram_ms"]["<=250"], 1)
+        self.assertEqual(sum(report["lag_histogram_ms"].values()), report["samples"])
+
+    def test_awaiting_is_not_a_stall(self):
+        async def handler():
+            await asyncio.sleep(0.15)
+            await asyncio.to_thread(blocking_lookup)
+
+        async def scenario(watchdog):
+            await watchdog.wrap("get_deals_of_the_day", handler)()
+
+        report = self.run_session(scenario, stall_ms=50, interval_ms=5)
+        self.assertEqual(report["stall_count"], 0)
+        self.assertGreater(report["samples"], 20)
+        self.assertLess(report["lag_p50_ms"], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import tracemalloc
+import unittest
+
+from memory import MB, MemoryCeiling, SessionMemory, rss_bytes, top_allocations, tree_rss_bytes
+
+HAS_PROC = os.path.exists("/proc/self/statm")
+
+
+class TestRss(unittest.TestCase):
+    @unittest.skipUnless(HAS_PROC, "needs /proc")
+    def test_rss_of_this_process(self):
+        rss = rss_bytes()
+        self.assertGreater(rss, 1 * MB)
+        self.assertEqual(rss_bytes(os.getpid()) // MB, rss // MB)
+        self.assertGreaterEqual(tree_rss_bytes(os.getpid()), rss)
+
+    def test_unknown_process(self):
+        self.assertIsNone(rss_bytes(2 ** 22 + 12345))
+        self.assertIsNone(tree_rss_bytes(2 ** 22 + 12345))
+
+
+class TestSessionMemory(unittest.TestCase):
+    def test_growth_between_start_and_finish(self):
+        tracemalloc.start(1)
+        self.addCleanup(tracemalloc.stop)
+        session = SessionMemory().start()
+        leaked = [bytearray(1024) for _ in range(2000)]
+        report = session.finish()
+
+        self.assertGreater(report["traced_growth_kb"], 1500)
+        self.assertTrue(report["top_growth"][0]["where"].startswith(__file__))
+        self.assertGreaterEqual(report["top_growth"][0]["count_diff"], 2000)
+        self.assertTrue(any(entry["where"].startswith(__file__) for entry in top_allocations()))
+        if HAS_PROC:
+            self.assertIsNotNone(report["rss_growth_mb"])
+        del leaked
+
+    def test_without_tracing(self):
+        if tracemalloc.is_tracing():
+            self.skipTest("tracemalloc is already running")
+        report = SessionMemory().start().finish()
+        self.assertNotIn("top_growth", report)
+        self.assertGreater(report["peak_rss_mb"], 0)
+        self.assertEqual(top_allocations(), [])
+
+
+class TestMemoryCeiling(unittest.TestCase):
+    def test_levels(self):
+        ceiling = MemoryCeiling(soft_mb=100, hard_mb=200)
+        self.assertEqual(ceiling.check(50 * MB), "ok")
+        self.assertEqual(ceiling.check(150 * MB), "soft")
+        self.assertEqual(ceiling.check(250 * MB), "hard")
+        self.assertEqual(ceiling.check(None), "ok")
+        self.assertEqual(MemoryCeiling(0, 0).check(sys.maxsize), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from plan_cache import IN_PROGRESS, PlanRecorder, ToolPlanCache, cosine_similarity, plan_fits_utterance, trigrams
+
+DEALS_PLAN = [{"name": "get_deals_of_the_day", "args": {"limit": 5}}]
+SEARCH_PLAN = [{"name": "search_products", "args": {"query": "red shoes", "limit": 10}}]
+FILTER_PLAN = [{"name": "filter_products", "args": {"category": "shoes", "max_price": 50, "limit": 3}}]
+STOCK_PLAN = [{"name": "filter_products", "args": {"category": "shoes", "in_stock": True}}]
+
+
+class TestSimilarity(unittest.TestCase):
+    def test_cosine_similarity(self):
+        self.assertAlmostEqual(cosine_similarity(trigrams("what's on sale"), trigrams("what's on sale")), 1.0)
+        self.assertGreater(cosine_similarity(trigrams("what's on sale"), trigrams("what's on sale today")), 0.75)
+        self.assertLess(cosine_similarity(trigrams("what's on sale"), trigrams("show me your categories")), 0.3)
+
+    def test_plan_fits_utterance(self):
+        self.assertTrue(plan_fits_utterance(SEARCH_PLAN, "show me some red shoes"))
+        self.assertFalse(plan_fits_utterance(SEARCH_PLAN, "show me some red shirts"))
+        self.assertTrue(plan_fits_utterance(DEALS_PLAN, "anything on sale"))
+
+    def test_numbers_and_qualifiers_must_match(self):
+        self.assertTrue(plan_fits_utterance(FILTER_PLAN, "shoes under 50 dollars", "show me shoes under 50"))
+        self.assertFalse(plan_fits_utterance(FILTER_PLAN, "show me shoes under 80 dollars", "show me shoes under 50 dollars"))
+        self.assertFalse(plan_fits_utterance(FILTER_PLAN, "show me shoes over 50 dollars", "show me shoes under 50 dollars"))
+        self.assertFalse(plan_fits_utterance(STOCK_PLAN, "shoes that are not in stock", "shoes that are in stock"))
+        self.assertTrue(plan_fits_utterance(STOCK_PLAN, "any shoes in stock", "shoes that are in stock"))
+
+
+class TestToolPlanCache(unittest.TestCase):
+    def test_store_and_lookup_near_duplicate(self):
+        cache = ToolPlanCache("v1", db_path=None, threshold=0.8)
+        cache.store("What's on sale?", DEALS_PLAN, first_hop_ms=800)
+
+        plan, entry = cache.lookup("whats on sale today")
+        self.assertEqual(plan, DEALS_PLAN)
+        self.assertEqual(entry["hits"], 1)
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(cache.stats["saved_ms"], 800)
+
+        self.assertEqual(cache.lookup("what categories do you have"), (None, None))
+        self.assertEqual(cache.stats["misses"], 1)
+
+    def test_free_text_arguments_must_match(self):
+        cache = ToolPlanCache("v1", db_path=None, threshold=0.5)
+        cache.store("show me red shoes", SEARCH_PLAN, first_hop_ms=500)
+        self.assertEqual(cache.lookup("show me red shirts"), (None, None))
+        self.assertEqual(cache.lookup("Show me red shoes.")[0], SEARCH_PLAN)
+
+    def test_price_filters_are_not_replayed_for_other_prices(self):
+        cache = ToolPlanCache("v1", db_path=None, threshold=0.8)
+        cache.store("show me shoes under 50 dollars", FILTER_PLAN, first_hop_ms=500)
+        self.assertEqual(cache.lookup("show me shoes under 80 dollars"), (None, None))
+        self.assertEqual(cache.lookup("show me shoes over 50 dollars"), (None, None))
+        self.assertEqual(cache.lookup("show me the shoes under 50 dollars")[0], FILTER_PLAN)
+
+    def db_path(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return os.path.join(tmp.name, "plans.db")
+
+    def test_catalog_version_isolates_plans(self):
+        db_path = self.db_path()
+        ToolPlanCache("v1", db_path=db_path).store("what's on sale", DEALS_PLAN, first_hop_ms=800)
+        self.assertEqual(ToolPlanCache("v1", db_path=db_path).lookup("what's on sale")[0], DEALS_PLAN)
+        self.assertEqual(ToolPlanCache("v2", db_path=db_path).lookup("what's on sale"), (None, None))
+
+    def test_side_effect_plans_not_stored(self):
+        cache = ToolPlanCache("v1", db_path=None)
+        cache.store("show deals", DEALS_PLAN + [{"name": "display_products_to_user", "args": {"product_ids": [1]}}], 700)
+        self.assertEqual(cache.stats["stored"], 0)
+
+    def test_overflow_pruned(self):
+        db_path = self.db_path()
+        cache = ToolPlanCache("v1", db_path=db_path, max_entries=2, threshold=1.0)
+        for utterance in ("show deals", "show trending", "show categories"):
+            cache.store(utterance, DEALS_PLAN, first_hop_ms=100)
+        # The least used, oldest plan goes first
+        reopened = ToolPlanCache("v1", db_path=db_path, threshold=1.0)
+        self.assertEqual([reopened.lookup(utterance)[0] is not None for utterance in ("show deals", "show trending", "show categories")],
+                         [False, True, True])
+
+    def test_usable_from_worker_threads(self):
+        cache = ToolPlanCache("v1", db_path=self.db_path())
+
+        async def scenario():
+            await asyncio.to_thread(cache.store, "what's on sale", DEALS_PLAN, 800)
+            return await asyncio.to_thread(cache.lookup, "whats on sale today")
+
+        self.assertEqual(asyncio.run(scenario())[0], DEALS_PLAN)
+
+
+class TestPlanRecorder(unittest.TestCase):
+    def test_records_only_the_first_hop(self):
+        messages = [{"role": "system", "content": "..."}, {"role": "user", "content": "what's on sale"}]
+        recorder = PlanRecorder("what's on sale")
+        # First hop: two calls in parallel, the first one's result not in yet
+        recorder.note_tool_call("get_deals_of_the_day", {"limit": 5}, "c1", messages)
+        messages += [
+            {"role": "assistant", "tool_calls": [{"id": "c1"}, {"id": "c2"}]},
+            {"role": "tool", "tool_call_id": "c1", "content": IN_PROGRESS},
+        ]
+        recorder.note_tool_call("get_categories", {}, "c2", messages)
+        # Answering hop: the results are in and the products are displayed
+        messages[-1] = {"role": "tool", "tool_call_id": "c1", "content": '{"product_ids": [1]}'}
+        messages.append({"role": "tool", "tool_call_id": "c2", "content": "{}"})
+        recorder.note_tool_call("display_products_to_user", {"product_ids": [1]}, "c3", messages)
+        recorder.note_tool_call("get_product_by_id", {"product_id": 1}, "c4", messages)
+
+        self.assertEqual([step["name"] for step in recorder.steps], ["get_deals_of_the_day", "get_categories"])
+        self.assertTrue(recorder.closed)
+        cache = ToolPlanCache("v1", db_path=None)
+        cache.store(recorder.utterance, recorder.steps, recorder.first_hop_ms)
+        self.assertEqual(cache.lookup("what's on sale")[0], recorder.steps)
@@ -0,0 +1,90 @@
+import unittest
+
+from catalog import CatalogStore
+from recommender import Recommender, product_terms, refresh_recommendations, rerank
+
+
+def make_product(product_id, product_type, vendor, tags, price, color=None):
+    product = {
+        "id": product_id,
+        "product_type": product_type,
+        "vendor": vendor,
+        "tags": ", ".join(tags),
+        "variants": [{"price": str(price)}],
+        "options": [{"name": "Color", "values": [color]}] if color else [],
+    }
+    return product
+
+
+PRODUCTS = [
+    make_product(1, "Headphones", "SoundMaster", ["wireless", "noise-cancelling"], 199.99, "black"),
+    make_product(2, "Headphones", "AudioBuddy", ["wireless", "budget"], 49.99, "white"),
+    make_product(3, "Headphones", "SoundMaster", ["wired", "studio"], 179.00, "silver"),
+    make_product(4, "Mug", "Kiln", ["ceramic"], 12.00, "white"),
+    make_product(5, "Mug", "Kiln", ["ceramic", "travel"], 18.00, "black"),
+]
+
+
+class TestProductTerms(unittest.TestCase):
+    def test_terms_cover_type_vendor_tags_color_and_price_band(self):
+        terms = product_terms(PRODUCTS[0])
+        self.assertIn("type:headphones", terms)
+        self.assertIn("vendor:soundmaster", terms)
+        self.assertIn("tag:noise-cancelling", terms)
+        self.assertIn("color:black", terms)
+        self.assertIn("price:7", terms)
+
+
+class TestRecommender(unittest.TestCase):
+    def test_neighbors_prefer_same_category(self):
+        recommender = Recommender(top_k=3).fit(PRODUCTS)
+        self.assertEqual(set(recommender.recommend(1, limit=2)), {2, 3})
+        self.assertEqual(recommender.recommend(4, limit=1), [5])
+        self.assertNotIn(1, recommender.recommend(1))
+
+    def test_preferences_rerank_neighbors(self):
+        recommender = Recommender(top_k=3).fit(PRODUCTS)
+        self.assertEqual(recommender.recommend(1, user_preferences="budget wireless", limit=1), [2])
+        self.assertEqual(recommender.recommend(1, user_preferences={"style": "studio"}, limit=1), [3])
+
+    def test_incremental_update_matches_full_fit(self):
+        recommender = Recommender(top_k=2).fit(PRODUCTS[:4])
+        new_mug = make_product(5, "Mug", "Kiln", ["ceramic", "travel"], 18.00, "black")
+        changed_headphones = make_product(2, "Mug", "Kiln", ["ceramic"], 14.00, "white")
+        recommender.update([new_mug, changed_headphones], removed_ids=[3])
+
+        expected = Recommender(top_k=2).fit([PRODUCTS[0], changed_headphones, PRODUCTS[3], new_mug])
+        for product_id in (1, 2, 4, 5):
+            self.assertEqual(
+                [pid for pid, _ in recommender.neighbors[product_id]],
+                [pid for pid, _ in expected.neighbors[product_id]],
+            )
+        self.assertNotIn(3, recommender.neighbors)
+
+    def test_load_vectors_matches_fit(self):
+        fitted = Recommender(top_k=2).fit(PRODUCTS)
+        # Repeated ids keep their latest vector
+        loaded = Recommender(top_k=2).load_vectors(PRODUCTS + [PRODUCTS[1]], fitted.neighbors)
+        self.assertEqual(loaded.ids, fitted.ids)
+        loaded.update([PRODUCTS[0]])
+        self.assertEqual(loaded.neighbors, fitted.neighbors)
+
+    def test_rerank_without_preferences_keeps_order(self):
+        self.assertEqual(rerank([(7, 0.9), (8, 0.5)], {}, None, limit=5), [7, 8])
+
+
+class TestRefreshRecommendations(unittest.TestCase):
+    def test_full_and_incremental_refresh(self):
+        store = CatalogStore(db_path=None)
+        store.replace_all(PRODUCTS[:4])
+        refresh_recommendations(store)
+        self.assertEqual(store.get_recommendations(4)[0][0], 2)
+
+        store.upsert_products([PRODUCTS[4]])
+        refresh_recommendations(store, changed_ids=[5])
+        self.assertEqual(store.get_recommendations(4)[0][0], 5)
+        self.assertEqual(store.get_recommendation_words([5])[5] >= {"ceramic", "travel", "kiln"}, True)
+
+
+if __name__ == "__main__":
+    unittest.main()
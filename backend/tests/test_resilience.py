@@ -0,0 +1,150 @@
+import asyncio
+import time
+import unittest
+
+from resilience import CircuitBreaker, ResilientCaller
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("test", window=4, min_calls=4, open_secs=10, slow_call_ms=100, clock=self.clock)
+
+    def test_trips_on_failure_rate_and_recovers_after_probe(self):
+        for ok in (True, True, False, False):
+            self.breaker.record(ok, 10)
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+
+        self.clock.now = 10
+        probe = self.breaker.allow()
+        self.assertTrue(probe)
+        self.assertFalse(self.breaker.allow())  # only one probe at a time
+        self.breaker.record(True, 10, probe)
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertEqual(self.breaker.trips, 1)
+
+    def test_only_the_probe_changes_an_open_breaker(self):
+        in_flight = self.breaker.allow()
+        for ok in (False, False, False, False):
+            self.breaker.record(ok, 10, self.breaker.allow())
+        self.assertEqual(self.breaker.state, "open")
+
+        self.clock.now = 10
+        probe = self.breaker.allow()
+        # A call admitted before the breaker opened finishes during half-open
+        self.breaker.record(True, 10, in_flight)
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record(True, 10, probe)
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_trips_on_slow_calls_and_failed_probe_reopens(self):
+        for _ in range(4):
+            self.breaker.record(True, 500)
+        self.assertEqual(self.breaker.state, "open")
+        self.clock.now = 10
+        probe = self.breaker.allow()
+        self.assertTrue(probe)
+        self.breaker.record(False, 10, probe)
+        self.assertEqual(self.breaker.state, "open")
+
+    def test_stays_closed_below_min_calls(self):
+        for _ in range(3):
+            self.breaker.record(False, 10)
+        self.assertEqual(self.breaker.state, "closed")
+
+
+class TestResilientCaller(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("shopify", window=2, min_calls=2, open_secs=30, clock=self.clock)
+        self.caller = ResilientCaller(self.breaker, fresh_secs=10, clock=self.clock)
+        self.calls = []
+
+    def fetch(self, product_id):
+        self.calls.append(product_id)
+        return {"product": {"id": product_id, "version": len(self.calls)}}
+
+    def test_fresh_then_stale_while_revalidate(self):
+        async def scenario():
+            first = await self.caller.call("get", self.fetch, 1)
+            self.assertEqual(await self.caller.call("get", self.fetch, 1), first)
+            self.assertEqual(len(self.calls), 1)
+
+            self.clock.now = 11
+            stale = await self.caller.call("get", self.fetch, 1)
+            self.assertEqual(stale, first)  # served immediately...
+            await asyncio.sleep(0.05)
+            refreshed = await self.caller.call("get", self.fetch, 1)
+            self.assertEqual(refreshed["product"]["version"], 2)  # ...and refreshed in the background
+
+        asyncio.run(scenario())
+        self.assertEqual(self.caller.stats["stale"], 1)
+
+    def test_deadline_falls_back_to_local(self):
+        def slow(product_id):
+            time.sleep(0.3)
+            return {"product": {"id": product_id}}
+
+        result = asyncio.run(self.caller.call("get", slow, 1, deadline=0.05, fallback=lambda product_id: {"local": product_id}))
+        self.assertEqual(result, {"local": 1})
+        self.assertEqual(self.caller.stats["timeouts"], 1)
+
+    def test_open_breaker_skips_upstream(self):
+        def failing(product_id):
+            self.calls.append(product_id)
+            raise ConnectionError("down")
+
+        async def scenario():
+            for product_id in (1, 2):
+                self.assertIn("error", await self.caller.call("get", failing, product_id))
+            self.assertEqual(self.breaker.state, "open")
+            result = await self.caller.call("get", failing, 3, fallback=lambda product_id: None)
+            self.assertIn("error", result)
+
+        asyncio.run(scenario())
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_cancelled_probe_lets_the_next_call_probe(self):
+        def slow(product_id):
+            time.sleep(0.2)
+            return {"product": {"id": product_id}}
+
+        async def scenario():
+            for _ in range(2):
+                self.breaker.record(False, 10)
+            self.clock.now = 30
+            probe = asyncio.create_task(self.caller.call("get", slow, 1))
+            await asyncio.sleep(0.05)
+            self.assertTrue(self.breaker.probing)
+            probe.cancel()  # e.g. the user interrupted the tool call
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+            self.assertEqual(self.breaker.state, "half_open")
+            self.assertEqual(await self.caller.call("get", self.fetch, 2), {"product": {"id": 2, "version": 1}})
+            self.assertEqual(self.breaker.state, "closed")
+
+        asyncio.run(scenario())
+
+    def test_error_results_are_not_cached(self):
+        responses = [{"error": "502"}, {"product_ids": [1]}]
+        fetch = lambda: responses.pop(0)
+
+        async def scenario():
+            self.assertIn("error", await self.caller.call("deals", fetch))
+            self.assertEqual(await self.caller.call("deals", fetch), {"product_ids": [1]})
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
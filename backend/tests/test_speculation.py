@@ -0,0 +1,146 @@
+import asyncio
+import unittest
+
+from speculation import SpeculationStats, SpeculativeTurn, TranscriptStabilizer, normalize_transcript
+
+
+class TestNormalizeTranscript(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize_transcript("  What's on SALE,  today? "), "what's on sale today")
+
+
+class TestTranscriptStabilizer(unittest.TestCase):
+    def test_stable_after_repeats(self):
+        stabilizer = TranscriptStabilizer(min_repeats=2, min_stable_ms=10_000)
+        self.assertFalse(stabilizer.update("show me", now=0.0))
+        self.assertFalse(stabilizer.update("show me shoes", now=0.1))
+        self.assertTrue(stabilizer.update("Show me shoes.", now=0.2))
+
+    def test_stable_after_time(self):
+        stabilizer = TranscriptStabilizer(min_repeats=5, min_stable_ms=300)
+        self.assertFalse(stabilizer.update("show me shoes", now=0.0))
+        self.assertFalse(stabilizer.update("show me shoes", now=0.1))
+        self.assertTrue(stabilizer.update("show me shoes", now=0.35))
+
+    def test_short_partials_never_stable(self):
+        stabilizer = TranscriptStabilizer(min_repeats=1, min_words=2)
+        self.assertFalse(stabilizer.update("show", now=0.0))
+        self.assertFalse(stabilizer.update("show", now=1.0))
+
+    def test_reset(self):
+        stabilizer = TranscriptStabilizer(min_repeats=2, min_stable_ms=10_000)
+        stabilizer.update("show me shoes", now=0.0)
+        stabilizer.reset()
+        self.assertFalse(stabilizer.update("show me shoes", now=0.1))
+
+
+class TestSpeculationStats(unittest.TestCase):
+    def test_as_dict(self):
+        stats = SpeculationStats()
+        stats.started = 3
+        stats.record_hit(200)
+        stats.record_hit(100)
+        stats.record_waste()
+        self.assertEqual(
+            stats.as_dict(),
+            {"started": 3, "hits": 2, "wasted": 1, "hit_rate": 2 / 3, "saved_ms": 300, "avg_saved_ms": 150},
+        )
+
+
+class FakeContext:
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+    def set_messages(self, messages):
+        self.messages = list(messages)
+
+
+class TestSpeculativeTurn(unittest.TestCase):
+    def setUp(self):
+        self.context = FakeContext([{"role": "system", "content": "prompt"}])
+        self.turn = SpeculativeTurn(self.context, TranscriptStabilizer(min_repeats=2, min_stable_ms=10_000))
+
+    def speculate(self, text, now=0.0):
+        self.turn.on_interim(text, now=now)
+        self.assertTrue(self.turn.on_interim(text, now=now + 0.1))
+
+    def test_hit_keeps_the_speculative_turn(self):
+        self.assertFalse(self.turn.on_interim("show me shoes", now=0.0))
+        self.assertTrue(self.turn.on_interim("show me shoes", now=0.1))
+        # Started once per turn
+        self.assertFalse(self.turn.on_interim("show me shoes", now=0.2))
+        self.assertEqual(self.context.messages[-1], {"role": "user", "content": "show me shoes"})
+        self.context.add_message({"role": "assistant", "content": "Here are some shoes"})
+
+        self.assertEqual(self.turn.on_final("Show me shoes.", now=0.3), "hold")
+        self.assertEqual(self.turn.on_user_stopped(now=0.4), "hit")
+        self.assertEqual([message["role"] for message in self.context.messages], ["system", "user", "assistant"])
+        self.assertEqual(self.turn.stats.as_dict()["hits"], 1)
+        self.assertAlmostEqual(self.turn.stats.saved_ms, 300, places=3)
+
+    def test_multi_segment_finals_resolve_together(self):
+        self.speculate("show me red shoes")
+        self.assertEqual(self.turn.on_final("Show me", now=0.2), "hold")
+        self.assertEqual(self.turn.on_final("red shoes.", now=0.3), "hold")
+        self.assertEqual(self.turn.on_user_stopped(now=0.4), "hit")
+        # The next utterance is a new turn, not a late segment
+        self.turn.on_user_started()
+        self.assertIsNone(self.turn.on_final("thanks", now=1.0))
+
+    def test_final_after_the_user_stopped_resolves(self):
+        self.speculate("show me shoes")
+        self.assertIsNone(self.turn.on_user_stopped(now=0.2))
+        self.assertEqual(self.turn.on_final("show me shoes", now=0.3), "hit")
+
+    def test_late_segment_after_a_hit_is_a_miss(self):
+        self.speculate("show me shoes")
+        self.turn.on_final("show me shoes", now=0.2)
+        self.assertEqual(self.turn.on_user_stopped(now=0.3), "hit")
+        self.assertEqual(self.turn.on_final("under fifty dollars", now=0.5), "miss")
+        self.assertEqual((self.turn.stats.hits, self.turn.stats.wasted, self.turn.stats.saved_ms), (0, 1, 0))
+
+    def test_miss_discards_the_speculative_turn_once_the_corrected_one_is_in(self):
+        self.speculate("show me shoes")
+        self.context.add_message({"role": "assistant", "tool_calls": [{"id": "call_1"}]})
+        self.context.add_message({"role": "tool", "tool_call_id": "call_1", "content": "{}"})
+        self.turn.on_final("show me shoes", now=0.3)
+        self.turn.on_final("under fifty dollars", now=0.4)
+        self.assertEqual(self.turn.on_user_stopped(now=0.5), "miss")
+        self.assertEqual(self.turn.stats.wasted, 1)
+
+        # The interrupted reply lands after the miss, before the aggregator adds the corrected turn
+        self.context.add_message({"role": "assistant", "content": "Here are some sh"})
+        self.assertFalse(self.turn.discard_stale())
+        self.context.add_message({"role": "user", "content": "show me shoes under fifty dollars"})
+        self.assertTrue(self.turn.discard_stale())
+        self.assertEqual(self.context.messages, [
+            {"role": "system", "content": "prompt"},
+            {"role": "user", "content": "show me shoes under fifty dollars"},
+        ])
+
+        # The next turn speculates afresh
+        self.assertIsNone(self.turn.on_final("thanks", now=1.0))
+        self.speculate("what about boots", now=2.0)
+
+    def test_client_visible_tools_wait_for_the_resolution(self):
+        async def scenario(finals):
+            self.turn = SpeculativeTurn(FakeContext([]), TranscriptStabilizer(min_repeats=2, min_stable_ms=10_000))
+            self.assertTrue(await self.turn.confirmed())
+            self.speculate("show me shoes")
+            display = asyncio.ensure_future(self.turn.confirmed())
+            await asyncio.sleep(0)
+            self.assertFalse(display.done())
+            for text in finals:
+                self.turn.on_final(text)
+            self.turn.on_user_stopped()
+            return await display
+
+        self.assertTrue(asyncio.run(scenario(["show me", "shoes"])))
+        self.assertFalse(asyncio.run(scenario(["show me boots"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+import static_files
+from static_files import PrecompressedStaticFiles, cache_control_for, precompress_directory
+
+BUNDLE = b"console.log('shop savy');\n" * 200
+
+
+class TestPrecompressedStaticFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, "assets"))
+        with open(os.path.join(root, "assets", "index-BtD3s7Xa.js"), "wb") as file:
+            file.write(BUNDLE)
+        with open(os.path.join(root, "index.html"), "wb") as file:
+            file.write(b"<html>" + b" " * 2000 + b"</html>")
+        with open(os.path.join(root, "silero_vad.onnx"), "wb") as file:
+            file.write(os.urandom(4096))
+
+        self.written = precompress_directory(root)
+        self.static = PrecompressedStaticFiles(directory=root, html=True)
+        self.client = TestClient(Starlette(routes=[Mount("/", self.static)]))
+
+    def test_precompress_skips_incompressible_and_up_to_date_files(self):
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "assets", "index-BtD3s7Xa.js.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "silero_vad.onnx.gz")))
+        self.assertEqual(precompress_directory(self.tmp.name), 0)
+
+    def test_serves_gzip_variant_with_immutable_caching(self):
+        response = self.client.get("/assets/index-BtD3s7Xa.js", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["cache-control"], static_files.IMMUTABLE_CACHE)
+        self.assertIn("javascript", response.headers["content-type"])
+        self.assertEqual(response.content, BUNDLE)
+
+    def test_index_is_revalidated(self):
+        self.assertEqual(self.client.get("/").headers["cache-control"], static_files.HTML_CACHE)
+
+    def test_identity_when_not_accepted(self):
+        response = self.client.get("/assets/index-BtD3s7Xa.js", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.content, BUNDLE)
+
+    def test_conditional_request(self):
+        first = self.client.get("/silero_vad.onnx")
+        second = self.client.get("/silero_vad.onnx", headers={"If-None-Match": first.headers["etag"]})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(self.static.metrics.not_modified, 1)
+
+    def test_range_request_and_metrics(self):
+        response = self.client.get("/silero_vad.onnx", headers={"Range": "bytes=0-99"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(len(response.content), 100)
+        metrics = self.static.metrics.as_dict()
+        self.assertEqual(metrics["partial"], 1)
+        self.assertEqual(metrics["bytes_served"]["identity"], 100)
+
+    def test_cache_control_for(self):
+        self.assertEqual(cache_control_for("index.html"), static_files.HTML_CACHE)
+        self.assertEqual(cache_control_for("silero_vad.onnx"), static_files.DEFAULT_CACHE)
+        self.assertEqual(cache_control_for("assets/index-BtD3s7Xa.js"), static_files.IMMUTABLE_CACHE)
+        # Copied unhashed by viteStaticCopy, or outside assets/
+        for path in ("ort-wasm-simd.wasm", "product-thumbnail.png", "assets/ort-wasm-simd.wasm", "index-BtD3s7Xa.js"):
+            self.assertEqual(cache_control_for(path), static_files.DEFAULT_CACHE, path)
+
+
+if __name__ == "__main__":
+    unittest.main()
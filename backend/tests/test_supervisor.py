@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from memory import MemoryCeiling
+from supervisor import BotRegistry, BotSupervisor
+
+
+class TestBotRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "bots.db")
+
+    def test_shared_between_instances(self):
+        BotRegistry(self.db_path).add(123, "https://example.daily.co/room")
+        other = BotRegistry(self.db_path)
+        self.assertEqual(other.get(123)["status"], "running")
+        self.assertEqual(len(other.running("https://example.daily.co/room")), 1)
+
+        other.mark_finished(123, exit_code=0)
+        self.assertEqual(BotRegistry(self.db_path).get(123)["status"], "finished")
+        self.assertEqual(other.running(), [])
+
+    def test_usable_from_other_threads(self):
+        registry = BotRegistry(self.db_path)
+        registry.add(123, "room")
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            self.assertEqual(pool.submit(registry.get, 123).result()["pid"], 123)
+
+    def test_get_unknown(self):
+        self.assertIsNone(BotRegistry(self.db_path).get(999))
+
+
+class TestBotSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "bots.db")
+        self.registry = BotRegistry(self.db_path)
+
+    def test_status_from_other_worker(self):
+        owner = BotSupervisor(self.registry)
+        proc = owner.spawn(f"{sys.executable} -c 'import time; time.sleep(30)'", "room")
+        self.addCleanup(proc.kill)
+
+        # A worker without the Popen handle answers from the registry
+        other = BotSupervisor(BotRegistry(self.db_path))
+        self.assertEqual(other.status(proc.pid), "running")
+        self.assertIsNone(other.status(proc.pid + 100000))
+
+        asyncio.run(owner.drain(timeout=5))
+        self.assertEqual(other.status(proc.pid), "finished")
+
+    def test_drain_kills_bots_ignoring_sigterm(self):
+        supervisor = BotSupervisor(self.registry)
+        proc = supervisor.spawn(
+            f"exec {sys.executable} -c 'import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)'",
+            "room",
+        )
+        asyncio.run(supervisor.drain(timeout=0.5))
+        self.assertIsNotNone(proc.poll())
+        self.assertEqual(supervisor.procs, {})
+        self.assertEqual(self.registry.get(proc.pid)["status"], "finished")
+
+    @unittest.skipUnless(os.path.exists("/proc/self/statm"), "needs /proc")
+    def test_samples_rss_and_recycles_bots_above_the_ceiling(self):
+        supervisor = BotSupervisor(self.registry, MemoryCeiling(hard_mb=10_000), recycle_grace=0.2)
+        proc = supervisor.spawn(f"exec {sys.executable} -c 'import time; time.sleep(30)'", "room")
+        self.addCleanup(proc.kill)
+        time.sleep(0.2)
+
+        supervisor.sample_memory()
+        row = self.registry.get(proc.pid)
+        self.assertGreater(row["rss_bytes"], 0)
+        self.assertEqual(row["peak_rss_bytes"], row["rss_bytes"])
+        self.assertEqual(supervisor.memory_report()["bots"][0]["pid"], proc.pid)
+        self.assertIsNone(proc.poll())
+
+        supervisor.ceiling = MemoryCeiling(hard_mb=1)
+        supervisor.sample_memory()
+        proc.wait(timeout=5)
+        supervisor.reap()
+        row = self.registry.get(proc.pid)
+        self.assertEqual((row["status"], row["finish_reason"]), ("finished", "rss_limit"))
+        self.assertEqual(supervisor.memory_report()["bots"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
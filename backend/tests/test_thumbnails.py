@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from PIL import Image
+
+from thumbnails import ThumbnailCache, ThumbnailError, card_thumbnail, supported_formats
+
+
+class TestThumbnailCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.fixtures = root / "images"
+        self.fixtures.mkdir()
+        Image.new("RGB", (1600, 1200), (200, 40, 40)).save(self.fixtures / "red.jpg", quality=95)
+        Image.new("RGBA", (300, 300), (0, 0, 0, 0)).save(self.fixtures / "clear.png")
+        (self.fixtures / "broken.jpg").write_bytes(b"not an image")
+        Image.new("RGB", (10, 10)).save(root / "outside.png")
+        self.cache = ThumbnailCache(root / "thumbnails", self.fixtures, allowed_hosts={"cdn.shopify.com"})
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_resizes_and_serves_from_disk(self):
+        path = self.cache.get("red.jpg", width=480, fmt="webp")
+        with Image.open(path) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (480, 360)))
+        self.assertLess(path.stat().st_size, (self.fixtures / "red.jpg").stat().st_size)
+        self.assertEqual(self.cache.get("red.jpg", width=480, fmt="webp"), path)
+        self.assertEqual(self.cache.stats, {"hits": 1, "renders": 1, "evictions": 0})
+
+    def test_same_content_is_rendered_once(self):
+        (self.fixtures / "copy.jpg").write_bytes((self.fixtures / "red.jpg").read_bytes())
+        first = self.cache.get("red.jpg")
+        self.assertEqual(self.cache.get("copy.jpg"), first)
+        self.assertEqual(self.cache.stats["renders"], 1)
+
+    def test_small_images_are_not_upscaled(self):
+        with Image.open(self.cache.get("clear.png", width=480)) as image:
+            self.assertEqual((image.size, image.mode), ((300, 300), "RGBA"))
+
+    @unittest.skipUnless("avif" in supported_formats(), "Pillow built without AVIF")
+    def test_avif(self):
+        with Image.open(self.cache.get("red.jpg", fmt="avif")) as image:
+            self.assertEqual((image.format, image.width), ("AVIF", 480))
+
+    def test_rejects_bad_requests(self):
+        for src, width, fmt in [
+            ("red.jpg", 123, "webp"),
+            ("red.jpg", 960, "webp"),
+            ("red.jpg", 480, "gif"),
+            ("../outside.png", 480, "webp"),
+            ("/etc/passwd", 480, "webp"),
+            ("missing.jpg", 480, "webp"),
+            ("broken.jpg", 480, "webp"),
+            ("file:///etc/passwd", 480, "webp"),
+            ("https://evil.example.com/a.jpg", 480, "webp"),
+        ]:
+            with self.subTest(src=src, width=width, fmt=fmt):
+                with self.assertRaises(ThumbnailError):
+                    self.cache.get(src, width=width, fmt=fmt)
+
+    def test_evicts_least_recently_used_renditions(self):
+        Image.new("RGB", (600, 600), (40, 200, 40)).save(self.fixtures / "green.jpg")
+        red, clear, green = (self.cache.get(src) for src in ("red.jpg", "clear.png", "green.jpg"))
+        max_bytes = red.stat().st_size + green.stat().st_size
+        green.unlink()
+        os.utime(clear, (1, 1))
+        os.utime(red, (2, 2))
+        cache = ThumbnailCache(self.cache.directory, self.fixtures, max_bytes=max_bytes)
+        self.assertEqual(cache.get("red.jpg"), red)  # a hit marks red as recently used
+        self.assertEqual(cache.get("green.jpg"), green)
+        self.assertTrue(red.exists() and green.exists())
+        self.assertFalse(clear.exists())
+        self.assertEqual(cache.stats["evictions"], 1)
+        self.assertLessEqual(cache._bytes, cache.max_bytes)
+        self.assertEqual(cache.get("clear.png"), clear)  # rendered again from the source
+
+    def test_fetches_allowed_hosts_once(self):
+        data = (self.fixtures / "red.jpg").read_bytes()
+        url = "https://cdn.shopify.com/s/files/red.jpg?v=1"
+        with patch("thumbnails.requests.get") as get:
+            get.return_value.status_code = 200
+            get.return_value.content = data
+            first = self.cache.get(url)
+            self.assertEqual(self.cache.get(url), first)
+        get.assert_called_once()
+
+
+class TestCardThumbnail(unittest.TestCase):
+    def test_urls_per_format(self):
+        thumbnail = card_thumbnail({"src": "https://cdn.shopify.com/a b.jpg?v=1"}, width=480)
+        self.assertEqual(thumbnail["width"], 480)
+        self.assertEqual([source["type"] for source in thumbnail["sources"]], [f"image/{fmt}" for fmt in supported_formats()])
+        self.assertIn("src=https%3A%2F%2Fcdn.shopify.com%2Fa%20b.jpg%3Fv%3D1&w=480", thumbnail["sources"][0]["url"])
+        self.assertIsNone(card_thumbnail(None))
+        self.assertIsNone(card_thumbnail({"src": None}))
+
+    def test_only_sources_the_cache_can_serve(self):
+        self.assertIsNotNone(card_thumbnail({"src": "headphones.jpg"}))
+        self.assertIsNone(card_thumbnail({"src": "https://images.example.com/a.jpg"}))
+        self.assertIsNone(card_thumbnail({"src": "data:image/png;base64,AAAA"}))
+        self.assertIsNotNone(card_thumbnail({"src": "https://images.example.com/a.jpg"}, allowed_hosts={"images.example.com"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
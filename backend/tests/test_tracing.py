@@ -0,0 +1,138 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmarks.catalog_gen import generate_products
+from benchmarks.replay_traces import MockShopify, api_calls, histogram, replay, summarize_timings, target_functions
+from catalog import CatalogStore
+from cursors import ProductPrefetcher
+from resilience import CircuitBreaker, ResilientCaller
+from tracing import ToolTraceRecorder, current_tool, load_traces, note_outcome
+
+
+class TestToolTraceRecorder(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "traces.jsonl"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_records_calls_with_cache_outcomes(self):
+        recorder = ToolTraceRecorder(self.path, session_id="s1")
+        caller = ResilientCaller(CircuitBreaker("test"))
+        seen = {}
+
+        async def handler(function_name, tool_call_id, args, llm, context, result_callback):
+            seen["tool"] = current_tool()
+            result = await caller.call("search_products", lambda query: {"product_ids": [1, 2]}, args["query"])
+            await caller.call("search_products", lambda query: {"product_ids": [1, 2]}, args["query"])
+            await result_callback(result)
+
+        async def failing(function_name, tool_call_id, args, llm, context, result_callback):
+            note_outcome("cursor")
+            await result_callback({"error": "Unknown cursor"})
+
+        async def scenario():
+            results = []
+
+            async def result_callback(result):
+                results.append(result)
+
+            await recorder.wrap("search_products", handler)("search_products", "c1", {"query": "hat"}, None, None, result_callback)
+            await recorder.wrap("next_page", failing)("next_page", "c2", {}, None, None, result_callback)
+            return results
+
+        results = asyncio.run(scenario())
+        recorder.close()
+        self.assertEqual(results[0], {"product_ids": [1, 2]})
+        self.assertEqual(seen["tool"], "search_products")
+        self.assertIsNone(current_tool())
+
+        search, page = load_traces([self.path])
+        self.assertEqual((search["session"], search["tool"], search["args"]), ("s1", "search_products", {"query": "hat"}))
+        self.assertEqual(search["cache"], {"upstream": 1, "fresh": 1})
+        self.assertEqual(search["bytes"], len(json.dumps({"product_ids": [1, 2]}, separators=(",", ":"))))
+        self.assertNotIn("error", search)
+        self.assertEqual((page["cache"], page["error"]), ({"cursor": 1}, True))
+        self.assertEqual(recorder.calls, 2)
+
+    def test_background_prefetch_is_not_counted_against_the_call(self):
+        recorder = ToolTraceRecorder(self.path, session_id="s1")
+
+        async def fetch(product_id):
+            note_outcome("upstream")
+            return {"product": {"id": product_id}}
+
+        prefetcher = ProductPrefetcher(fetch)
+
+        async def search(function_name, tool_call_id, args, llm, context, result_callback):
+            prefetcher.prefetch([1, 2])
+            await asyncio.sleep(0)
+            await result_callback({"product_ids": [1, 2]})
+
+        async def display(function_name, tool_call_id, args, llm, context, result_callback):
+            await result_callback(await prefetcher.get([1, 2]))
+
+        async def result_callback(result):
+            pass
+
+        async def scenario():
+            await recorder.wrap("search_products", search)("search_products", "c1", {}, None, None, result_callback)
+            await recorder.wrap("display", display)("display", "c2", {}, None, None, result_callback)
+
+        asyncio.run(scenario())
+        recorder.close()
+        search_trace, display_trace = load_traces([self.path])
+        self.assertEqual(search_trace["cache"], {})
+        self.assertEqual(display_trace["cache"], {"prefetched": 2})
+
+    def test_note_outcome_outside_a_call_is_ignored(self):
+        note_outcome("fresh")
+        self.assertIsNone(current_tool())
+
+
+class TestReplay(unittest.TestCase):
+    def test_api_calls_mirror_the_handlers(self):
+        self.assertEqual(api_calls("display_products_to_user", {"product_ids": [1, 2]}),
+                         [("get_product_by_id", (1,), {}), ("get_product_by_id", (2,), {})])
+        self.assertEqual(api_calls("filter_products", {"vendor": "Acme"})[0][2]["brand"], "Acme")
+        self.assertEqual(api_calls("next_page", {}), [])
+
+    def test_histogram(self):
+        self.assertEqual(histogram([1, 7, 7, 10_000], buckets=[5, 10, float("inf")]), [1, 2, 1])
+
+    def _records(self):
+        return [
+            {"ts": 0.0, "session": "a", "tool": "search_products", "args": {"query": "Product 1"}, "ms": 300.0},
+            {"ts": 0.01, "session": "a", "tool": "display_products_to_user", "args": {"product_ids": [1, 999999]}, "ms": 500.0},
+            {"ts": 0.0, "session": "b", "tool": "get_deals_of_the_day", "args": {"limit": 3}, "ms": 800.0},
+            {"ts": 0.02, "session": "b", "tool": "next_page", "args": {}, "ms": 1.0},
+        ]
+
+    def test_replays_against_mock_shopify(self):
+        with MockShopify(generate_products(50)) as mock:
+            with target_functions("mock", mock=mock) as functions:
+                timings = replay(self._records(), functions, speed=100)
+        self.assertEqual(len(timings), 4)
+        self.assertEqual(sum(timing["errors"] for timing in timings), 0)
+        self.assertEqual(mock.requests, 4)
+        summary = summarize_timings(timings)
+        self.assertEqual(summary["display_products_to_user"]["recorded_p50_ms"], 500.0)
+        self.assertEqual(sum(summary["search_products"]["histogram"]), 1)
+
+    def test_replays_against_local_catalog(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "catalog.db"
+            CatalogStore(db_path).upsert_products(generate_products(50))
+            with target_functions("local", catalog_db=db_path) as functions:
+                timings = replay(self._records(), functions, speed=0)
+        by_tool = {timing["tool"]: timing for timing in timings}
+        self.assertEqual(by_tool["display_products_to_user"]["calls"], 2)
+        self.assertEqual(sum(timing["errors"] for timing in timings), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import tempfile
+import unittest
+
+from tts_cache import TTSCache, cache_key, normalize_tts_text
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_normalized_text_shares_key(self):
+        self.assertEqual(normalize_tts_text("  Here are   some products! "), "here are some products!")
+        self.assertEqual(cache_key("Hello there.", "aura", 16000), cache_key("hello  there.", "aura", 16000))
+
+    def test_voice_and_sample_rate_are_part_of_key(self):
+        self.assertNotEqual(cache_key("Hello.", "aura", 16000), cache_key("Hello.", "aura", 24000))
+        self.assertNotEqual(cache_key("Hello.", "aura", 16000), cache_key("Hello.", "orion", 16000))
+
+
+class TestTTSCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_memory_hit(self):
+        cache = TTSCache(directory=None)
+        cache.put("Hello.", "aura", 16000, b"\x00\x01" * 10)
+        self.assertEqual(cache.get("hello.", "aura", 16000), b"\x00\x01" * 10)
+        self.assertEqual(cache.stats["memory_hits"], 1)
+        self.assertIsNone(cache.get("Goodbye.", "aura", 16000))
+        self.assertEqual(cache.stats["misses"], 1)
+
+    def test_memory_lru_is_bounded(self):
+        cache = TTSCache(directory=None, max_memory_bytes=10)
+        cache.put("one", "aura", 16000, b"a" * 6)
+        cache.put("two", "aura", 16000, b"b" * 6)
+        self.assertIsNone(cache.get("one", "aura", 16000))
+        self.assertEqual(cache.get("two", "aura", 16000), b"b" * 6)
+
+    def test_disk_tier_survives_new_instance(self):
+        TTSCache(directory=self.tmp.name).put("Hello.", "aura", 16000, b"pcm")
+        cache = TTSCache(directory=self.tmp.name)
+        self.assertEqual(cache.get("Hello.", "aura", 16000), b"pcm")
+        self.assertEqual(cache.stats["disk_hits"], 1)
+        self.assertEqual(cache.get("Hello.", "aura", 16000), b"pcm")
+        self.assertEqual(cache.stats["memory_hits"], 1)
+
+    def test_disk_tier_is_bounded(self):
+        cache = TTSCache(directory=self.tmp.name, max_memory_bytes=0, max_disk_bytes=10)
+        cache.put("one", "aura", 16000, b"a" * 6)
+        cache.put("two", "aura", 16000, b"b" * 6)
+        self.assertLessEqual(cache._disk_bytes, 10)
+        self.assertEqual(cache.get("two", "aura", 16000), b"b" * 6)
+
+    def test_event_loop_methods_use_the_disk_tier(self):
+        cache = TTSCache(directory=self.tmp.name, max_memory_bytes=0)
+
+        async def scenario():
+            cache.put_in_background("Hello.", "aura", 16000, b"pcm")
+            await cache.flush()
+            return await cache.aget("hello.", "aura", 16000), await cache.aget("Goodbye.", "aura", 16000)
+
+        self.assertEqual(asyncio.run(scenario()), (b"pcm", None))
+        self.assertEqual(TTSCache(directory=self.tmp.name).get("Hello.", "aura", 16000), b"pcm")
+        self.assertEqual((cache.stats["disk_hits"], cache.stats["misses"]), (1, 1))
+
+    def test_long_text_not_cached(self):
+        cache = TTSCache(directory=None, max_text_chars=10)
+        cache.put("This sentence is far too long to cache.", "aura", 16000, b"pcm")
+        self.assertIsNone(cache.get("This sentence is far too long to cache.", "aura", 16000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from resilience import CircuitBreaker, ResilientCaller
+from warmup import SessionWarmup
+
+
+class TestSessionWarmup(unittest.TestCase):
+    def test_steps_run_concurrently_and_failures_are_contained(self):
+        warmup = SessionWarmup(timeout=0.5)
+
+        async def quick():
+            await asyncio.sleep(0.05)
+
+        async def failing():
+            raise ConnectionError("no network")
+
+        async def stuck():
+            await asyncio.sleep(10)
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await warmup.run({"a": quick, "b": quick, "failing": failing, "stuck": stuck})
+            return loop.time() - started
+
+        elapsed = asyncio.run(scenario())
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual({name: step["ok"] for name, step in warmup.steps.items()},
+                         {"a": True, "b": True, "failing": False, "stuck": False})
+
+    def test_savings_come_from_calls_that_benefited(self):
+        warmup = SessionWarmup()
+        caller = ResilientCaller(CircuitBreaker("test"))
+        upstream = []
+
+        def get_deals(limit):
+            upstream.append(limit)
+            return {"product_ids": [1, 2]}
+
+        async def scenario():
+            await warmup.prefetch("get_deals_of_the_day", lambda: caller.call("get_deals_of_the_day", get_deals, 5))
+            await warmup.prefetch("get_categories", lambda: caller.call("get_categories", lambda: {"error": "down"}))
+            warmup.record_connection(cold_ms=180.0, warm_ms=30.0)
+
+            for name, args in [("get_deals_of_the_day", (5,)), ("get_deals_of_the_day", (5,)), ("get_deals_of_the_day", (10,))]:
+                warmup.note_tool_call(name, caller.has(name, *args))
+                await caller.call(name, get_deals, *args)
+
+        asyncio.run(scenario())
+        self.assertEqual(upstream, [5, 10])
+        self.assertNotIn("get_categories", warmup.prefetched_ms)
+        report = warmup.report()
+        self.assertEqual(report["first_call"]["tool"], "get_deals_of_the_day")
+        self.assertTrue(report["first_call"]["cache_hit"])
+        self.assertEqual(report["first_turn_saved_ms"], round(warmup.prefetched_ms["get_deals_of_the_day"], 1))
+        # The deals prefetch counts once; the cache miss used the warm connection
+        self.assertAlmostEqual(report["saved_ms"], report["first_turn_saved_ms"] + 150.0, delta=0.2)
+
+    def test_keep_alive_pings_until_closed(self):
+        warmup = SessionWarmup()
+        pings = []
+
+        async def scenario():
+            warmup.keep_alive(lambda: pings.append(1), interval=0.01)
+            await asyncio.sleep(0.1)
+            warmup.close()
+            count = len(pings)
+            await asyncio.sleep(0.05)
+            return count
+
+        count = asyncio.run(scenario())
+        self.assertGreaterEqual(count, 2)
+        self.assertEqual(len(pings), count)
+
+
+if __name__ == "__main__":
+    unittest.main()
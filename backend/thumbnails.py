@@ -0,0 +1,183 @@
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+from urllib.parse import quote, urlparse
+
+import requests
+from PIL import Image, ImageOps, features
+
+DATA_DIR = Path(os.path.dirname(os.path.abspath(__file__))) / "data"
+THUMBNAIL_DIR = Path(os.environ.get("THUMBNAIL_DIR", DATA_DIR / "thumbnails"))
+# Product images that are plain file names (e.g. data/products.json) are read from here
+THUMBNAIL_FIXTURES_DIR = Path(os.environ.get("THUMBNAIL_FIXTURES_DIR", DATA_DIR / "images"))
+# Remote images are only fetched from these hosts
+THUMBNAIL_HOSTS = {host.strip() for host in os.environ.get("THUMBNAIL_HOSTS", "cdn.shopify.com").split(",") if host.strip()}
+THUMBNAIL_URL = os.environ.get("THUMBNAIL_URL", "/api/thumbnail")
+# Cards render at most ~240 CSS px wide; 480 covers 2x screens
+CARD_WIDTH = int(os.environ.get("THUMBNAIL_WIDTH", 480))
+# The only width card_thumbnail() links to; any other `w` would just add renditions to the cache
+ALLOWED_WIDTHS = {CARD_WIDTH}
+THUMBNAIL_CACHE_MB = float(os.environ.get("THUMBNAIL_CACHE_MB", "512"))
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+
+MEDIA_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+SAVE_OPTIONS = {"webp": {"quality": 80, "method": 4}, "avif": {"quality": 60}}
+
+
+class ThumbnailError(Exception):
+    """The source image is not allowed, missing or not an image."""
+
+
+def supported_formats():
+    return [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ThumbnailCache:
+    """Card-sized WebP/AVIF renditions in a content-addressed disk cache.
+
+    Renditions are stored as `<sha256 of the original>-<width>.<format>`,
+    so the same image reached through different URLs is resized once. A
+    small index maps each source URL to its content digest. Repeat
+    requests are then served from disk without downloading the original.
+    Renditions are bounded by total bytes, evicting the least recently
+    used files first.
+    """
+
+    def __init__(self, directory=THUMBNAIL_DIR, fixtures_dir=THUMBNAIL_FIXTURES_DIR, allowed_hosts=THUMBNAIL_HOSTS, timeout=10,
+                 max_bytes=int(THUMBNAIL_CACHE_MB * 1024 * 1024)):
+        self.directory = Path(directory)
+        self.fixtures_dir = Path(fixtures_dir)
+        self.allowed_hosts = set(allowed_hosts)
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        (self.directory / "sources").mkdir(parents=True, exist_ok=True)
+        self.stats = {"hits": 0, "renders": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._bytes = sum(path.stat().st_size for path in self._renditions())
+
+    def _renditions(self):
+        return [path for fmt in MEDIA_TYPES for path in self.directory.glob(f"*-*.{fmt}")]
+
+    def _write_atomic(self, path, data):
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _index_path(self, src):
+        return self.directory / "sources" / _digest(src.encode("utf-8"))
+
+    def _load_source(self, src):
+        parsed = urlparse(src)
+        if parsed.scheme in ("http", "https"):
+            if parsed.hostname not in self.allowed_hosts:
+                raise ThumbnailError(f"Image host not allowed: {parsed.hostname}")
+            try:
+                response = requests.get(src, timeout=self.timeout)
+            except requests.RequestException as e:
+                raise ThumbnailError(f"Could not fetch {src}: {e}")
+            if response.status_code != 200:
+                raise ThumbnailError(f"Could not fetch {src}: {response.status_code}")
+            data = response.content
+        elif not parsed.scheme:
+            # Fixture names must stay inside the fixtures directory
+            path = (self.fixtures_dir / src).resolve()
+            if self.fixtures_dir.resolve() not in path.parents or not path.is_file():
+                raise ThumbnailError(f"Image not found: {src}")
+            data = path.read_bytes()
+        else:
+            raise ThumbnailError(f"Unsupported image source: {src}")
+        if len(data) > MAX_SOURCE_BYTES:
+            raise ThumbnailError(f"Image too large: {src}")
+        return data
+
+    def _render(self, data, width, fmt):
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image = ImageOps.exif_transpose(image)
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+                if image.width > width:
+                    image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+                output = io.BytesIO()
+                image.save(output, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+                return output.getvalue()
+        except (OSError, ValueError) as e:
+            raise ThumbnailError(f"Not a readable image: {e}")
+
+    def get(self, src, width=CARD_WIDTH, fmt="webp"):
+        """Path of the rendition of `src`, rendering it on first use."""
+        if width not in ALLOWED_WIDTHS:
+            raise ThumbnailError(f"Unsupported width: {width}")
+        if fmt not in supported_formats():
+            raise ThumbnailError(f"Unsupported format: {fmt}")
+
+        index_path = self._index_path(src)
+        if index_path.exists():
+            path = self.directory / f"{index_path.read_text().strip()}-{width}.{fmt}"
+            try:
+                os.utime(path)  # keep recently used renditions away from eviction
+                self.stats["hits"] += 1
+                return path
+            except FileNotFoundError:
+                pass
+
+        data = self._load_source(src)
+        digest = _digest(data)
+        path = self.directory / f"{digest}-{width}.{fmt}"
+        if not path.exists():
+            rendition = self._render(data, width, fmt)
+            self._write_atomic(path, rendition)
+            self.stats["renders"] += 1
+            with self._lock:
+                self._bytes += len(rendition)
+                if self._bytes > self.max_bytes:
+                    self._evict(keep=path)
+        self._write_atomic(index_path, digest.encode())
+        return path
+
+    def _evict(self, keep):
+        files = sorted(self._renditions(), key=lambda path: path.stat().st_mtime)
+        self._bytes = sum(path.stat().st_size for path in files)
+        for path in files:
+            if self._bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._bytes -= size
+                self.stats["evictions"] += 1
+            except OSError:
+                continue
+
+
+def card_thumbnail(image, width=CARD_WIDTH, base_url=THUMBNAIL_URL, allowed_hosts=THUMBNAIL_HOSTS):
+    """Thumbnail URLs for a product card, one per supported format (best first).
+
+    None unless the cache could serve the image: a browser does not fall
+    back from a failing <source> to the <img src>, so images on other hosts
+    are left to the original URL.
+    """
+    src = (image or {}).get("src")
+    if not src:
+        return None
+    parsed = urlparse(src)
+    if parsed.scheme in ("http", "https"):
+        if parsed.hostname not in allowed_hosts:
+            return None
+    elif parsed.scheme:
+        return None
+    return {
+        "width": width,
+        "sources": [
+            {"type": MEDIA_TYPES[fmt], "url": f"{base_url}?src={quote(src, safe='')}&w={width}&fmt={fmt}"}
+            for fmt in supported_formats()
+        ],
+    }
@@ -46,7 +46,7 @@ tools = [
         type="function",
         function={
             "name": "search_products",
-            "description": "Search for products by title using Shopify API.",
+            "description": "Search for products by title. Returns the first page of product IDs and a cursor for next_page.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -56,7 +56,7 @@ tools = [
                     },
                     "limit": {
                         "type": "integer",
-                        "description": "Maximum number of products to return (default: 10).",
+                        "description": "Number of products per page (default: 3).",
                     },
                 },
                 "required": ["query"],
@@ -68,21 +68,51 @@ tools = [
         type="function",
         function={
             "name": "filter_products",
-            "description": "Filter products from Shopify API by various criteria.",
+            "description": "Filter products by various criteria. Returns the first page of matching product IDs, a cursor for next_page, the total number of matches and counts per category, brand, tag and color.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "category": {"type": "string", "description": "Product category."},
-                    "vendor": {"type": "string", "description": "Product vendor/brand."},
+                    "subcategory": {"type": "string", "description": "Product subcategory, e.g. 'Audio'."},
+                    "brand": {"type": "string", "description": "Product vendor/brand."},
                     "min_price": {"type": "number", "description": "Minimum product price."},
                     "max_price": {"type": "number", "description": "Maximum product price."},
+                    "min_rating": {"type": "number", "description": "Minimum average rating (0-5)."},
+                    "colors": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Colors; products available in any of them match.",
+                    },
                     "tags": {
                         "type": "array",
                         "items": {"type": "string"},
                         "description": "List of product tags.",
                     },
                     "in_stock": {"type": "boolean", "description": "Filter by stock availability."},
-                    "limit": {"type": "integer", "description": "Maximum number of products to return."},
+                    "limit": {"type": "integer", "description": "Number of products per page (default: 3)."},
+                    "offset": {"type": "integer", "description": "Number of matches to skip, for paging; use next_offset from the previous result when given."},
+                },
+                "required": [],
+            },
+        },
+    ),
+    # Next page of the last search or filter
+    ChatCompletionToolParam(
+        type="function",
+        function={
+            "name": "next_page",
+            "description": "Get the next page of product IDs from an earlier search_products or filter_products result, without searching again.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "cursor": {
+                        "type": "string",
+                        "description": "Cursor returned by the earlier search or filter (defaults to the most recent one).",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Number of products in the page (default: 3).",
+                    },
                 },
                 "required": [],
             },
@@ -93,20 +123,24 @@ tools = [
         type="function",
         function={
             "name": "get_product_recommendations",
-            "description": "Fetch recommended product IDs from Shopify's recommendations API.",
+            "description": "Fetch IDs of products similar to a given product, optionally favouring the user's preferences, or of products matching the preferences alone.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "product_id": {
                         "type": "integer",
-                        "description": "ID of the product to base recommendations on.",
+                        "description": "ID of the product to base recommendations on (optional when user_preferences is given).",
+                    },
+                    "user_preferences": {
+                        "type": "string",
+                        "description": "What the user said they like, e.g. 'black, wireless, budget' (optional).",
                     },
                     "limit": {
                         "type": "integer",
                         "description": "Maximum number of recommendations to return (default: 5).",
                     },
                 },
-                "required": ["product_id"],
+                "required": [],
             },
         },
     ),
@@ -151,7 +185,7 @@ tools = [
         type="function",
         function={
             "name": "get_categories",
-            "description": "Fetch all product categories from Shopify API.",
+            "description": "Fetch product categories with their subcategories and product counts.",
             "parameters": {
                 "type": "object",
                 "properties": {},
@@ -164,7 +198,7 @@ tools = [
         type="function",
         function={
             "name": "get_brands",
-            "description": "Fetch all brands from Shopify API, optionally filtered by category.",
+            "description": "Fetch brands with product counts, optionally within a category or subcategory.",
             "parameters": {
                 "type": "object",
                 "properties": {
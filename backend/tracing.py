@@ -0,0 +1,125 @@
+"""Opt-in capture of the tool calls a session makes.
+
+With TOOL_TRACE_PATH set, every tool handler call appends one JSON line:
+
+    {"ts": 1718000000.123, "session": "a1b2c3", "tool": "filter_products",
+     "args": {...}, "ms": 182.4, "bytes": 913, "cache": {"upstream": 1}}
+
+`cache` counts how the call was answered (fresh, stale, upstream,
+fallback, prefetched, cursor, ...). It is collected from the layers below
+the handler through a context variable, so they don't need a reference to
+the recorder. Replay traces with `python3 -m benchmarks.replay_traces`.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import secrets
+import time
+from collections import Counter
+
+from loguru import logger
+
+# JSONL file tool traces are appended to (tracing is off when unset)
+TOOL_TRACE_PATH = os.environ.get("TOOL_TRACE_PATH")
+
+_current = contextvars.ContextVar("tool_trace", default=None)
+
+
+class _Call:
+    __slots__ = ("tool", "outcomes")
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.outcomes = Counter()
+
+
+def note_outcome(outcome):
+    """Count how the running tool call was answered (no-op outside a traced call)."""
+    call = _current.get()
+    if call is not None:
+        call.outcomes[outcome] += 1
+
+
+def current_tool():
+    """Name of the tool call running in this context, if any."""
+    call = _current.get()
+    return call.tool if call is not None else None
+
+
+def create_background_task(coro):
+    """Task that outlives the current tool call; its outcomes are not counted against it."""
+    context = contextvars.copy_context()
+    context.run(_current.set, None)
+    return asyncio.create_task(coro, context=context)
+
+
+def _size(result):
+    if isinstance(result, str):
+        return len(result.encode("utf-8"))
+    return len(json.dumps(result, default=str, separators=(",", ":")))
+
+
+class ToolTraceRecorder:
+    """Wraps tool handlers and appends one trace line per call."""
+
+    def __init__(self, path, session_id=None, clock=time.time):
+        self.path = path
+        self.session_id = session_id or secrets.token_hex(3)
+        self.clock = clock
+        self._file = open(path, "a", buffering=1)
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls, session_id=None):
+        return cls(TOOL_TRACE_PATH, session_id) if TOOL_TRACE_PATH else None
+
+    def write(self, record):
+        try:
+            self._file.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+            self.calls += 1
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not write tool trace: {e}")
+
+    def wrap(self, name, handler):
+        async def traced(function_name, tool_call_id, args, llm, context, result_callback):
+            call = _Call(name)
+            token = _current.set(call)
+            outcome = {}
+
+            async def record_result(result, *cb_args, **cb_kwargs):
+                outcome["bytes"] = _size(result)
+                outcome["error"] = isinstance(result, dict) and "error" in result
+                await result_callback(result, *cb_args, **cb_kwargs)
+
+            started_at = self.clock()
+            started = time.perf_counter()
+            try:
+                await handler(function_name, tool_call_id, args, llm, context, record_result)
+            finally:
+                _current.reset(token)
+                record = {
+                    "ts": round(started_at, 3),
+                    "session": self.session_id,
+                    "tool": name,
+                    "args": args,
+                    "ms": round((time.perf_counter() - started) * 1000, 1),
+                    "bytes": outcome.get("bytes"),
+                    "cache": dict(call.outcomes),
+                }
+                if outcome.get("error"):
+                    record["error"] = True
+                self.write(record)
+        return traced
+
+    def close(self):
+        self._file.close()
+
+
+def load_traces(paths):
+    """Trace records from JSONL files, oldest first."""
+    records = []
+    for path in paths:
+        with open(path) as file:
+            records.extend(json.loads(line) for line in file if line.strip())
+    return sorted(records, key=lambda record: record.get("ts", 0))
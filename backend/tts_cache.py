@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger
+
+TTS_CACHE_DIR = Path(os.environ.get("TTS_CACHE_DIR", Path(os.path.dirname(os.path.abspath(__file__))) / "data" / "tts_cache"))
+TTS_CACHE_MEMORY_MB = float(os.environ.get("TTS_CACHE_MEMORY_MB", "32"))
+TTS_CACHE_DISK_MB = float(os.environ.get("TTS_CACHE_DISK_MB", "256"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_tts_text(text: str) -> str:
+    """Collapse whitespace and case; punctuation is kept since it changes prosody."""
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def cache_key(text: str, voice: str, sample_rate: int) -> str:
+    raw = f"{voice}|{sample_rate}|{normalize_tts_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Two-tier cache of synthesized PCM audio.
+
+    Tier one is an in-memory LRU bounded by total bytes. Tier two is a
+    directory of `<key>.pcm` files bounded by total bytes, evicting the
+    least recently used files first. Disk hits are promoted to memory.
+    Long texts are not cached since they rarely repeat. On the event loop,
+    use aget() and put_in_background(), which do the disk I/O in worker
+    threads.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_memory_bytes=int(TTS_CACHE_MEMORY_MB * 1024 * 1024),
+                 max_disk_bytes=int(TTS_CACHE_DISK_MB * 1024 * 1024), max_text_chars=200):
+        self.directory = Path(directory) if directory else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_text_chars = max_text_chars
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        self._writes = set()
+
+        self._disk_bytes = 0
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(path.stat().st_size for path in self.directory.glob("*.pcm"))
+
+    def cacheable(self, text: str) -> bool:
+        normalized = normalize_tts_text(text)
+        return bool(normalized) and len(normalized) <= self.max_text_chars
+
+    def get(self, text: str, voice: str, sample_rate: int):
+        """Return cached PCM bytes or None."""
+        key = cache_key(text, voice, sample_rate)
+        audio = self._memory_get(key)
+        if audio is not None:
+            return audio
+        return self._disk_result(key, self._read_disk(key))
+
+    async def aget(self, text: str, voice: str, sample_rate: int):
+        """get() with the disk read in a worker thread."""
+        key = cache_key(text, voice, sample_rate)
+        audio = self._memory_get(key)
+        if audio is not None:
+            return audio
+        return self._disk_result(key, await asyncio.to_thread(self._read_disk, key))
+
+    def put(self, text: str, voice: str, sample_rate: int, audio: bytes):
+        key = self._store(text, voice, sample_rate, audio)
+        if key:
+            self._write_disk(key, audio)
+
+    def put_in_background(self, text: str, voice: str, sample_rate: int, audio: bytes):
+        """put() from the event loop: memory right away, the disk write (and eviction) in a worker thread."""
+        key = self._store(text, voice, sample_rate, audio)
+        if key and self.directory:
+            task = asyncio.create_task(asyncio.to_thread(self._write_disk, key, audio))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def flush(self):
+        """Wait for background disk writes."""
+        if self._writes:
+            await asyncio.gather(*self._writes)
+
+    def _memory_get(self, key):
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            return audio
+
+    def _disk_result(self, key, audio):
+        if audio is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["disk_hits"] += 1
+        self._remember(key, audio)
+        return audio
+
+    def _store(self, text, voice, sample_rate, audio):
+        if not audio or not self.cacheable(text):
+            return None
+        key = cache_key(text, voice, sample_rate)
+        self.stats["stores"] += 1
+        self._remember(key, audio)
+        return key
+
+    def _remember(self, key, audio):
+        if len(audio) > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = audio
+            self._memory_bytes += len(audio)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self.directory / f"{key}.pcm"
+        try:
+            audio = path.read_bytes()
+            os.utime(path)  # keep recently used files away from eviction
+            return audio
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"TTS cache read failed for {path}: {e}")
+            return None
+
+    def _write_disk(self, key, audio):
+        if not self.directory or len(audio) > self.max_disk_bytes:
+            return
+        path = self.directory / f"{key}.pcm"
+        if path.exists():
+            return
+        try:
+            # Write then rename so concurrent bot processes never read partial files
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"TTS cache write failed for {path}: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(audio)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk(keep=path)
+
+    def _evict_disk(self, keep):
+        files = sorted(self.directory.glob("*.pcm"), key=lambda path: path.stat().st_mtime)
+        self._disk_bytes = sum(path.stat().st_size for path in files)
+        for path in files:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._disk_bytes -= size
+            except OSError:
+                continue
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+
+from loguru import logger
+
+# Warm-up steps still running after this long are abandoned
+WARMUP_TIMEOUT_SECS = float(os.environ.get("WARMUP_TIMEOUT_SECS", 8))
+# Idle pooled connections are pinged this often so they are not closed under us
+SHOPIFY_KEEPALIVE_SECS = float(os.environ.get("SHOPIFY_KEEPALIVE_SECS", 45))
+# Optional fixed greeting, synthesized (once, then from the TTS cache) during warm-up
+WARMUP_GREETING = os.environ.get("WARMUP_GREETING")
+
+
+class SessionWarmup:
+    """Warm-up work started when the participant joins, and the latency it saved.
+
+    Steps run concurrently with the greeting. Each is timed and bounded by
+    `timeout`, and a failing step only costs its own result. The savings
+    are attributed later from the tool calls that actually benefited:
+    - a prefetched tool answered from cache saves what its prefetch cost;
+    - the first call that goes to Shopify saves the cold-minus-warm
+      connection time.
+    """
+
+    def __init__(self, timeout=WARMUP_TIMEOUT_SECS):
+        self.timeout = timeout
+        self.steps = {}
+        self.prefetched_ms = {}
+        self.connection_saved_ms = None
+        self.saved_ms = {}
+        self.first_call = None
+        self._connection_used = False
+        self._keepalive = None
+
+    async def _run_step(self, name, step):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(step(), self.timeout)
+            ok = True
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up step {name} timed out after {self.timeout}s")
+            ok = False
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e}")
+            ok = False
+        self.steps[name] = {"ms": round((time.perf_counter() - started) * 1000, 1), "ok": ok}
+
+    async def run(self, steps):
+        """Run {name: async callable} concurrently; returns the per-step timings."""
+        started = time.perf_counter()
+        await asyncio.gather(*(self._run_step(name, step) for name, step in steps.items()))
+        logger.info(f"Session warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms: {self.steps}")
+        return self.steps
+
+    async def prefetch(self, tool, call):
+        """Await `call()` (a tool call that fills the session cache) and remember its cost."""
+        started = time.perf_counter()
+        result = await call()
+        if not (isinstance(result, dict) and "error" in result):
+            self.prefetched_ms[tool] = (time.perf_counter() - started) * 1000
+        return result
+
+    def record_connection(self, cold_ms, warm_ms):
+        self.connection_saved_ms = max(0.0, cold_ms - warm_ms)
+
+    def note_tool_call(self, tool, cache_hit):
+        """Attribute savings to a tool call the session made."""
+        saved = 0.0
+        if cache_hit and tool in self.prefetched_ms and tool not in self.saved_ms:
+            saved = self.saved_ms[tool] = self.prefetched_ms[tool]
+        elif not cache_hit and not self._connection_used and self.connection_saved_ms is not None:
+            self._connection_used = True
+            saved = self.saved_ms["connection"] = self.connection_saved_ms
+        if self.first_call is None:
+            self.first_call = {"tool": tool, "cache_hit": cache_hit, "saved_ms": round(saved, 1)}
+
+    def keep_alive(self, ping, interval=SHOPIFY_KEEPALIVE_SECS):
+        """Call the blocking `ping` every `interval` seconds until close()."""
+        async def loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await asyncio.to_thread(ping)
+                except Exception as e:
+                    logger.debug(f"Keep-alive ping failed: {e}")
+
+        self._keepalive = asyncio.create_task(loop())
+
+    def close(self):
+        if self._keepalive:
+            self._keepalive.cancel()
+
+    def report(self):
+        return {
+            "steps": self.steps,
+            "prefetched_ms": {tool: round(ms, 1) for tool, ms in self.prefetched_ms.items()},
+            "connection_saved_ms": round(self.connection_saved_ms, 1) if self.connection_saved_ms is not None else None,
+            "first_call": self.first_call,
+            "first_turn_saved_ms": self.first_call["saved_ms"] if self.first_call else 0.0,
+            "saved_ms": round(sum(self.saved_ms.values()), 1),
+        }
@@ -7,6 +7,9 @@ import { ShoppingCart, ShoppingBag } from 'lucide-react';
 import styles from './styles.module.css';
 import {ProductResponse } from './types';
 
+// Thumbnail URLs are relative to the bot server, not the page origin
+const serverURL = (import.meta.env.VITE_SERVER_URL ?? "").replace(/\/$/, "");
+const thumbnailURL = (url: string) => (url.startsWith("/") ? `${serverURL}${url}` : url);
 
 const ProductCards: React.FC = () => {
   const [products, setProducts] = useState<ProductResponse[]>([]);
@@ -35,7 +38,7 @@ const ProductCards: React.FC = () => {
           const {product} = item;
           if (!product) return null;
 
-          const {id, title, tags, image, variants} = product;
+          const {id, title, tags, image, thumbnail, variants} = product;
           // If the product has no variants, skip rendering
           if (!variants || variants.length === 0) return null;
 
@@ -58,11 +61,18 @@ const ProductCards: React.FC = () => {
               <CardContent className="flex-grow">
                 <div className="flex flex-col gap-3">
                   {image && (
-                    <img
-                      src={image.src}
-                      alt={title}
-                      className="object-cover w-full max-h-60 rounded"
-                    />
+                    <picture>
+                      {thumbnail?.sources.map((source) => (
+                        <source key={source.type} srcSet={thumbnailURL(source.url)} type={source.type}/>
+                      ))}
+                      <img
+                        src={image.src}
+                        alt={title}
+                        loading="lazy"
+                        decoding="async"
+                        className="object-cover w-full max-h-60 rounded"
+                      />
+                    </picture>
                   )}
                   {tags && tags.trim() !== "" && (
                     <div className="flex flex-wrap gap-1">
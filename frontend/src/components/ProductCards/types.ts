@@ -6,6 +6,16 @@ export interface ProductImage {
   width: number;
 }
 
+export interface ThumbnailSource {
+  type: string;
+  url: string;
+}
+
+export interface ProductThumbnail {
+  width: number;
+  sources: ThumbnailSource[];
+}
+
 export interface ProductOption {
   id: number;
   name: string;
@@ -37,6 +47,7 @@ export interface ProductVariant {
 export interface ProductData {
   id: number;
   image: ProductImage;
+  thumbnail?: ProductThumbnail | null;
   options: ProductOption[];
   status: string;
   tags: string;